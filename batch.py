@@ -0,0 +1,371 @@
+"""
+Build personalised worksheets for many students in parallel.
+
+A manifest lists (student_id, level, language, count) rows. Every row expands
+into `count` worksheet jobs, which are sharded across a process pool. Each job
+draws from its own stream derived from the batch root seed and the job's
+position in the manifest, so the output does not depend on how jobs are
+scheduled across workers.
+
+Worksheets are written either as one JSON file per worksheet, or streamed
+into a single JSONL (optionally gzip) file with --jsonl. A JSONL run can be
+resumed after a crash by re-running it with the same manifest and seed:
+worksheets already in the file are skipped.
+
+With --unique worksheet, no question repeats within a worksheet; with
+--unique batch, none repeats across the batch either until a skill runs low
+(see uniqueness).
+
+With --bank, questions and their distractor candidates are sampled from the
+memory-mapped question bank (see question_bank), built once before the run
+and shared read-only by every worker.
+
+With --solver, the skill distributions of every worksheet are planned up
+front with the vectorized distribution_solver (one call per level, seeded
+from the root seed) instead of one sequential draw per worksheet. Every
+skill of a difficulty level then has the same expected share.
+
+With --metrics, per-stage timings and counters (see instrumentation) are
+collected from every worker and written as JSON at the end of the run.
+
+Usage:
+    python batch.py manifest.csv --out generated --workers 8 --seed 1234
+    python batch.py manifest.csv --jsonl worksheets.jsonl.gz --seed 1234
+    python batch.py manifest.csv --metrics metrics.json
+    python batch.py manifest.csv --jsonl class.jsonl --unique batch --workers 8 --seed 1234
+    python batch.py manifest.csv --jsonl class.jsonl --bank --workers 8 --seed 1234
+    python batch.py manifest.csv --jsonl class.jsonl --solver --seed 1234
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+import instrumentation
+from create_worksheet import WORKSHEET_LEVEL_DISTRIBUTIONS, create_worksheet_json, save_worksheet
+from distribution_solver import plan_distributions
+from jsonl_writer import JsonlWriter
+from question_bank import open_bank
+from seeding import batch_plan_rng, worksheet_rng
+from uniqueness import UniquenessTracker
+
+
+@dataclass
+class WorksheetJob:
+    """One worksheet to build for one student."""
+    index: int  # position in the expanded manifest, used to derive the rng stream
+    student_id: str
+    level: str
+    language: str
+    copy: int  # 1-based copy number per (student_id, language, level) across the manifest
+    distribution: Optional[dict] = None  # skill distribution planned by the batch (--solver)
+
+
+@dataclass
+class BatchResult:
+    """Summary of a batch run."""
+    root_seed: int
+    built: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)  # (job, message) pairs
+
+    @property
+    def worksheets_per_sec(self) -> float:
+        return self.built / self.elapsed if self.elapsed else 0.0
+
+
+def load_manifest(path: str) -> list:
+    """
+    Load a manifest from a CSV file (with a header row) or a JSON list of objects.
+
+    Each row needs student_id, level, language and count fields.
+
+    Returns:
+        List of row dicts with count converted to int.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+
+    manifest = []
+    for row in rows:
+        manifest.append({
+            "student_id": str(row["student_id"]).strip(),
+            "level": str(row["level"]).strip().upper(),
+            "language": str(row.get("language") or "en").strip(),
+            "count": int(row.get("count") or 1),
+        })
+    return manifest
+
+
+def expand_manifest(manifest: list) -> list:
+    """
+    Expand manifest rows into one WorksheetJob per worksheet.
+
+    Copies are numbered per (student_id, language, level) across the whole
+    manifest, so repeated rows for the same student continue the numbering
+    instead of overwriting (or, on resume, skipping) the earlier copies.
+    """
+    jobs = []
+    copies = {}
+    for row in manifest:
+        key = (row["student_id"], row["language"], row["level"])
+        for _ in range(row["count"]):
+            copies[key] = copies.get(key, 0) + 1
+            jobs.append(WorksheetJob(
+                index=len(jobs),
+                student_id=row["student_id"],
+                level=row["level"],
+                language=row["language"],
+                copy=copies[key],
+            ))
+    return jobs
+
+
+def job_key(job: WorksheetJob) -> str:
+    """Unique identifier of a job's worksheet within a manifest."""
+    return f"{job.student_id}_{job.language}_level_{job.level}_{job.copy}"
+
+
+def job_filename(job: WorksheetJob) -> str:
+    """Output file name for a job."""
+    return f"{job_key(job)}.json"
+
+
+def build_job(job: WorksheetJob, root_seed: int, unique=None, bank: bool = False) -> list:
+    """Build the worksheet JSON for a single job."""
+    return create_worksheet_json(
+        title=f"Worksheet Level {job.level}",
+        level=job.level,
+        language=job.language,
+        rng=worksheet_rng(root_seed, job.index),
+        unique=unique,
+        bank=open_bank() if bank else None,
+        distribution=job.distribution,
+    )
+
+
+def plan_jobs(jobs: list, root_seed: int):
+    """
+    Plan the skill distribution of every job with distribution_solver.
+
+    The plan depends only on the jobs and root_seed, so a resumed run gets
+    the same distributions. Jobs with an invalid level are left unplanned
+    and fail in the worker as usual.
+    """
+    planned = [job for job in jobs if job.level in WORKSHEET_LEVEL_DISTRIBUTIONS]
+    distributions = plan_distributions([job.level for job in planned], rng=batch_plan_rng(root_seed))
+    for job, distribution in zip(planned, distributions):
+        job.distribution = distribution
+
+
+def _start_metrics(metrics: bool):
+    """Start recording a fresh set of metrics for one job in a worker."""
+    if metrics:
+        instrumentation.enable()
+        instrumentation.reset()
+
+
+def _job_metrics(metrics: bool) -> Optional[dict]:
+    """Metrics recorded for the job just run in this worker, or None."""
+    return instrumentation.snapshot() if metrics else None
+
+
+def _process_job(job: WorksheetJob, root_seed: int, out_dir: Optional[str], metrics: bool, unique,
+                 bank: bool = False) -> tuple:
+    """
+    Build one worksheet and save it into out_dir, or serialize its JSONL
+    record if out_dir is None.
+
+    Returns:
+        (JSONL line or None, error message or None, metrics or None)
+    """
+    _start_metrics(metrics)
+    try:
+        worksheet_json = build_job(job, root_seed, unique=unique, bank=bank)
+        if out_dir is not None:
+            save_worksheet(worksheet_json, os.path.join(out_dir, job_filename(job)), verbose=False)
+            return None, None, _job_metrics(metrics)
+        record = {
+            "id": job_key(job),
+            "student_id": job.student_id,
+            "level": job.level,
+            "language": job.language,
+            "copy": job.copy,
+            "worksheet": worksheet_json,
+        }
+        return json.dumps(record, ensure_ascii=False), None, _job_metrics(metrics)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", _job_metrics(metrics)
+
+
+def _run_job(args: tuple) -> tuple:
+    """Worker entry point: build one worksheet (see _process_job)."""
+    job, root_seed, out_dir, metrics, unique, bank = args
+    return _process_job(job, root_seed, out_dir, metrics, unique, bank)
+
+
+def _run_shard(args: tuple) -> tuple:
+    """
+    Worker entry point for batch-wide uniqueness: build a shard's jobs in
+    order with the shard's tracker.
+
+    Returns:
+        (list of _process_job results, updated tracker)
+    """
+    jobs, tracker, root_seed, out_dir, metrics = args
+    return [_process_job(job, root_seed, out_dir, metrics, tracker) for job in jobs], tracker
+
+
+def _windows(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def run_batch(manifest: list, out_dir: str = "generated", workers: int = None,
+              root_seed: int = None, chunksize: int = 16, jsonl_path: str = None,
+              fsync_every: int = 100, metrics_path: str = None, unique: str = None,
+              bank: bool = False, solver: bool = False) -> BatchResult:
+    """
+    Build every worksheet in a manifest across a process pool.
+
+    A failing worksheet is recorded in the result and does not stop the run.
+
+    Args:
+        manifest: Rows as returned by load_manifest.
+        out_dir: Directory for the output files (ignored with jsonl_path).
+        workers: Number of worker processes (defaults to the CPU count).
+        root_seed: Batch root seed. If None, a fresh one is drawn and returned
+                   in the result so the run can be reproduced.
+        chunksize: Jobs handed to a worker at a time.
+        jsonl_path: Stream all worksheets into this JSONL (".gz" for gzip) file
+                    instead of one file each, resuming after any records
+                    already in it.
+        fsync_every: Records between fsyncs of the JSONL file.
+        metrics_path: Collect per-stage timings and counters from every
+                      worker and write them to this JSON file.
+        unique: None, "worksheet" (no repeated question within a worksheet)
+                or "batch" (also none across the batch until a skill runs
+                low; see uniqueness). Batch mode gives every worker shard a
+                disjoint partition of each skill, so reproducing its output
+                needs the same number of workers. Worksheets skipped on
+                resume are not remembered.
+        bank: Sample questions from the question bank (see question_bank).
+              The output then depends on the bank version as well as the seed.
+        solver: Plan every worksheet's skill distribution up front with
+                distribution_solver (see plan_jobs).
+
+    Returns:
+        BatchResult with counts, elapsed time and errors.
+    """
+    if unique not in (None, "worksheet", "batch"):
+        raise ValueError(f"Invalid uniqueness mode: {unique}. Must be one of: worksheet, batch")
+    if unique is not None and bank:
+        raise ValueError("unique cannot be combined with bank")
+    if root_seed is None:
+        root_seed = int(np.random.SeedSequence().entropy % (2 ** 63))
+    if bank:
+        # Build the bank (if needed) once, before the workers map it
+        open_bank()
+
+    jobs = expand_manifest(manifest)
+    if solver:
+        plan_jobs(jobs, root_seed)
+    result = BatchResult(root_seed=root_seed)
+    metrics = metrics_path is not None
+    if metrics:
+        instrumentation.reset()
+
+    num_workers = workers or os.cpu_count() or 1
+    # Submit in windows so finished worksheets never pile up in memory
+    window = chunksize * num_workers * 4
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool, contextlib.ExitStack() as stack:
+        writer = None
+        if jsonl_path is None:
+            os.makedirs(out_dir, exist_ok=True)
+        else:
+            writer = stack.enter_context(JsonlWriter(jsonl_path, fsync_every=fsync_every))
+            jobs = [job for job in jobs if job_key(job) not in writer.completed]
+            out_dir = None
+
+        def handle(job, line, error, job_metrics):
+            if job_metrics is not None:
+                instrumentation.merge(job_metrics)
+            if error is None:
+                if writer is not None:
+                    writer.write_line(line, key=job_key(job))
+                result.built += 1
+            else:
+                result.failed += 1
+                result.errors.append((job, error))
+
+        if unique == "batch":
+            trackers = [UniquenessTracker(partition=(w, num_workers)) for w in range(num_workers)]
+            for batch in _windows(jobs, window):
+                shards = [[job for job in batch if job.index % num_workers == w] for w in range(num_workers)]
+                tasks = [(shards[w], trackers[w], root_seed, out_dir, metrics) for w in range(num_workers)]
+                outputs = {}
+                for w, (shard_results, tracker) in enumerate(pool.map(_run_shard, tasks)):
+                    trackers[w] = tracker
+                    outputs.update((job.index, res) for job, res in zip(shards[w], shard_results))
+                for job in batch:
+                    handle(job, *outputs[job.index])
+        else:
+            for batch in _windows(jobs, window):
+                tasks = [(job, root_seed, out_dir, metrics, unique == "worksheet", bank) for job in batch]
+                for job, res in zip(batch, pool.map(_run_job, tasks, chunksize=chunksize)):
+                    handle(job, *res)
+    result.elapsed = time.perf_counter() - start
+
+    if metrics:
+        instrumentation.dump(metrics_path)
+
+    return result
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Build worksheets for every student in a manifest.")
+    parser.add_argument("manifest", help="CSV or JSON manifest with student_id, level, language, count")
+    parser.add_argument("--out", default="generated", help="Output directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=None, help="Batch root seed (default: random)")
+    parser.add_argument("--chunksize", type=int, default=16, help="Jobs sent to a worker at a time")
+    parser.add_argument("--jsonl", default=None, help="Stream worksheets into this JSONL (.gz for gzip) file")
+    parser.add_argument("--fsync-every", type=int, default=100, help="Records between fsyncs of the JSONL file")
+    parser.add_argument("--metrics", default=None, help="Write per-stage timings and counters to this JSON file")
+    parser.add_argument("--unique", choices=["worksheet", "batch"], default=None,
+                        help="Avoid repeated questions within each worksheet, or across the whole batch")
+    parser.add_argument("--bank", action="store_true",
+                        help="Sample questions from the memory-mapped question bank")
+    parser.add_argument("--solver", action="store_true",
+                        help="Plan skill distributions with the vectorized distribution solver")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest(args.manifest)
+    result = run_batch(manifest, out_dir=args.out, workers=args.workers,
+                       root_seed=args.seed, chunksize=args.chunksize,
+                       jsonl_path=args.jsonl, fsync_every=args.fsync_every,
+                       metrics_path=args.metrics, unique=args.unique, bank=args.bank,
+                       solver=args.solver)
+
+    for job, error in result.errors:
+        print(f"Failed: {job_filename(job)}: {error}")
+    print(f"Built {result.built} worksheets ({result.failed} failed) in {result.elapsed:.2f}s "
+          f"= {result.worksheets_per_sec:.1f} worksheets/sec (seed {result.root_seed})")
+
+
+if __name__ == "__main__":
+    main()
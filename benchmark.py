@@ -0,0 +1,304 @@
+"""
+Benchmark suite for the generation pipeline.
+
+Measures throughput of every stage a worksheet goes through:
+- questions/sec for every skill in generate._gen_map (one question per call,
+  as the worksheet builder does, and bulk via gen_questions_array)
+- distractors/sec for every skill in distractors._distractors_map
+- worksheets/sec through create_worksheet_json for levels A-G in en and mr
+- serialization: JSON encoding and JSONL (plain and gzip) writes
+
+Results are written as JSON together with the commit, Python/NumPy versions
+and machine details, so runs can be compared across commits with --compare.
+
+Usage:
+    python benchmark.py                          # writes benchmark_results/<commit>.json
+    python benchmark.py --quick --only generate,distractors
+    python benchmark.py --out new.json --compare benchmark_results/abc1234.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+import distractors
+import generate
+from create_worksheet import WORKSHEET_LEVEL_DISTRIBUTIONS, create_worksheet_json
+from jsonl_writer import JsonlWriter
+
+GROUPS = ("generate", "distractors", "worksheets", "serialization")
+
+RESULTS_DIR = Path(__file__).parent / "benchmark_results"
+
+
+def _measure(fn, items_per_call: int, min_time: float, repeat: int) -> dict:
+    """
+    Call fn repeatedly for `repeat` rounds of at least min_time seconds each.
+
+    Returns:
+        dict with best and median items/sec across rounds, and the number of calls made.
+    """
+    fn()  # warm-up: lazy enumeration, caches, imports
+    rates = []
+    calls = 0
+    for _ in range(repeat):
+        n = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            n += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        rates.append(n * items_per_call / elapsed)
+        calls += n
+    return {
+        "best": max(rates),
+        "median": statistics.median(rates),
+        "calls": calls,
+    }
+
+
+def _result(group: str, name: str, unit: str, stats: dict, **extra) -> dict:
+    return {"group": group, "name": name, "unit": unit, **stats, **extra}
+
+
+def bench_generate(min_time: float, repeat: int, seed: int) -> list:
+    """Questions/sec for every skill code, single draws and bulk draws."""
+    results = []
+    bulk = 10_000
+    for code, gen in generate._gen_map.items():
+        stats = _measure(gen, 1, min_time, repeat)
+        results.append(_result("generate", code, "questions/s", stats, mode="single"))
+
+        rng = np.random.default_rng(seed)
+        stats = _measure(lambda: generate.gen_questions_array(code, bulk, rng=rng), bulk, min_time, repeat)
+        results.append(_result("generate", code, "questions/s", stats, mode="bulk"))
+    return results
+
+
+def bench_distractors(min_time: float, repeat: int, seed: int) -> list:
+    """Distractors/sec for every skill code through build_distractors."""
+    results = []
+    for code in distractors._distractors_map:
+        records = generate.gen_records(code, 256, rng=seed)
+
+        def run(records=records, code=code):
+            for record in records:
+                distractors.build_distractors(code, record, record.correct_ans, needed=3)
+
+        stats = _measure(run, len(records) * 3, min_time, repeat)
+        results.append(_result("distractors", code, "distractors/s", stats))
+    return results
+
+
+def bench_worksheets(min_time: float, repeat: int, seed: int) -> list:
+    """Worksheets/sec through create_worksheet_json for every level and language."""
+    results = []
+    for language in ("en", "mr"):
+        for level in WORKSHEET_LEVEL_DISTRIBUTIONS:
+            rng = np.random.default_rng(seed)
+
+            def run(level=level, language=language, rng=rng):
+                create_worksheet_json(title=f"Worksheet Level {level}", level=level, language=language, rng=rng)
+
+            stats = _measure(run, 1, min_time, repeat)
+            results.append(_result("worksheets", f"{level}-{language}", "worksheets/s", stats))
+    return results
+
+
+def bench_serialization(min_time: float, repeat: int, seed: int) -> list:
+    """Worksheets/sec for JSON encoding and JSONL writes."""
+    rng = np.random.default_rng(seed)
+    sheets = [
+        create_worksheet_json(title=f"Worksheet Level {level}", level=level, language=language, rng=rng)
+        for language in ("en", "mr")
+        for level in WORKSHEET_LEVEL_DISTRIBUTIONS
+    ]
+    lines = [json.dumps(sheet, ensure_ascii=False) for sheet in sheets]
+    bytes_per_sheet = sum(len(line.encode("utf-8")) for line in lines) / len(lines)
+
+    results = []
+
+    def dumps_indented():
+        for sheet in sheets:
+            json.dumps(sheet, indent=2, ensure_ascii=False)
+
+    stats = _measure(dumps_indented, len(sheets), min_time, repeat)
+    results.append(_result("serialization", "json_indent", "worksheets/s", stats))
+
+    def dumps_compact():
+        for sheet in sheets:
+            json.dumps(sheet, ensure_ascii=False)
+
+    stats = _measure(dumps_compact, len(sheets), min_time, repeat)
+    results.append(_result("serialization", "json_compact", "worksheets/s", stats,
+                           bytes_per_worksheet=bytes_per_sheet))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("jsonl", "jsonl.gz"):
+            path = os.path.join(tmp, f"bench.{name}")
+
+            def write(path=path):
+                with JsonlWriter(path, fsync_every=0, resume=False) as writer:
+                    for i, line in enumerate(lines):
+                        writer.write_line(line, key=i)
+
+            stats = _measure(write, len(lines), min_time, repeat)
+            results.append(_result("serialization", f"write_{name}", "worksheets/s", stats,
+                                   bytes_per_worksheet=os.path.getsize(path) / len(lines)))
+    return results
+
+
+_benchmarks = {
+    "generate": bench_generate,
+    "distractors": bench_distractors,
+    "worksheets": bench_worksheets,
+    "serialization": bench_serialization,
+}
+
+
+def _git_commit() -> tuple:
+    """Return (short commit hash, dirty flag), or (None, None) outside a git checkout."""
+    cwd = Path(__file__).parent
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=cwd,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def run_benchmarks(groups=GROUPS, min_time: float = 0.2, repeat: int = 3, seed: int = 0) -> dict:
+    """
+    Run the selected benchmark groups.
+
+    Args:
+        groups: Names from GROUPS to run.
+        min_time: Minimum seconds per timing round.
+        repeat: Timing rounds per benchmark; best and median are reported.
+        seed: Seed for the questions and worksheets being measured.
+
+    Returns:
+        dict with run metadata under "meta" and a list of results under "results".
+    """
+    commit, dirty = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "distractor_tables": distractors.USE_DISTRACTOR_TABLES,
+            "min_time": min_time,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": [],
+    }
+    # The pipeline prints recoverable errors; keep them out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for group in groups:
+            if group not in _benchmarks:
+                raise ValueError(f"Unknown benchmark group: {group}. Must be one of: {', '.join(GROUPS)}")
+            report["results"].extend(_benchmarks[group](min_time, repeat, seed))
+    return report
+
+
+def _result_key(result: dict) -> tuple:
+    return result["group"], result["name"], result.get("mode")
+
+
+def compare(report: dict, baseline: dict, threshold: float = 0.1) -> list:
+    """
+    Compare best throughput against a baseline report.
+
+    Args:
+        report: Report from run_benchmarks.
+        baseline: An earlier report.
+        threshold: Relative slowdown beyond which a result counts as a regression.
+
+    Returns:
+        List of (result, baseline_result, ratio, regressed) for results present in both.
+    """
+    previous = {_result_key(r): r for r in baseline["results"]}
+    rows = []
+    for result in report["results"]:
+        old = previous.get(_result_key(result))
+        if old is None or not old["best"]:
+            continue
+        ratio = result["best"] / old["best"]
+        rows.append((result, old, ratio, ratio < 1 - threshold))
+    return rows
+
+
+def _label(result: dict) -> str:
+    mode = f" ({result['mode']})" if result.get("mode") else ""
+    return f"{result['group']}/{result['name']}{mode}"
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the worksheet generation pipeline.")
+    parser.add_argument("--out", default=None,
+                        help="Results file (default: benchmark_results/<commit>.json)")
+    parser.add_argument("--only", default=",".join(GROUPS),
+                        help=f"Comma-separated groups to run ({', '.join(GROUPS)})")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timing round")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing rounds per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the measured inputs")
+    parser.add_argument("--quick", action="store_true", help="Short rounds for a fast smoke run")
+    parser.add_argument("--compare", default=None, help="Baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown reported as a regression (default 0.1)")
+    args = parser.parse_args(argv)
+
+    min_time, repeat = (0.02, 1) if args.quick else (args.min_time, args.repeat)
+    groups = [g.strip() for g in args.only.split(",") if g.strip()]
+    report = run_benchmarks(groups, min_time=min_time, repeat=repeat, seed=args.seed)
+
+    for result in report["results"]:
+        print(f"{_label(result):<40} {result['best']:>14,.1f} {result['unit']}")
+
+    out = args.out
+    if out is None:
+        name = report["meta"]["commit"] or datetime.now().strftime("%Y%m%d-%H%M%S")
+        if report["meta"]["dirty"]:
+            name += "-dirty"
+        out = RESULTS_DIR / f"{name}.json"
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, threshold=args.threshold)
+        regressions = [row for row in rows if row[3]]
+        print(f"\nCompared with {args.compare} (commit {baseline['meta'].get('commit')}):")
+        for result, old, ratio, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{_label(result):<40} {old['best']:>14,.1f} -> {result['best']:>14,.1f} ({ratio:.2f}x){flag}")
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
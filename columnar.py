@@ -0,0 +1,343 @@
+"""
+Columnar export of worksheets and question banks.
+
+A dataset is a directory of part files, each holding one chunk of rows as
+named columns. The writer buffers rows and writes a new part every
+chunk_rows rows, so appending never rewrites earlier data. Reopening a
+dataset appends after its existing parts. Readers load only the columns
+they ask for and can stream the parts one at a time.
+
+Parts are NPZ files (NumPy only). With pyarrow installed, format="parquet"
+or "arrow" (Feather/Arrow IPC) writes the same columns instead. A dataset
+holds one format only.
+
+Worksheet datasets have one row per question:
+    worksheet_id, index, skill_code, level, language    strings / int
+    first, second                                       operands
+    options, option_remainders                          (rows, 4) ints
+    correct_option                                      0-3 (A-D)
+
+Question bank datasets have one row per bank record (see export_bank).
+
+Example:
+    with ColumnarWriter("term1") as writer:
+        writer.append_worksheet("s001_mr_level_G_1", worksheet_json)
+    read_columns("term1", ["skill_code", "correct_option"])
+
+Usage:
+    python columnar.py export worksheets.jsonl.gz term1 [--format parquet]
+    python columnar.py bank bank_export
+    python columnar.py show term1 --columns skill_code,correct_option
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from grading import worksheet_questions
+from jsonl_writer import read_jsonl
+from models import parse_number
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FORMATS = {"npz": ".npz", "parquet": ".parquet", "arrow": ".arrow"}
+
+# Rows buffered before a part is written
+CHUNK_ROWS = 65536
+
+WORKSHEET_COLUMNS = ("worksheet_id", "index", "skill_code", "level", "language", "first", "second",
+                     "options", "option_remainders", "correct_option")
+
+_LETTERS = "ABCD"
+
+
+def _part_format(path: Path) -> str:
+    for name, suffix in FORMATS.items():
+        if path.name.endswith(suffix):
+            return name
+    raise ValueError(f"Not a dataset part: {path}")
+
+
+def list_parts(path) -> list:
+    """Part files of a dataset, in write order."""
+    path = Path(path)
+    if not path.is_dir():
+        return []
+    return sorted(p for p in path.iterdir() if p.name.startswith("part-") and p.suffix in FORMATS.values())
+
+
+def _require_pyarrow(fmt: str):
+    if fmt != "npz" and pa is None:
+        raise ValueError(f"Format {fmt} needs pyarrow; install it or use npz")
+
+
+def _to_table(columns: dict):
+    """Columns -> pyarrow Table; 2-D columns become fixed-size lists."""
+    arrays = {}
+    for name, values in columns.items():
+        if values.ndim == 2:
+            flat = pa.array(values.reshape(-1))
+            arrays[name] = pa.FixedSizeListArray.from_arrays(flat, values.shape[1])
+        else:
+            arrays[name] = pa.array(values)
+    return pa.table(arrays)
+
+
+def _from_table(table) -> dict:
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name).combine_chunks()
+        if pa.types.is_fixed_size_list(column.type):
+            width = column.type.list_size
+            columns[name] = column.flatten().to_numpy(zero_copy_only=False).reshape(-1, width)
+        else:
+            columns[name] = column.to_numpy(zero_copy_only=False)
+            if columns[name].dtype == object:
+                columns[name] = columns[name].astype(str)
+    return columns
+
+
+def write_part(path, columns: dict, fmt: str = "npz", compress: bool = True):
+    """Write one part file atomically."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    if fmt == "npz":
+        with open(tmp, "wb") as f:
+            (np.savez_compressed if compress else np.savez)(f, **columns)
+    elif fmt == "parquet":
+        pq.write_table(_to_table(columns), tmp, compression="zstd" if compress else "none")
+    else:
+        feather.write_feather(_to_table(columns), tmp, compression="zstd" if compress else "uncompressed")
+    os.replace(tmp, path)
+
+
+def read_part(path, columns: list = None) -> dict:
+    """Read the selected columns (default: all) of one part file."""
+    path = Path(path)
+    fmt = _part_format(path)
+    if fmt == "npz":
+        # NpzFile decompresses a member only when it is accessed
+        with np.load(path) as data:
+            names = data.files if columns is None else columns
+            return {name: data[name] for name in names}
+    _require_pyarrow(fmt)
+    if fmt == "parquet":
+        return _from_table(pq.read_table(path, columns=columns))
+    return _from_table(feather.read_table(path, columns=columns))
+
+
+class ColumnarWriter:
+    """
+    Chunked, append-only writer for a columnar dataset directory.
+
+    Args:
+        path: Dataset directory (created if missing).
+        fmt: "npz", "parquet" or "arrow"; defaults to the format of the
+             existing parts, else npz.
+        chunk_rows: Rows per part file.
+        compress: Compress parts (zlib for npz, zstd for Arrow formats).
+    """
+
+    def __init__(self, path, fmt: str = None, chunk_rows: int = CHUNK_ROWS, compress: bool = True):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        parts = list_parts(self.path)
+        existing = {_part_format(p) for p in parts}
+        if fmt is None:
+            fmt = existing.pop() if existing else "npz"
+        if fmt not in FORMATS:
+            raise ValueError(f"Invalid format: {fmt}. Must be one of: {', '.join(FORMATS)}")
+        if existing - {fmt}:
+            raise ValueError(f"{self.path} already holds {', '.join(existing)} parts")
+        _require_pyarrow(fmt)
+        self.fmt = fmt
+        self.chunk_rows = chunk_rows
+        self.compress = compress
+        self._next_part = int(parts[-1].name.split("-")[1].split(".")[0]) + 1 if parts else 0
+        self._buffer = {}
+        self._buffered = 0
+        self.rows_written = 0
+        self.parts_written = 0
+
+    def append(self, columns: dict):
+        """
+        Buffer a block of rows given as equally long column arrays or lists.
+
+        Every block must have the same column names.
+        """
+        if self._buffer and set(columns) != set(self._buffer):
+            raise ValueError(f"Columns {sorted(columns)} do not match {sorted(self._buffer)}")
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns of a block must have the same length")
+        for name, values in columns.items():
+            self._buffer.setdefault(name, []).append(np.asarray(values))
+        self._buffered += lengths.pop() if lengths else 0
+        if self._buffered >= self.chunk_rows:
+            self.flush()
+
+    def append_worksheet(self, worksheet_id: str, worksheet):
+        """Append one worksheet (any layout accepted by grading) as one row per question."""
+        self.append(worksheet_columns(worksheet_id, worksheet))
+
+    def flush(self):
+        """Write the buffered rows as new part file(s) of at most chunk_rows rows."""
+        if not self._buffered:
+            return
+        columns = {name: np.concatenate(blocks) for name, blocks in self._buffer.items()}
+        for start in range(0, self._buffered, self.chunk_rows):
+            part = {name: values[start:start + self.chunk_rows] for name, values in columns.items()}
+            write_part(self.path / f"part-{self._next_part:06d}{FORMATS[self.fmt]}", part,
+                       self.fmt, self.compress)
+            self._next_part += 1
+            self.parts_written += 1
+        self.rows_written += self._buffered
+        self._buffer = {}
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_columns(path, columns: list = None):
+    """Yield the selected columns of a dataset one part at a time."""
+    for part in list_parts(path):
+        yield read_part(part, columns)
+
+
+def read_columns(path, columns: list = None) -> dict:
+    """Read the selected columns (default: all) of a whole dataset into arrays."""
+    chunks = list(iter_columns(path, columns))
+    if not chunks:
+        return {}
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+def worksheet_columns(worksheet_id: str, worksheet) -> dict:
+    """
+    One worksheet's questions as columns (see WORKSHEET_COLUMNS).
+
+    Args:
+        worksheet: Worksheet JSON in any layout accepted by grading; options
+                   and question text may be in any supported script.
+    """
+    if isinstance(worksheet, list) and worksheet and isinstance(worksheet[0], dict) and "questions" in worksheet[0]:
+        meta = worksheet[0]
+    else:
+        meta = worksheet if isinstance(worksheet, dict) else {}
+    questions = worksheet_questions(worksheet)
+    n = len(questions)
+
+    first = np.empty(n, dtype=np.int32)
+    second = np.empty(n, dtype=np.int32)
+    options = np.zeros((n, 4), dtype=np.int32)
+    option_remainders = np.zeros((n, 4), dtype=np.int16)
+    correct = np.empty(n, dtype=np.uint8)
+    for i, q in enumerate(questions):
+        terms = q["question_text"].split()
+        first[i] = parse_number(terms[0])[0]
+        second[i] = parse_number(terms[-1])[0]
+        for j, option in enumerate(q["options"][:4]):
+            options[i, j], option_remainders[i, j] = parse_number(option)
+        correct[i] = _LETTERS.index(q["correct_option"])
+
+    return {
+        "worksheet_id": np.full(n, worksheet_id),
+        "index": np.array([q.get("index", i + 1) for i, q in enumerate(questions)], dtype=np.int16),
+        "skill_code": np.array([q["skill_code"] for q in questions], dtype=str),
+        "level": np.full(n, str(meta.get("level", ""))),
+        "language": np.full(n, str(meta.get("language", ""))),
+        "first": first,
+        "second": second,
+        "options": options,
+        "option_remainders": option_remainders,
+        "correct_option": correct,
+    }
+
+
+def export_jsonl(jsonl_path: str, path, fmt: str = None, chunk_rows: int = CHUNK_ROWS) -> int:
+    """
+    Append every worksheet of a batch.py JSONL (.gz) file to a dataset.
+
+    Returns:
+        Rows written.
+    """
+    with ColumnarWriter(path, fmt=fmt, chunk_rows=chunk_rows) as writer:
+        for record in read_jsonl(jsonl_path):
+            writer.append_worksheet(record["id"], record["worksheet"])
+    return writer.rows_written
+
+
+def export_bank(bank, path, fmt: str = None, chunk_rows: int = CHUNK_ROWS) -> int:
+    """
+    Write a question_bank.QuestionBank as a dataset, one row per record.
+
+    Columns: skill_code, difficulty, first, second, answer, remainder,
+    num_distractors, distractors and distractor_remainders ((rows, width),
+    zero-padded past num_distractors).
+
+    Returns:
+        Rows written.
+    """
+    codes = np.array(bank.skill_codes, dtype=str)
+    with ColumnarWriter(path, fmt=fmt, chunk_rows=chunk_rows) as writer:
+        for start in range(0, len(bank), chunk_rows):
+            rows = bank.records[start:start + chunk_rows]
+            block = {name: np.asarray(rows[name]) for name in rows.dtype.names if name != "code"}
+            block["skill_code"] = codes[rows["code"]]
+            writer.append(block)
+    return writer.rows_written
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Columnar export of worksheets and question banks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Append a batch.py JSONL file to a dataset")
+    export.add_argument("jsonl", help="Worksheets JSONL (.gz) file")
+    export.add_argument("path", help="Dataset directory")
+    export.add_argument("--format", choices=list(FORMATS), default=None, help="Part format (default: npz)")
+    export.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows per part file")
+
+    bank = sub.add_parser("bank", help="Export the current question bank")
+    bank.add_argument("path", help="Dataset directory")
+    bank.add_argument("--format", choices=list(FORMATS), default=None, help="Part format (default: npz)")
+
+    show = sub.add_parser("show", help="Print a dataset's size and its first rows")
+    show.add_argument("path", help="Dataset directory")
+    show.add_argument("--columns", default=None, help="Comma-separated columns to read")
+    show.add_argument("--rows", type=int, default=5, help="Rows to print")
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        rows = export_jsonl(args.jsonl, args.path, args.format, args.chunk_rows)
+        print(f"Wrote {rows} rows to {args.path}")
+    elif args.command == "bank":
+        from question_bank import open_bank
+        rows = export_bank(open_bank(), args.path, args.format)
+        print(f"Wrote {rows} rows to {args.path}")
+    else:
+        columns = args.columns.split(",") if args.columns else None
+        data = read_columns(args.path, columns)
+        total = len(next(iter(data.values()))) if data else 0
+        print(f"{args.path}: {len(list_parts(args.path))} parts, {total} rows")
+        for i in range(min(args.rows, total)):
+            print(json.dumps({name: values[i].tolist() for name, values in data.items()}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
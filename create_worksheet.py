@@ -4,11 +4,15 @@ Saves the worksheet to a JSON file.
 """
 
 import json
-import random
 import generate
 import distractors
-from utils import number_to_letter, question_to_marathi
+import instrumentation
+from utils import localize_question, number_to_letter
+from locales import get_locale
 from models import Question
+from seeding import RNGLike, get_rng
+from skill_catalog import get_catalog
+from uniqueness import UniquenessTracker
 
 # Worksheet levels map to difficulty level distributions
 # Keys are difficulty levels, values are proportions of 20 questions
@@ -23,13 +27,31 @@ WORKSHEET_LEVEL_DISTRIBUTIONS = {
 }
 
 
-def create_worksheet(skill_distribution: dict = None, language: str = "en") -> list:
+def create_worksheet(skill_distribution: dict = None, language: str = "en", rng: RNGLike = None,
+                     unique=None, reservoir=None, bank=None, total: int = 20) -> list:
     """
     Create a 20-question worksheet with questions and distractors.
     
     Args:
         skill_distribution: Dict mapping skill_code to number of questions.
                            If None, uses a default distribution.
+        total: Number of questions skill_distribution must add up to
+               (e.g. for distribution_solver allocations of other sizes).
+        rng: Optional int seed or numpy Generator. The same seed always
+             produces the same worksheet.
+        unique: True for no repeated questions within the worksheet, or a
+                uniqueness.UniquenessTracker shared between worksheets to
+                also avoid repeats across them.
+        language: Language of the returned questions. Questions are built
+                  with ASCII digits and only the final text and chosen
+                  options are translated; pass "en" and render with
+                  render_worksheet_json to produce several languages.
+        reservoir: Optional reservoir.QuestionReservoir to dequeue pre-built
+                   questions and distractor candidates from. The questions
+                   then do not depend on rng; cannot be combined with unique.
+        bank: Optional question_bank.QuestionBank to sample questions and
+              distractor candidates from (seeded by rng); cannot be combined
+              with unique or reservoir.
     
     Returns:
         List of Question objects with chosen distractors.
@@ -50,79 +72,104 @@ def create_worksheet(skill_distribution: dict = None, language: str = "en") -> l
             "2D1": 0,
         }
     
-    # Verify total is 20
-    total = sum(skill_distribution.values())
-    if total != 20:
-        raise ValueError(f"Skill distribution must sum to 20, got {total}")
-    
+    # Verify the total (20 by default)
+    distribution_total = sum(skill_distribution.values())
+    if distribution_total != total:
+        raise ValueError(f"Skill distribution must sum to {total}, got {distribution_total}")
+    
+    get_locale(language)
+    rng = get_rng(rng)
+    if unique is True:
+        unique = UniquenessTracker(across_worksheets=False)
+    elif unique is False:
+        unique = None
+    if reservoir is not None and bank is not None:
+        raise ValueError("reservoir and bank cannot be combined")
+    if unique is not None:
+        if reservoir is not None or bank is not None:
+            raise ValueError("unique cannot be combined with a reservoir or bank")
+        unique.start_worksheet()
     worksheet = []
     question_index = 1
     
     for skill_code, num_questions in skill_distribution.items():
-        # Generate raw questions
-        raw_questions = generate.gen_questions(skill_code, num_questions)
+        if reservoir is not None:
+            # Pre-built questions with their distractor candidates
+            with instrumentation.timer("reservoir"):
+                items = reservoir.take(skill_code, num_questions, rng=rng)
+        elif bank is not None:
+            # Questions sampled from the memory-mapped bank
+            with instrumentation.timer("bank"):
+                items = bank.take(skill_code, num_questions, rng=rng)
+        else:
+            # Generate raw questions
+            with instrumentation.timer("generate"):
+                if unique is not None:
+                    records = unique.draw(skill_code, num_questions, rng=rng)
+                else:
+                    records = generate.gen_records(skill_code, num_questions, rng=rng)
+            instrumentation.count("generate.draws", skill_code, num_questions)
+            items = [(record, None) for record in records]
         
-        for question_text, correct_ans in raw_questions:
-            # Handle tuple answers (quotient, remainder) for division problems
-            if isinstance(correct_ans, tuple):
-                quotient, remainder = correct_ans
-                correct_ans = f"{quotient}R{remainder}"
+        for record, possible_distractors in items:
+            # int, or "QRr" for division problems with remainder
+            correct_ans = record.correct_ans
             
-            possible_distractors = distractors.build_distractors(
-                skill_code=skill_code,
-                question=question_text,
-                correct_ans=correct_ans,
-                needed=3,
-            )
+            if possible_distractors is None:
+                with instrumentation.timer("distractors"):
+                    possible_distractors = distractors.build_distractors(
+                        skill_code=skill_code,
+                        question=record,
+                        correct_ans=correct_ans,
+                        needed=3,
+                    )
             
             # Create Question object
             question = Question(
                 index=question_index,
-                question_text=question_text,
+                question_text=record.text,
                 skill_code=skill_code,
                 options=[correct_ans],  # Will be replaced by choose_distractors
                 answer=1,  # Will be updated by choose_distractors
-                possible_distractors=possible_distractors
+                possible_distractors=possible_distractors,
+                record=record,
             )
 
-            if language == "mr":
-                question = question_to_marathi(question)
-            
             # Choose distractors and randomize positions
-            question.choose_distractors()
+            with instrumentation.timer("choose_distractors"):
+                question.choose_distractors(rng=rng)
             
             # Convert answer from 1-4 to A-D
             question.correct_option = number_to_letter(question.answer)
             
+            if language != "en":
+                question = localize_question(question, language)
+            
             worksheet.append(question)
             question_index += 1
     
     return worksheet
 
 
-def create_difficulty_distribution(difficulty_level: int) -> dict:
+def create_difficulty_distribution(difficulty_level: int, rng: RNGLike = None) -> dict:
     """
     Create a random skill distribution for a given difficulty level.
     
     Args:
         difficulty_level: Difficulty level (1-7) as specified in skills.json
+        rng: Optional int seed or numpy Generator.
     
     Returns:
         Dict mapping skill_code to number of questions, summing to 20.
     """
-    # Load skills from skills.json
-    with open("skills.json", "r") as f:
-        skills = json.load(f)
+    # Skill codes at this difficulty level, from the shared skills catalog
+    skill_codes = get_catalog().codes_at(difficulty_level)
     
-    # Filter skills by difficulty level (stored as string in skills.json)
-    skills_at_level = [s for s in skills if s["difficulty_level"] == str(difficulty_level)]
-    
-    if not skills_at_level:
+    if not skill_codes:
         raise ValueError(f"No skills found at difficulty level {difficulty_level}")
     
-    # Get skill codes
-    skill_codes = [s["code"] for s in skills_at_level]
-    
+    rng = get_rng(rng)
+
     # Create random distribution summing to 20
     distribution = {}
     remaining = 20
@@ -131,7 +178,7 @@ def create_difficulty_distribution(difficulty_level: int) -> dict:
     for i, skill_code in enumerate(skill_codes[:-1]):
         # Ensure at least 1 question per remaining skill
         max_questions = remaining - (len(skill_codes) - i - 1)
-        num_questions = random.randint(1, max_questions)
+        num_questions = int(rng.integers(1, max_questions + 1))
         distribution[skill_code] = num_questions
         remaining -= num_questions
     
@@ -142,7 +189,7 @@ def create_difficulty_distribution(difficulty_level: int) -> dict:
     return distribution
 
 
-def create_worksheet_level_distribution(worksheet_level: str) -> dict:
+def create_worksheet_level_distribution(worksheet_level: str, rng: RNGLike = None) -> dict:
     """
     Create a skill distribution for a worksheet level (A-G).
     
@@ -157,18 +204,18 @@ def create_worksheet_level_distribution(worksheet_level: str) -> dict:
     
     Args:
         worksheet_level: Worksheet level letter (A-G)
+        rng: Optional int seed or numpy Generator.
     
     Returns:
         Dict mapping skill_code to number of questions, summing to 20.
     """
-    # Load skills from skills.json
-    with open("skills.json", "r") as f:
-        skills = json.load(f)
+    catalog = get_catalog()
     
     if worksheet_level not in WORKSHEET_LEVEL_DISTRIBUTIONS:
         valid_levels = ", ".join(WORKSHEET_LEVEL_DISTRIBUTIONS.keys())
         raise ValueError(f"Invalid worksheet level: {worksheet_level}. Must be one of: {valid_levels}")
     
+    rng = get_rng(rng)
     difficulty_distribution = WORKSHEET_LEVEL_DISTRIBUTIONS[worksheet_level]
     skill_distribution = {}
     
@@ -194,13 +241,11 @@ def create_worksheet_level_distribution(worksheet_level: str) -> dict:
             continue
         
         # Get skills at this difficulty level
-        skills_at_level = [s for s in skills if s["difficulty_level"] == str(difficulty_level)]
+        skill_codes = catalog.codes_at(difficulty_level)
         
-        if not skills_at_level:
+        if not skill_codes:
             raise ValueError(f"No skills found at difficulty level {difficulty_level}")
         
-        skill_codes = [s["code"] for s in skills_at_level]
-        
         # Randomly distribute questions among skills at this level
         remaining = num_questions
         
@@ -210,7 +255,7 @@ def create_worksheet_level_distribution(worksheet_level: str) -> dict:
             
             # Ensure at least 1 question per remaining skill
             max_for_skill = remaining - (len(skill_codes) - i - 2)
-            questions_for_skill = random.randint(1, max(1, max_for_skill))
+            questions_for_skill = int(rng.integers(1, max(1, max_for_skill) + 1))
             
             if questions_for_skill > 0:
                 skill_distribution[skill_code] = questions_for_skill
@@ -227,69 +272,124 @@ def create_worksheet_level_distribution(worksheet_level: str) -> dict:
     return skill_distribution
 
 
+def render_worksheet_json(name: str, worksheet: list, level: str, languages: list) -> dict:
+    """
+    Render one worksheet in several languages in a single pass over its questions.
+    
+    Question text and the chosen options are translated into each
+    language's digits here, at serialization time (see locales).
+    
+    Args:
+        worksheet: List of Question objects
+        languages: Language codes (e.g. ["en", "mr"])
+    
+    Returns:
+        Dict mapping each language to its worksheet JSON (as worksheet_to_json)
+    """
+    locales = [get_locale(language) for language in dict.fromkeys(languages)]
+    questions = {locale.code: [] for locale in locales}
+    
+    with instrumentation.timer("render"):
+        for q in worksheet:
+            options = [str(opt) for opt in q.options]
+            for locale in locales:
+                questions[locale.code].append({
+                    "index": q.index,
+                    "question_text": locale.render(q.question_text),
+                    "skill_code": q.skill_code,
+                    "options": [locale.render(opt) for opt in options],
+                    # answer is already a letter (A-D) from create_worksheet
+                    "correct_option": q.correct_option
+                })
+    
+    return {
+        locale.code: [
+            {
+                "title": name,
+                "level": level,
+                "language": locale.code,
+                "questions": questions[locale.code]
+            }
+        ]
+        for locale in locales
+    }
+
+
 def worksheet_to_json(name: str, worksheet: list, level: str, language: str) -> list:
     """
     Convert worksheet to JSON-serializable format matching example_worksheet.json template.
     
     Args:
         worksheet: List of Question objects
+        language: Language code the text and options are rendered in
     
     Returns:
-        List with [{"answerKey": [...]}, [...questions...]]
+        List with [{"title": ..., "level": ..., "language": ..., "questions": [...]}]
     """
-    questions = []
-    answer_key = []
-    
-    for q in worksheet:
-        # answer is already a letter (A-D) from create_worksheet
-        answer_letter = q.correct_option
-        
-        questions.append({
-            "index": q.index,
-            "question_text": q.question_text,
-            "skill_code": q.skill_code,
-            "options": [str(opt) for opt in q.options],
-            "correct_option": answer_letter
-        })
-        answer_key.append(answer_letter)
-    
-    return [
-        {
-            "title": name,
-            "level": level,
-            "language": language,
-            "questions": questions
-        }
-    ]
+    return render_worksheet_json(name, worksheet, level, [language])[language]
 
 
-def save_worksheet(worksheet_data: list, filepath: str = "worksheet.json"):
+def save_worksheet(worksheet_data: list, filepath: str = "worksheet.json", verbose: bool = True):
     """
     Save worksheet data to JSON file.
     
     Args:
         worksheet_data: List with [{"answerKey": [...]}, [...questions...]]
         filepath: Output file path
+        verbose: Print the saved path
     """
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump(worksheet_data, f, indent=2, ensure_ascii=False)
-    print(f"Worksheet saved to {filepath}")
+    if verbose:
+        print(f"Worksheet saved to {filepath}")
 
-def create_worksheet_json(title: str, level: str, language: str) -> list:
+def create_worksheet_json(title: str, level: str, language: str, rng: RNGLike = None, unique=None,
+                          reservoir=None, bank=None, distribution: dict = None) -> list:
     """
     Create a worksheet JSON structure from level and language.
     
     Args:
         title: Title of the worksheet
         level: Worksheet level (A-G)
-        language: Language code (e.g., "en", "mr")
+        language: Language code (e.g., "en", "mr"; see locales.DIGITS)
+        rng: Optional int seed or numpy Generator. A worksheet can be rebuilt
+             from (level, language, seed) alone; use seeding.worksheet_rng to
+             derive per-worksheet streams from a batch root seed.
+        unique: True or a uniqueness.UniquenessTracker; see create_worksheet.
+        reservoir: Optional reservoir.QuestionReservoir; see create_worksheet.
+        bank: Optional question_bank.QuestionBank; see create_worksheet.
+        distribution: Optional skill distribution planned elsewhere (e.g. by
+                      distribution_solver); if None, one is drawn for level.
     
     Returns:
         List as per worksheet JSON schema.
     """
-    distribution = create_worksheet_level_distribution(level)
-    worksheet = create_worksheet(skill_distribution=distribution, language=language)
-    worksheet_json = worksheet_to_json(name=title, worksheet=worksheet, level=level, language=language)
+    return create_worksheet_json_multi(title, level, [language], rng=rng, unique=unique,
+                                       reservoir=reservoir, bank=bank, distribution=distribution)[language]
+
+
+def create_worksheet_json_multi(title: str, level: str, languages: list, rng: RNGLike = None,
+                                unique=None, reservoir=None, bank=None, distribution: dict = None) -> dict:
+    """
+    Create one worksheet and render it in several languages.
+    
+    The questions and options are identical across languages; only their
+    digits differ. For a given seed, each language's output matches
+    create_worksheet_json for that language.
+    
+    Returns:
+        Dict mapping each language code to its worksheet JSON.
+    """
+    for language in languages:
+        get_locale(language)
+    with instrumentation.timer("worksheet"):
+        rng = get_rng(rng)
+        if distribution is None:
+            with instrumentation.timer("distribution"):
+                distribution = create_worksheet_level_distribution(level, rng=rng)
+        worksheet = create_worksheet(skill_distribution=distribution, language="en", rng=rng,
+                                     unique=unique, reservoir=reservoir, bank=bank)
+        worksheet_json = render_worksheet_json(name=title, worksheet=worksheet, level=level, languages=languages)
     return worksheet_json
 
 
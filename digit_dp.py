@@ -0,0 +1,283 @@
+"""
+Digit dynamic-programming engine for carry/borrow skills.
+
+A SkillSpec declares a skill by its operator, operand digit counts and the
+carry/borrow columns it requires. It is compiled into a DigitDPSpace, which
+counts the valid problems exactly and maps every index 0..count-1 to a
+distinct problem (and back). Drawing uniformly is then "pick a random index
+and unrank it", which walks the columns once: the cost is linear in the
+number of digits and does not depend on how rare the pattern is, so 4- and
+5-digit skills are as cheap as 2-digit ones.
+
+Example (4-digit addition with exactly two carries, none out of the top column):
+    space = DigitDPSpace(SkillSpec("+", (4, 4), pattern="0???", min_count=2, max_count=2))
+    len(space), space.sample(5)
+
+DigitDPSpace has the same interface as sampler.OperandSpace, so it can be
+used directly in generate._space_map.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from seeding import RNGLike, get_rng
+
+# Spaces up to this size may be fully materialized by columns()
+MAX_ENUMERATE = 2_000_000
+
+# Spaces up to this size are materialized on first draw and sampled by index,
+# which is faster for bulk draws than unranking every sample
+MAX_CACHED = 1_000_000
+
+
+@dataclass(frozen=True)
+class SkillSpec:
+    """
+    Declarative description of a carry/borrow skill.
+
+    Args:
+        op: "+" (carries), "-" (borrows) or "×" (a one-digit multiplier; a
+            "carry" is a digit product >= 10, as in the multiplication skills).
+        digits: Digit counts of the (first, second) operand. Leading digits
+                are non-zero unless second_leading_zero is set.
+        pattern: Optional per-column requirement, most significant column
+                 first: "1" must carry/borrow, "0" must not, "?" either.
+        min_count: Minimum number of carry/borrow columns.
+        max_count: Maximum number of carry/borrow columns (None for no limit).
+        strict: For "-", require first > second (otherwise first >= second).
+        second_leading_zero: Let the second operand have fewer digits (e.g. 0..999).
+        multipliers: Allowed multipliers for "×".
+    """
+    op: str
+    digits: Tuple[int, int]
+    pattern: Optional[str] = None
+    min_count: int = 0
+    max_count: Optional[int] = None
+    strict: bool = True
+    second_leading_zero: bool = False
+    multipliers: range = range(2, 10)
+
+
+def _digit_choices(pos: int, num_digits: int, leading_zero: bool = False) -> range:
+    """Allowed digits in column pos (0 = units) of an operand with num_digits digits."""
+    if pos >= num_digits:
+        return range(0, 1)
+    if pos == num_digits - 1 and not leading_zero:
+        return range(1, 10)
+    return range(0, 10)
+
+
+class DigitDPSpace:
+    """
+    Exact counting, ranking and uniform sampling of the problems matching a SkillSpec.
+
+    Problems are built in steps (one per column, plus a multiplier step for
+    "×"). Each step maps a state (carry/borrow in, columns counted so far,
+    ...) to its allowed options; DP over the steps gives the number of ways
+    to complete each state, which drives counting, unranking and ranking.
+    """
+
+    def __init__(self, spec: SkillSpec):
+        self.spec = spec
+        self.op = spec.op
+        self._steps = self._build_steps()
+        self._compile()
+        self._a = None
+        self._b = None
+
+    # -- step construction ----------------------------------------------------
+
+    def _column_allowed(self, pos: int, flag: bool, num_columns: int) -> bool:
+        pattern = self.spec.pattern
+        if pattern is None:
+            return True
+        if len(pattern) != num_columns:
+            raise ValueError(f"Pattern {pattern!r} must have {num_columns} columns")
+        required = pattern[num_columns - 1 - pos]
+        return required == "?" or (required == "1") == flag
+
+    def _build_steps(self) -> list:
+        """
+        Return a list of (a_place, b_place, transition) steps, where
+        transition(state) yields (a_digit, b_digit, next_state) options.
+        """
+        spec = self.spec
+        da, db = spec.digits
+        steps = []
+
+        if spec.op in ("+", "-"):
+            num_columns = max(da, db)
+            for pos in range(num_columns):
+                a_digits = _digit_choices(pos, da)
+                b_digits = _digit_choices(pos, db, spec.second_leading_zero)
+
+                def transition(state, pos=pos, a_digits=a_digits, b_digits=b_digits):
+                    carry, count, nonzero = state
+                    for x in a_digits:
+                        for y in b_digits:
+                            if spec.op == "+":
+                                flag = x + y + carry >= 10
+                                digit_nonzero = nonzero
+                            else:
+                                flag = x - carry < y
+                                digit_nonzero = nonzero or (x - carry + 10 * flag - y) != 0
+                            if not self._column_allowed(pos, flag, num_columns):
+                                continue
+                            if spec.max_count is not None and count + flag > spec.max_count:
+                                continue
+                            yield x, y, (int(flag), count + flag, digit_nonzero)
+
+                steps.append((10 ** pos, 10 ** pos, transition))
+
+        elif spec.op == "×":
+            if db != 1:
+                raise ValueError("Multiplication specs need a one-digit second operand")
+
+            def choose_multiplier(state):
+                for m in spec.multipliers:
+                    yield 0, m, (m, 0, False)
+
+            steps.append((0, 1, choose_multiplier))
+            for pos in range(da):
+                a_digits = _digit_choices(pos, da)
+
+                def transition(state, pos=pos, a_digits=a_digits):
+                    m, count, _ = state
+                    for x in a_digits:
+                        flag = x * m >= 10
+                        if not self._column_allowed(pos, flag, da):
+                            continue
+                        if spec.max_count is not None and count + flag > spec.max_count:
+                            continue
+                        yield x, 0, (m, count + flag, False)
+
+                steps.append((10 ** pos, 0, transition))
+
+        else:
+            raise ValueError(f"Unsupported operator: {spec.op}")
+
+        return steps
+
+    def _accept(self, state) -> bool:
+        carry, count, nonzero = state
+        if count < self.spec.min_count:
+            return False
+        if self.spec.op == "-":
+            return carry == 0 and (nonzero or not self.spec.strict)
+        return True
+
+    # -- compilation ----------------------------------------------------------
+
+    def _compile(self):
+        """Enumerate reachable states per step and count completions backwards."""
+        start = (0, 0, False)
+        layers = [[start]]
+        options = []  # options[i][state_index] = [(a_digit, b_digit, next_state_index)]
+        for _, _, transition in self._steps:
+            index = {}
+            step_options = []
+            for state in layers[-1]:
+                out = []
+                for x, y, nxt in transition(state):
+                    if nxt not in index:
+                        index[nxt] = len(index)
+                    out.append((x, y, index[nxt]))
+                step_options.append(out)
+            options.append(step_options)
+            layers.append(list(index))
+
+        ways = [1 if self._accept(state) else 0 for state in layers[-1]]
+        weights = [None] * len(self._steps)
+        for i in range(len(self._steps) - 1, -1, -1):
+            step_weights = [[ways[nxt] for _, _, nxt in out] for out in options[i]]
+            weights[i] = step_weights
+            ways = [sum(w) for w in step_weights]
+
+        self._count = ways[0]
+        if self._count == 0:
+            raise ValueError("Operand space is empty")
+        if self._count >= 2 ** 63:
+            raise ValueError("Operand space too large for 64-bit indices")
+
+        # Per step and state: option digits, next states and cumulative weights
+        self._tables = []
+        for i, step_options in enumerate(options):
+            table = []
+            for out, w in zip(step_options, weights[i]):
+                keep = [j for j, wj in enumerate(w) if wj]
+                table.append((
+                    np.array([out[j][0] for j in keep], dtype=np.int64),
+                    np.array([out[j][1] for j in keep], dtype=np.int64),
+                    np.array([out[j][2] for j in keep], dtype=np.int64),
+                    np.cumsum([w[j] for j in keep], dtype=np.int64),
+                ))
+            self._tables.append(table)
+
+    # -- OperandSpace interface -----------------------------------------------
+
+    def __len__(self) -> int:
+        return self._count
+
+    def unrank(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Map indices in [0, len) to their (a, b) operand pairs, vectorized."""
+        remaining = np.array(indices, dtype=np.int64)
+        states = np.zeros(remaining.shape, dtype=np.int64)
+        a = np.zeros(remaining.shape, dtype=np.int64)
+        b = np.zeros(remaining.shape, dtype=np.int64)
+        for (a_place, b_place, _), table in zip(self._steps, self._tables):
+            next_states = np.empty_like(states)
+            for s in np.unique(states):
+                mask = states == s
+                a_digits, b_digits, nxt, cum = table[s]
+                j = np.searchsorted(cum, remaining[mask], side="right")
+                remaining[mask] -= np.where(j > 0, cum[j - 1], 0)
+                a[mask] += a_digits[j] * a_place
+                b[mask] += b_digits[j] * b_place
+                next_states[mask] = nxt[j]
+            states = next_states
+        return a, b
+
+    def rank(self, a: int, b: int) -> int:
+        """Return the index of the operand pair (a, b); raises ValueError if it is not in the space."""
+        index = 0
+        state = 0
+        for (a_place, b_place, _), table in zip(self._steps, self._tables):
+            x = a // a_place % 10 if a_place else 0
+            y = b // b_place % 10 if b_place else 0
+            a_digits, b_digits, nxt, cum = table[state]
+            hits = np.flatnonzero((a_digits == x) & (b_digits == y))
+            if not hits.size:
+                raise ValueError(f"({a}, {b}) is not in this operand space")
+            j = int(hits[0])
+            index += int(cum[j - 1]) if j else 0
+            state = int(nxt[j])
+        return index
+
+    def pair(self, i: int) -> Tuple[int, int]:
+        """Return the i-th valid operand pair."""
+        a, b = self.unrank(np.array([i]))
+        return int(a[0]), int(b[0])
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return all valid pairs, in index order, as two parallel (read-only) arrays (small spaces only)."""
+        if self._a is None:
+            if self._count > MAX_ENUMERATE:
+                raise ValueError(f"Operand space has {self._count} pairs; too large to enumerate")
+            a, b = self.unrank(np.arange(self._count, dtype=np.int64))
+            a.flags.writeable = False
+            b.flags.writeable = False
+            self._a, self._b = a, b
+        return self._a, self._b
+
+    def take(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the operand pairs at the given indices."""
+        if self._count <= MAX_CACHED:
+            a, b = self.columns()
+            return a[indices], b[indices]
+        return self.unrank(indices)
+
+    def sample(self, n: int, rng: RNGLike = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Draw n operand pairs uniformly at random (with replacement)."""
+        return self.take(get_rng(rng).integers(0, self._count, size=n))
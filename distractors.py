@@ -1,8 +1,22 @@
 # generate distractiors
 # distractor function: takes a number (correct ans) and generates required number of distractors for that number
 
-import random
+import hashlib
+import json
+import os
+from pathlib import Path
 
+import generate
+import instrumentation
+
+# Answer small-domain skills from precomputed tables (see get_distractor_table)
+USE_DISTRACTOR_TABLES = os.getenv("USE_DISTRACTOR_TABLES", "") == "1"
+
+# Skills with at most this many distinct questions get a precomputed table
+TABLE_MAX_QUESTIONS = 5000
+
+# Where precomputed tables are persisted, one JSON file per skill
+DISTRACTOR_TABLE_DIR = Path(__file__).parent / "distractor_tables"
 
 def _is_non_negative_option(value):
     """Return True only for non-negative distractor candidates."""
@@ -26,12 +40,16 @@ def _is_non_negative_option(value):
             return False
     return False
 
-# extract terms from the question string.
+# extract terms from the question (a generate.QuestionRecord, or a question string).
 # also make sure that num1 > num2
 def get_terms(question, correct_ans):
-    terms = question.split()
-    num1 = int(terms[0])
-    num2 = int(terms[-1])
+    if isinstance(question, generate.QuestionRecord):
+        num1 = question.first
+        num2 = question.second
+    else:
+        terms = question.split()
+        num1 = int(terms[0])
+        num2 = int(terms[-1])
     if num1 < num2:
         num1, num2 = num2, num1
     return [num1, num2, int(correct_ans)]
@@ -40,7 +58,6 @@ def get_terms(question, correct_ans):
 # operations used: all except addition and subtraction
 def off_by_one_generic(question, correct_ans, offsets=[-1, 1]):
     distractors = set()
-    random.shuffle(offsets)
     for index, offset in enumerate(offsets):
         distractor = int(correct_ans) + offset
         distractors.add(distractor)
@@ -114,7 +131,6 @@ def add_instead_of(question, correct_ans):
 def one_table_off(question, correct_ans, offsets=[-1, 1]):
     num1, num2, correct_ans = get_terms(question, correct_ans)
     distractors = set()
-    random.shuffle(offsets)
     for index, offset in enumerate(offsets):
         distractor = num1 * (num2 + offset)
         if distractor >= 0:
@@ -139,7 +155,6 @@ def division_errors(question, correct_ans, offsets=[-1, 1]):
     distractors = set()
     
     # Off-by-one errors in the quotient
-    random.shuffle(offsets)
     for offset in offsets:
         distractor = int(correct_ans) + offset
         if distractor >= 0:  # quotient should be non-negative
@@ -199,87 +214,198 @@ def get_nth_digit_string(number, n):
     return int(ch) if ch.isdigit() else None
 
 # mapping from question type to distractor functions
-# mapping from question type to distractor functions
+# each entry is a (misconception name, function) pair; the name labels its distractors in grading
 _distractors_map = {
-    "1A": [lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2])],
-    "1S": [lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2])],
-    "T5": [lambda q, ans: one_table_off(q, ans, offsets=[-2, -1, 1, 2])],
-    "2A1": [lambda q, ans: add_wrong_place_value_addition(q, ans), 
-            lambda q, ans: off_by_one_generic(q, ans)],
-    "2A2": [lambda q, ans: add_wrong_place_value_addition(q, ans), 
-            lambda q, ans: off_by_one_multidigit(q, ans)],
-    "2S1": [lambda q, ans: add_instead_of(q, ans), 
-            lambda q, ans: off_by_one_generic(q, ans)],
-    "1AC": [lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2])],
-    "2A1C": [lambda q, ans: add_wrong_place_value_addition(q, ans), 
-             lambda q, ans: off_by_one_generic(q, ans)],
-    "2A2C": [lambda q, ans: add_wrong_place_value_addition(q, ans), 
-             lambda q, ans: off_by_one_multidigit(q, ans)],
-    "2S1B": [lambda q, ans: add_instead_of(q, ans), 
-             lambda q, ans: off_by_one_generic(q, ans)],
-    "2S2": [lambda q, ans: add_instead_of(q, ans), 
-            lambda q, ans: off_by_one_multidigit(q, ans)],
-    "T10": [lambda q, ans: one_table_off(q, ans, offsets=[-2, -1, 1, 2])],
-    "3A": [lambda q, ans: add_wrong_place_value_addition(q, ans), 
-           lambda q, ans: off_by_one_multidigit(q, ans)],
-    "3AC": [lambda q, ans: add_wrong_place_value_addition(q, ans), 
-            lambda q, ans: off_by_one_multidigit(q, ans)],
-    "3S": [lambda q, ans: add_instead_of(q, ans), 
-           lambda q, ans: off_by_one_multidigit(q, ans)],
-    "2S2B": [lambda q, ans: add_instead_of(q, ans), 
-             lambda q, ans: off_by_one_multidigit(q, ans)],
-    "3AC2": [lambda q, ans: add_wrong_place_value_addition(q, ans), 
-             lambda q, ans: off_by_one_multidigit(q, ans)],
-    "3SB": [lambda q, ans: add_instead_of(q, ans), 
-            lambda q, ans: off_by_one_multidigit(q, ans)],
-    "3SB2": [lambda q, ans: add_instead_of(q, ans), 
-             lambda q, ans: off_by_one_multidigit(q, ans)],
-    "2M1": [lambda q, ans: add_instead_of_multiply(q, ans), 
-            lambda q, ans: off_by_one_generic(q, ans)],
-    "3M1": [lambda q, ans: add_instead_of_multiply(q, ans), 
-            lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2])],
-    "2M1C": [lambda q, ans: add_instead_of_multiply(q, ans), 
-             lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2])],
-    "3M1C": [lambda q, ans: add_instead_of_multiply(q, ans), 
-             lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2])],
-    "3M1C2": [lambda q, ans: add_instead_of_multiply(q, ans), 
-              lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2])],
-    "2M2": [lambda q, ans: add_instead_of_multiply(q, ans), 
-            lambda q, ans: off_by_one_multidigit(q, ans)],
-    "2D1": [lambda q, ans: division_errors(q, ans),
-            lambda q, ans: off_by_one_generic(q, ans)],
-    "3D1": [lambda q, ans: division_errors(q, ans),
-            lambda q, ans: off_by_one_generic(q, ans)],
-    "2M2C": [lambda q, ans: add_instead_of_multiply(q, ans), 
-             lambda q, ans: off_by_one_multidigit(q, ans, offsets=[-2, -1, 1, 2])],
-    "2D1R": [lambda q, ans: division_errors(q, ans),
-             lambda q, ans: off_by_one_generic(q, ans)],
-    "3D1R": [lambda q, ans: division_errors(q, ans),
-             lambda q, ans: off_by_one_generic(q, ans)],
-    "3M2C": [lambda q, ans: add_instead_of_multiply(q, ans), 
-              lambda q, ans: off_by_one_multidigit(q, ans, offsets=[-2, -1, 1, 2])],
-    "3D1Z": [lambda q, ans: division_errors(q, ans),
-             lambda q, ans: off_by_one_generic(q, ans)],
-    "4D1R": [lambda q, ans: division_errors(q, ans),
-             lambda q, ans: off_by_one_generic(q, ans)]
+    "1A": [("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2]))],
+    "1S": [("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2]))],
+    "T5": [("one_table_off", lambda q, ans: one_table_off(q, ans, offsets=[-2, -1, 1, 2]))],
+    "2A1": [("add_wrong_place_value_addition", lambda q, ans: add_wrong_place_value_addition(q, ans)), 
+            ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans))],
+    "2A2": [("add_wrong_place_value_addition", lambda q, ans: add_wrong_place_value_addition(q, ans)), 
+            ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans))],
+    "2S1": [("add_instead_of", lambda q, ans: add_instead_of(q, ans)), 
+            ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans))],
+    "1AC": [("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2]))],
+    "2A1C": [("add_wrong_place_value_addition", lambda q, ans: add_wrong_place_value_addition(q, ans)), 
+             ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans))],
+    "2A2C": [("add_wrong_place_value_addition", lambda q, ans: add_wrong_place_value_addition(q, ans)), 
+             ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans))],
+    "2S1B": [("add_instead_of", lambda q, ans: add_instead_of(q, ans)), 
+             ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans))],
+    "2S2": [("add_instead_of", lambda q, ans: add_instead_of(q, ans)), 
+            ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans))],
+    "T10": [("one_table_off", lambda q, ans: one_table_off(q, ans, offsets=[-2, -1, 1, 2]))],
+    "3A": [("add_wrong_place_value_addition", lambda q, ans: add_wrong_place_value_addition(q, ans)), 
+           ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans))],
+    "3AC": [("add_wrong_place_value_addition", lambda q, ans: add_wrong_place_value_addition(q, ans)), 
+            ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans))],
+    "3S": [("add_instead_of", lambda q, ans: add_instead_of(q, ans)), 
+           ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans))],
+    "2S2B": [("add_instead_of", lambda q, ans: add_instead_of(q, ans)), 
+             ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans))],
+    "3AC2": [("add_wrong_place_value_addition", lambda q, ans: add_wrong_place_value_addition(q, ans)), 
+             ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans))],
+    "3SB": [("add_instead_of", lambda q, ans: add_instead_of(q, ans)), 
+            ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans))],
+    "3SB2": [("add_instead_of", lambda q, ans: add_instead_of(q, ans)), 
+             ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans))],
+    "2M1": [("add_instead_of_multiply", lambda q, ans: add_instead_of_multiply(q, ans)), 
+            ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans))],
+    "3M1": [("add_instead_of_multiply", lambda q, ans: add_instead_of_multiply(q, ans)), 
+            ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2]))],
+    "2M1C": [("add_instead_of_multiply", lambda q, ans: add_instead_of_multiply(q, ans)), 
+             ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2]))],
+    "3M1C": [("add_instead_of_multiply", lambda q, ans: add_instead_of_multiply(q, ans)), 
+             ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2]))],
+    "3M1C2": [("add_instead_of_multiply", lambda q, ans: add_instead_of_multiply(q, ans)), 
+              ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans, offsets=[-2, -1, 1, 2]))],
+    "2M2": [("add_instead_of_multiply", lambda q, ans: add_instead_of_multiply(q, ans)), 
+            ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans))],
+    "2D1": [("division_errors", lambda q, ans: division_errors(q, ans)),
+            ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans))],
+    "3D1": [("division_errors", lambda q, ans: division_errors(q, ans)),
+            ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans))],
+    "2M2C": [("add_instead_of_multiply", lambda q, ans: add_instead_of_multiply(q, ans)), 
+             ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans, offsets=[-2, -1, 1, 2]))],
+    "2D1R": [("division_errors", lambda q, ans: division_errors(q, ans)),
+             ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans))],
+    "3D1R": [("division_errors", lambda q, ans: division_errors(q, ans)),
+             ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans))],
+    "3M2C": [("add_instead_of_multiply", lambda q, ans: add_instead_of_multiply(q, ans)), 
+              ("off_by_one_multidigit", lambda q, ans: off_by_one_multidigit(q, ans, offsets=[-2, -1, 1, 2]))],
+    "3D1Z": [("division_errors", lambda q, ans: division_errors(q, ans)),
+             ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans))],
+    "4D1R": [("division_errors", lambda q, ans: division_errors(q, ans)),
+             ("off_by_one_generic", lambda q, ans: off_by_one_generic(q, ans))]
 }
 
-def generate_distractors(skill_code, question, correct_ans):
-    """Generate all distractors for a given skill code."""
-    if skill_code not in _distractors_map:
-        raise ValueError(f"Unknown skill code: {skill_code}")
-    
+def _live_distractors(skill_code, question, correct_ans, report_errors=True):
+    """Run every distractor function mapped to the skill code."""
     all_distractors = set()
-    for func in _distractors_map[skill_code]:
+    for _, func in _distractors_map[skill_code]:
         try:
             distractors = func(question, correct_ans)
             all_distractors.update(distractors)
         except Exception as e:
-            print(f"Error generating distractors: {e}")
+            if report_errors:
+                print(f"Error generating distractors: {e}")
+                instrumentation.count("distractors.errors", skill_code)
     
     return [d for d in all_distractors if _is_non_negative_option(d)]
 
 
+def distractor_sources(skill_code, question, correct_ans):
+    """
+    Label the distractors of a question with the misconception that produces them.
+
+    Args:
+        question: A generate.QuestionRecord, or the question text (ASCII digits).
+        correct_ans: The correct answer as used by the distractor functions.
+
+    Returns:
+        dict mapping each live distractor (as a string) to the name of the
+        first entry in _distractors_map[skill_code] that produces it.
+        Options absent from it came from the non-negative fallback fill.
+    """
+    if skill_code not in _distractors_map:
+        raise ValueError(f"Unknown skill code: {skill_code}")
+
+    sources = {}
+    for name, func in _distractors_map[skill_code]:
+        try:
+            values = func(question, correct_ans)
+        except Exception:
+            continue
+        for value in values:
+            if _is_non_negative_option(value):
+                sources.setdefault(str(value), name)
+    return sources
+
+
+def generate_distractors(skill_code, question, correct_ans):
+    """
+    Generate all distractors for a given skill code.
+
+    `question` is a generate.QuestionRecord, or the question text.
+    When USE_DISTRACTOR_TABLES is set, skills with a precomputed table are
+    answered with a dict lookup; other skills run the live functions.
+    """
+    if skill_code not in _distractors_map:
+        raise ValueError(f"Unknown skill code: {skill_code}")
+
+    if USE_DISTRACTOR_TABLES:
+        table = get_distractor_table(skill_code)
+        if table is not None:
+            key = question.text if isinstance(question, generate.QuestionRecord) else question
+            if key in table:
+                instrumentation.count("distractors.table_hits", skill_code)
+                return list(table[key])
+
+    return _live_distractors(skill_code, question, correct_ans)
+
+
+# PRECOMPUTED TABLES
+# In-memory tables by skill code; None marks skills too large for a table
+_distractor_tables = {}
+
+
+def _table_version():
+    """Fingerprint of the code that produces the tables; stale files are rebuilt."""
+    digest = hashlib.sha1()
+    for module in (__file__, generate.__file__):
+        digest.update(Path(module).read_bytes())
+    return digest.hexdigest()
+
+
+def build_distractor_table(skill_code):
+    """
+    Build the question -> distractors table for every question of a skill.
+
+    Returns:
+        dict: Maps question text (e.g. "6 + 2") to its list of distractors.
+    """
+    records = generate.to_records(generate.all_questions_array(skill_code))
+    table = {}
+    for record in records:
+        table[record.text] = _live_distractors(skill_code, record, record.correct_ans, report_errors=False)
+    return table
+
+
+def get_distractor_table(skill_code):
+    """
+    Return the precomputed distractor table for a skill, or None if the skill
+    has more than TABLE_MAX_QUESTIONS questions.
+
+    Tables are loaded from DISTRACTOR_TABLE_DIR, or built and saved there on
+    first use.
+    """
+    if skill_code in _distractor_tables:
+        return _distractor_tables[skill_code]
+
+    table = None
+    if len(generate._space_map[skill_code]) <= TABLE_MAX_QUESTIONS:
+        version = _table_version()
+        path = DISTRACTOR_TABLE_DIR / f"{skill_code}.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == version:
+                table = data["table"]
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+        if table is None:
+            table = build_distractor_table(skill_code)
+            DISTRACTOR_TABLE_DIR.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": version, "skill_code": skill_code, "table": table}, f)
+            os.replace(tmp_path, path)
+
+    _distractor_tables[skill_code] = table
+    return table
+
+
 def _build_non_negative_fallback_distractors(correct_ans, existing, needed=3):
     """Fill distractors up to `needed` with guaranteed non-negative candidates."""
     out = list(existing)
@@ -322,11 +448,16 @@ def _build_non_negative_fallback_distractors(correct_ans, existing, needed=3):
 
 
 def build_distractors(skill_code, question, correct_ans, needed=3):
-    """Return at least `needed` non-negative distractors for a question."""
+    """
+    Return at least `needed` non-negative distractors for a question.
+
+    `question` is a generate.QuestionRecord, or the question text.
+    """
     try:
         possible_distractors = generate_distractors(skill_code, question, correct_ans)
     except Exception as e:
         print(f"Error generating distractors for {skill_code}: {e}")
+        instrumentation.count("distractors.errors", skill_code)
         possible_distractors = []
 
     possible_distractors = [
@@ -335,6 +466,7 @@ def build_distractors(skill_code, question, correct_ans, needed=3):
     ]
 
     if len(possible_distractors) < needed:
+        instrumentation.count("distractors.fallback", skill_code)
         # Preserve existing numeric fallback behavior.
         try:
             correct_val = int(correct_ans) if not isinstance(correct_ans, str) else int(correct_ans.split()[0])
@@ -351,10 +483,13 @@ def build_distractors(skill_code, question, correct_ans, needed=3):
         except (ValueError, AttributeError):
             possible_distractors = []
 
+    existing = [d for d in possible_distractors if d != correct_ans]
     possible_distractors = _build_non_negative_fallback_distractors(
         correct_ans,
-        [d for d in possible_distractors if d != correct_ans],
+        existing,
         needed=needed,
     )
+    if len(possible_distractors) > len(existing):
+        instrumentation.count("distractors.fallback_fill", skill_code, len(possible_distractors) - len(existing))
 
     return possible_distractors
\ No newline at end of file
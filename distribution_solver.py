@@ -0,0 +1,211 @@
+"""
+Vectorized skill distributions for many worksheets at once.
+
+create_worksheet_level_distribution draws one worksheet's allocation with a
+sequential loop that gives every skill but the last at least one question,
+which favours the skills listed first. The solver here draws K allocations
+in one call:
+
+1. A worksheet level's total is split across difficulty levels by the
+   proportions in WORKSHEET_LEVEL_DISTRIBUTIONS (largest-remainder rounding,
+   so the parts always add up to the total).
+2. Within a difficulty level, every skill first gets its minimum, then the
+   remaining questions are dealt out with one multinomial draw per worksheet
+   in which every skill is equally likely. Questions that land on a skill
+   beyond its maximum are dealt again among the skills still below theirs.
+
+Every skill at a difficulty level therefore has the same expected share,
+and any total (not only 20) and per-skill min/max caps are supported.
+
+Caps apply per difficulty level, so a level whose skills cannot hold its
+share of the questions is an error (levels 6 and 7 have a single skill each,
+which gets all of their 5-10 questions in levels D-G).
+
+batch.py --solver plans every worksheet of a manifest with
+plan_distributions.
+
+Example:
+    batch = solve_level_distributions("C", 500, rng=1, max_questions=4)
+    batch.counts.shape          # (500, number of skills at levels 1-3)
+    batch.as_dicts()[0]         # {"1A": 1, ...}, ready for create_worksheet
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from create_worksheet import WORKSHEET_LEVEL_DISTRIBUTIONS
+from seeding import RNGLike, get_rng
+from skill_catalog import get_catalog
+
+
+class DistributionBatch(NamedTuple):
+    """K skill allocations: counts[i, j] questions of codes[j] in worksheet i."""
+    codes: list
+    counts: np.ndarray
+
+    def as_dict(self, i: int) -> dict:
+        """Worksheet i's allocation as {skill_code: count}, without zero counts."""
+        return {code: int(n) for code, n in zip(self.codes, self.counts[i]) if n}
+
+    def as_dicts(self) -> list:
+        """Every allocation as {skill_code: count} (see as_dict)."""
+        return [self.as_dict(i) for i in range(len(self.counts))]
+
+
+def level_totals(worksheet_level: str, total: int = 20) -> dict:
+    """
+    Split a worksheet's questions across difficulty levels.
+
+    Uses the level's proportions in WORKSHEET_LEVEL_DISTRIBUTIONS with
+    largest-remainder rounding (ties go to the lower difficulty).
+
+    Returns:
+        Dict mapping difficulty level to question count, summing to total.
+    """
+    if worksheet_level not in WORKSHEET_LEVEL_DISTRIBUTIONS:
+        valid_levels = ", ".join(WORKSHEET_LEVEL_DISTRIBUTIONS.keys())
+        raise ValueError(f"Invalid worksheet level: {worksheet_level}. Must be one of: {valid_levels}")
+    if total < 0:
+        raise ValueError(f"Total must be non-negative, got {total}")
+
+    levels = sorted(WORKSHEET_LEVEL_DISTRIBUTIONS[worksheet_level].items())
+    exact = np.array([total * proportion for _, proportion in levels])
+    counts = np.floor(exact + 1e-9).astype(np.int64)
+    shortfall = total - int(counts.sum())
+    # Stable sort keeps the lower difficulty first among equal remainders
+    order = np.argsort(-(exact - counts), kind="stable")
+    counts[order[:shortfall]] += 1
+    return {difficulty: int(n) for (difficulty, _), n in zip(levels, counts)}
+
+
+def _caps(value, codes: list, default) -> np.ndarray:
+    """Per-skill cap array from an int, a {skill_code: cap} dict or None."""
+    if isinstance(value, dict):
+        return np.array([value.get(code, default) for code in codes], dtype=np.int64)
+    return np.full(len(codes), default if value is None else value, dtype=np.int64)
+
+
+def allocate(k: int, n, num_skills: int, min_questions=0, max_questions=None,
+             rng: RNGLike = None) -> np.ndarray:
+    """
+    Deal n questions among num_skills skills for k worksheets at once.
+
+    Args:
+        k: Number of allocations.
+        n: Questions per allocation (an int, or an array of k ints).
+        min_questions, max_questions: Per-skill caps (ints or arrays of
+                                      num_skills); max None means no cap.
+        rng: Optional int seed or numpy Generator.
+
+    Returns:
+        (k, num_skills) int array; each row sums to its n.
+    """
+    rng = get_rng(rng)
+    n = np.broadcast_to(np.asarray(n, dtype=np.int64), (k,))
+    lo = np.broadcast_to(np.asarray(min_questions, dtype=np.int64), (num_skills,))
+    hi = np.broadcast_to(np.asarray(n.max(initial=0) if max_questions is None else max_questions,
+                                    dtype=np.int64), (num_skills,))
+    if num_skills == 0:
+        if n.any():
+            raise ValueError("Cannot allocate questions to zero skills")
+        return np.zeros((k, 0), dtype=np.int64)
+    if (lo > hi).any():
+        raise ValueError("A skill's minimum is above its maximum")
+    if (n < lo.sum()).any() or (n > hi.sum()).any():
+        amount = n.min() if n.min() == n.max() else f"{n.min()}-{n.max()}"
+        raise ValueError(f"Cannot allocate {amount} questions within the caps "
+                         f"(minimum {lo.sum()}, maximum {hi.sum()})")
+
+    counts = np.tile(lo, (k, 1))
+    remaining = n - lo.sum()
+    room = hi - counts
+    # Each pass deals the remaining questions uniformly among skills with room
+    # left and takes back what overflows; at least one skill fills up per pass
+    while remaining.any():
+        open_ = room > 0
+        pvals = open_ / np.maximum(open_.sum(axis=1, keepdims=True), 1)
+        dealt = rng.multinomial(remaining, pvals)
+        taken = np.minimum(dealt, room)
+        counts += taken
+        room -= taken
+        remaining = remaining - taken.sum(axis=1)
+    return counts
+
+
+def solve_difficulty_distributions(difficulty_level: int, k: int, total: int = 20, min_questions=0,
+                                   max_questions=None, rng: RNGLike = None) -> DistributionBatch:
+    """
+    K allocations of total questions among the skills of one difficulty level.
+
+    Args:
+        min_questions, max_questions: Per-skill caps: an int for every skill,
+                                      or a {skill_code: cap} dict.
+        rng: Optional int seed or numpy Generator.
+
+    Returns:
+        DistributionBatch
+    """
+    codes = list(get_catalog().codes_at(difficulty_level))
+    if not codes:
+        raise ValueError(f"No skills found at difficulty level {difficulty_level}")
+    counts = allocate(k, total, len(codes), _caps(min_questions, codes, 0),
+                      _caps(max_questions, codes, total), rng=rng)
+    return DistributionBatch(codes, counts)
+
+
+def solve_level_distributions(worksheet_level: str, k: int, total: int = 20, min_questions=0,
+                              max_questions=None, rng: RNGLike = None) -> DistributionBatch:
+    """
+    K allocations for a worksheet level (A-G).
+
+    Questions per difficulty level come from level_totals; each difficulty
+    level's questions are then allocated among its skills (see allocate).
+
+    Args:
+        min_questions, max_questions: Per-skill caps: an int for every skill,
+                                      or a {skill_code: cap} dict.
+        rng: Optional int seed or numpy Generator.
+
+    Returns:
+        DistributionBatch over the skills of every difficulty level used.
+    """
+    catalog = get_catalog()
+    rng = get_rng(rng)
+    codes, blocks = [], []
+    for difficulty_level, n in level_totals(worksheet_level, total).items():
+        if n == 0:
+            continue
+        level_codes = list(catalog.codes_at(difficulty_level))
+        if not level_codes:
+            raise ValueError(f"No skills found at difficulty level {difficulty_level}")
+        try:
+            blocks.append(allocate(k, n, len(level_codes), _caps(min_questions, level_codes, 0),
+                                   _caps(max_questions, level_codes, n), rng=rng))
+        except ValueError as e:
+            raise ValueError(f"Worksheet level {worksheet_level}, difficulty level {difficulty_level} "
+                             f"({len(level_codes)} skill{'s' if len(level_codes) != 1 else ''}): {e}") from e
+        codes.extend(level_codes)
+    counts = np.concatenate(blocks, axis=1) if blocks else np.zeros((k, 0), dtype=np.int64)
+    return DistributionBatch(codes, counts)
+
+
+def plan_distributions(levels: list, total: int = 20, min_questions=0, max_questions=None,
+                       rng: RNGLike = None) -> list:
+    """
+    Allocations for a list of worksheet levels (e.g. one entry per student).
+
+    Worksheets of the same level are solved in one vectorized call.
+
+    Returns:
+        List of {skill_code: count} dicts, in the order of levels.
+    """
+    rng = get_rng(rng)
+    levels = list(levels)
+    out = [None] * len(levels)
+    for level in sorted(set(levels)):
+        positions = [i for i, value in enumerate(levels) if value == level]
+        batch = solve_level_distributions(level, len(positions), total, min_questions, max_questions, rng=rng)
+        for row, i in enumerate(positions):
+            out[i] = batch.as_dict(row)
+    return out
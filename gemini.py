@@ -1,13 +1,19 @@
 from dotenv import load_dotenv
 import os
-import csv
 import json
+import hashlib
 import random
 import io
+import time
+import asyncio
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 import numpy as np
+from pathlib import Path
 import generate
+from llm_cache import ResponseCache
+from skill_catalog import get_catalog
+from template_matcher import get_matcher
 
 load_dotenv()
 
@@ -16,34 +22,123 @@ print(GEMINI_API_KEY)
 
 def lookup_skill_misconceptions(skill_code: str) -> tuple[str, str]:
     """
-    Lookup skill and misconceptions from the CSV file based on the skill code.
+    Lookup skill and misconceptions from the skills catalog based on the skill code.
 
     Args:
         skill_code (str): The skill code to look up.
+
+    Returns:
+        (skill, misconceptions), or empty strings for an unknown code.
     """
-    csv_file = csv.reader(open('skills.csv', 'r'), delimiter=',')
-    next(csv_file)  # skip header
-    skill = ""
-    misconceptions = ""
-    for row in csv_file:
-        if row[1] == skill_code:
-            skill = row[3]
-            misconceptions = row[5]
-            break
-    return skill, misconceptions
-
-def generate_distractors_batch(questions_data: list[dict]) -> dict:
+    skill = get_catalog().by_code.get(skill_code)
+    if skill is None:
+        return "", ""
+    return skill.skill, skill.misconceptions
+
+# Shared client, created on first use
+_client = None
+
+def get_client() -> genai.Client:
+    """Return the shared genai client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = genai.Client(api_key=GEMINI_API_KEY)
+    return _client
+
+# On-disk cache of API responses; set GEMINI_CACHE_BYPASS=1 to always call the API
+response_cache = ResponseCache(
+    Path(__file__).parent / "llm_cache.sqlite3",
+    enabled=os.getenv("GEMINI_CACHE_BYPASS", "") != "1",
+)
+
+def _cache_key(model: str, prompt_text: str, schema: dict, temperature: float, system_instruction: str) -> str:
+    return ResponseCache.make_key(model, prompt_text, schema, temperature, system_instruction)
+
+def _store_if_json(key: str, text: str, model: str):
+    """Cache a response only if it parses, so a bad response is retried next time."""
+    try:
+        json.loads(text)
+    except (TypeError, ValueError):
+        return
+    response_cache.put(key, text, model=model)
+
+def generate_json_text(prompt_text: str, schema: dict, temperature: float, system_instruction: str,
+                       model: str = "gemini-2.5-flash", use_cache: bool = True) -> str:
     """
-    Generate distractors for a BATCH of questions.
-    
+    Call the API for a JSON response, going through response_cache.
+
     Args:
-        questions_data: List of dicts, e.g., 
-        [{'id': 1, 'question': '1+1', 'correct_ans': 2, 'skill_code': 'ADD01'}, ...]
+        prompt_text: User prompt.
+        schema: Response JSON schema.
+        temperature: Sampling temperature.
+        system_instruction: System prompt.
+        model: Model name.
+        use_cache: Set to False to bypass the cache for this call.
+
+    Returns:
+        str: The response text.
     """
-    
-    client = genai.Client(api_key=GEMINI_API_KEY) # Replace with your key variable
-    
-    # 1. Pre-process data to include skills/misconceptions
+    key = _cache_key(model, prompt_text, schema, temperature, system_instruction)
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    response = _generate_content(model, prompt_text, schema, temperature, system_instruction)
+    if use_cache:
+        _store_if_json(key, response.text, model)
+    return response.text
+
+def _generate_content(model: str, prompt_text: str, schema: dict, temperature: float,
+                      system_instruction: str, cached_content: str = None):
+    """
+    One generate_content call with a JSON response.
+
+    With cached_content (a context cache name), the system instruction is
+    taken from the cache instead of being sent again.
+    """
+    return get_client().models.generate_content(
+        model=model,
+        contents=[prompt_text],
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=schema,
+            temperature=temperature,
+            system_instruction=None if cached_content else system_instruction,
+            cached_content=cached_content,
+        )
+    )
+
+# Schema for a LIST of results: an object that contains a list of objects
+BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "distractors": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "minItems": 3,
+                        "maxItems": 3
+                    }
+                },
+                "required": ["distractors"]
+            }
+        }
+    },
+    "required": ["results"]
+}
+
+BATCH_SYSTEM_INSTRUCTION = """You are an expert math distractor generator.
+            For each item, use the question, correct answer, skill name, and misconceptions
+            to propose 3 high-quality distractors.
+            Return them strictly following the JSON schema."""
+
+def build_batch_prompt(questions_data: list[dict]) -> str:
+    """Build the prompt for a batch of questions, adding each skill's name and misconceptions."""
     processed_inputs = []
     for q in questions_data:
         skill, misconceptions = lookup_skill_misconceptions(q['skill_code'])
@@ -54,55 +149,38 @@ def generate_distractors_batch(questions_data: list[dict]) -> dict:
             "misconceptions": misconceptions
         })
 
-    # 2. Define the Schema for a LIST of results
-    # We need an object that contains a list of objects
-    batch_schema = {
-        "type": "object",
-        "properties": {
-            "results": {
-                "type": "array",
-                "items": {
-                    "type": "object",
-                    "properties": {
-                        "distractors": {
-                            "type": "array",
-                            "items": {"type": "integer"},
-                            "minItems": 3,
-                            "maxItems": 3
-                        }
-                    },
-                    "required": ["distractors"]
-                }
-            }
-        },
-        "required": ["results"]
-    }
-
-    # 3. Construct the Prompt
-    prompt_text = (
+    return (
         "Generate 3 distractors for each of the following questions based on the "
         "provided skill and common misconceptions.\n\n"
         f"Input Data: {json.dumps(processed_inputs)}"
     )
 
-    # 4. Call the API
-    response = client.models.generate_content(
+def generate_distractors_batch(questions_data: list[dict], use_cache: bool = True) -> dict:
+    """
+    Generate distractors for a BATCH of questions.
+    
+    Args:
+        questions_data: List of dicts, e.g., 
+        [{'id': 1, 'question': '1+1', 'correct_ans': 2, 'skill_code': 'ADD01'}, ...]
+        use_cache: Set to False to bypass the response cache.
+    """
+    
+    # 1. Construct the Prompt (includes skills/misconceptions)
+    prompt_text = build_batch_prompt(questions_data)
+
+    # 2. Call the API
+    response_text = generate_json_text(
+        prompt_text,
+        schema=BATCH_SCHEMA,
+        temperature=0.8,
+        system_instruction=BATCH_SYSTEM_INSTRUCTION,
         model="gemini-2.5-flash", # verified model name (adjust if you have 2.0 access)
-        contents=[prompt_text],
-        config=types.GenerateContentConfig(
-            response_mime_type="application/json",
-            response_schema=batch_schema,
-            temperature=0.8,
-            system_instruction="""You are an expert math distractor generator.
-            For each item, use the question, correct answer, skill name, and misconceptions
-            to propose 3 high-quality distractors.
-            Return them strictly following the JSON schema."""
-        )
+        use_cache=use_cache,
     )
 
-    # 5. Parse and Return
+    # 3. Parse and Return
     try:
-        result = json.loads(response.text)
+        result = json.loads(response_text)
         # Convert list back to a dict keyed by ID for easy lookup if needed
         # or just return the list
         return result['results'] 
@@ -120,7 +198,7 @@ def generate_distractors_batch(questions_data: list[dict]) -> dict:
 
 # - - -
 
-def generate_distractors(question: str, correct_ans: int, skill_code: str) -> list[int]:
+def generate_distractors(question: str, correct_ans: int, skill_code: str, use_cache: bool = True) -> list[int]:
     """
     Generate distractors for a given question and correct answer using Gemini API.
 
@@ -128,48 +206,184 @@ def generate_distractors(question: str, correct_ans: int, skill_code: str) -> li
         question (str): The question string.
         correct_ans (int): The correct answer to the question.
         skill_code (str): The skill code indicating the type of distractor generation.
+        use_cache (bool): Set to False to bypass the response cache.
 
     Returns:
         list[int]: A list of generated distractors.
     """
 
-    client = genai.Client(api_key=GEMINI_API_KEY)
-
-    # find skill, misconceptions from csv
+    # find skill, misconceptions from the skills catalog
     skill, misconceptions = lookup_skill_misconceptions(skill_code)
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=[
-            f"Generate 3 distractors for the question: {question} with correct answer: {correct_ans} using skill: {skill}. Account for the following misconceptions: {misconceptions}"
-        ],
-        config=types.GenerateContentConfig(
-            response_mime_type="application/json",
-            response_schema={
-                "required": [
-                    "distractors"
-                ],
-                "properties": {
-                    "distractors": {
-                        "type": "array",
-                        "items": {
-                            "type": "integer"
-                        },
-                        "minItems": 3,
-                        "maxItems": 3
-                    }
-                },
-                "type": "object"
+    response_text = generate_json_text(
+        f"Generate 3 distractors for the question: {question} with correct answer: {correct_ans} using skill: {skill}. Account for the following misconceptions: {misconceptions}",
+        schema={
+            "required": [
+                "distractors"
+            ],
+            "properties": {
+                "distractors": {
+                    "type": "array",
+                    "items": {
+                        "type": "integer"
+                    },
+                    "minItems": 3,
+                    "maxItems": 3
+                }
             },
-            temperature=0.8,
-            system_instruction="""You are an expert question generator specializing in creating plausible distractors for multiple-choice questions in mathematics.
-            Given a question, its correct answer, the name of the skill/competency, and common misconceptions, you will provide 3 distractors for each question."""
-        )
+            "type": "object"
+        },
+        temperature=0.8,
+        system_instruction="""You are an expert question generator specializing in creating plausible distractors for multiple-choice questions in mathematics.
+            Given a question, its correct answer, the name of the skill/competency, and common misconceptions, you will provide 3 distractors for each question.""",
+        use_cache=use_cache,
     )
-    print(response.text)
-    result = json.loads(response.text)
+    print(response_text)
+    result = json.loads(response_text)
     return result['distractors']
 
+# - - -
+# Concurrent batch generation (asyncio)
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter.
+
+    Args:
+        rate: Tokens (requests) added per second.
+        capacity: Maximum burst size. Defaults to max(1, rate).
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        if capacity is not None and capacity < 1:
+            raise ValueError(f"Capacity must be at least 1, got {capacity}")
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class GeminiTransport:
+    """
+    Sends a prompt through the shared client's async API and returns the response text.
+    Responses go through response_cache unless use_cache is False.
+    """
+
+    def __init__(self, model: str = "gemini-2.5-flash", use_cache: bool = True):
+        self.model = model
+        self.use_cache = use_cache
+
+    async def __call__(self, prompt_text: str, schema: dict, system_instruction: str, temperature: float) -> str:
+        key = _cache_key(self.model, prompt_text, schema, temperature, system_instruction)
+        if self.use_cache:
+            cached = response_cache.get(key)
+            if cached is not None:
+                return cached
+        response = await get_client().aio.models.generate_content(
+            model=self.model,
+            contents=[prompt_text],
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=schema,
+                temperature=temperature,
+                system_instruction=system_instruction
+            )
+        )
+        if self.use_cache:
+            _store_if_json(key, response.text, self.model)
+        return response.text
+
+
+class AsyncDistractorClient:
+    """
+    Concurrent batch distractor generation.
+
+    Questions are split into chunks of `batch_size`; up to `concurrency`
+    chunk requests run at once, started no faster than `rate` per second.
+    Failed or malformed responses are retried with exponential backoff.
+
+    Args:
+        transport: Async callable (prompt_text, schema, system_instruction, temperature) -> str.
+                   Defaults to GeminiTransport(); tests pass an offline stand-in.
+        batch_size: Questions per request.
+        concurrency: Maximum requests in flight.
+        rate: Maximum requests started per second.
+        burst: Token-bucket capacity (defaults to max(1, rate)).
+        max_retries: Retries per chunk after the first attempt.
+        backoff: Base delay in seconds, doubled on every retry.
+        temperature: Sampling temperature passed to the transport.
+    """
+
+    def __init__(self, transport=None, batch_size: int = 20, concurrency: int = 4, rate: float = 2.0,
+                 burst: float = None, max_retries: int = 3, backoff: float = 1.0, temperature: float = 0.8):
+        self.transport = transport or GeminiTransport()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.temperature = temperature
+        self.stats = {"requests": 0, "retries": 0, "failed_batches": 0}
+
+    async def _request(self, chunk: list[dict], limiter: TokenBucket, semaphore: asyncio.Semaphore) -> list:
+        prompt_text = build_batch_prompt(chunk)
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with semaphore:
+                    # Take the token only once a slot is free, so queued
+                    # requests do not save up tokens and burst past the rate
+                    await limiter.acquire()
+                    self.stats["requests"] += 1
+                    text = await self.transport(prompt_text, BATCH_SCHEMA, BATCH_SYSTEM_INSTRUCTION, self.temperature)
+                results = json.loads(text)["results"]
+                if len(results) != len(chunk):
+                    raise ValueError(f"expected {len(chunk)} results, got {len(results)}")
+                return results
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Error generating distractor batch: {e}")
+                    self.stats["failed_batches"] += 1
+                    return [None] * len(chunk)
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.backoff * 2 ** attempt * (0.5 + random.random()))
+
+    async def generate(self, questions_data: list[dict]) -> list:
+        """
+        Generate distractors for all questions.
+
+        Returns:
+            List aligned with questions_data of {"distractors": [...]} dicts,
+            or None for questions whose batch failed after all retries.
+        """
+        limiter = TokenBucket(self.rate, self.burst)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        chunks = [questions_data[i:i + self.batch_size] for i in range(0, len(questions_data), self.batch_size)]
+        chunk_results = await asyncio.gather(*(self._request(chunk, limiter, semaphore) for chunk in chunks))
+        return [result for results in chunk_results for result in results]
+
+
+def generate_distractors_concurrent(questions_data: list[dict], **kwargs) -> list:
+    """Synchronous wrapper around AsyncDistractorClient(**kwargs).generate(questions_data)."""
+    return asyncio.run(AsyncDistractorClient(**kwargs).generate(questions_data))
+
+# - - -
+
 def get_questions(skill_id: str, num_questions: int) -> list[dict]:
     skill, misconceptions = lookup_skill_misconceptions(skill_id)
     raw_questions = generate.gen_questions(skill_id, num_questions)
@@ -184,55 +398,205 @@ def get_questions(skill_id: str, num_questions: int) -> list[dict]:
         })
     return questions
 
-# generate worksheets from natural language query
-def get_template_from_query(query: str) -> list[dict]:
-
-    with open('skills.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    system_prompt = f"""You are a Teacher's Assistant AI that converts a teacher's natural-language request into a 20-question worksheet template by returning a compact mapping of skill codes to integer question counts.
-    Always return only a mapping in the exact format: {{skill_code: num_questions}} (e.g. {{1A: 5, T5: 8, 2A1: 7}}).
-    The values must be non-negative integers and the values must sum to exactly 20.
-    Allocate questions by difficulty and user intent:
-    If the user explicitly asks to "focus on" or "practice" specific skills, prioritize those (give them a higher share of the 20 questions) while still returning a total of 20.
-    Otherwise, allocate proportionally across relevant skills using the difficulty information (see "Allocation algorithm" below).
-    Prefer variety but keep coherence: avoid putting every question on the exact same skill unless the user clearly asks for intense practice on one skill. Try to include multiple related skills where the user's request is broad (e.g., "basic addition practice").
-    
-    Use the following JSON table for skills and difficulties: {json.dumps(data)}"""
-
-    prompt_text = f"Convert the following teacher request into a mapping of skill codes to integer question counts: {query}"
-
-    client = genai.Client(api_key=GEMINI_API_KEY)
-    
-    skill_codes = [skill['code'] for skill in data]
+# - - -
+# Worksheet templates from natural-language queries
+
+TEMPLATE_MODEL = "gemini-2.5-flash"
+
+TEMPLATE_SYSTEM_PROMPT = """You are a Teacher's Assistant AI that converts a teacher's request into a 20-question worksheet template: a mapping of skill codes to integer question counts.
+Counts are non-negative integers summing to exactly 20.
+If the teacher asks to focus on or practice specific skills, give those most of the questions. Otherwise spread the questions over the relevant skills, weighted by difficulty.
+Prefer a few related skills over a single one, unless the teacher clearly asks for intense practice on one skill.
+Skills (code|difficulty|name):
+{table}"""
+
+# Context caching of the system prompt: set GEMINI_CONTEXT_CACHE=0 to disable
+CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE", "1") != "0"
+CONTEXT_CACHE_TTL = 3600  # seconds
+CONTEXT_CACHE_RETRY = 60  # seconds before retrying after a transient error
+
+# (catalog, system prompt, response schema) for the catalog it was built from
+_template_prompt = None
+
+# (model, prompt hash) -> (cache name, expiry), (None, retry time) after a
+# transient error, or None if the API refused to cache it
+_context_caches = {}
+
+# Per-process totals for get_template_from_query; offline_matches,
+# response_cache_hits and api_calls count the queries each path served
+template_stats = {
+    "queries": 0,
+    "offline_matches": 0,
+    "response_cache_hits": 0,
+    "api_calls": 0,
+    "context_cache_calls": 0,
+    "prompt_tokens": 0,
+    "cached_tokens": 0,
+    "output_tokens": 0,
+    "latency": 0.0,
+}
+
+def compact_skill_table(catalog=None) -> str:
+    """One "code|difficulty|name" line per skill, using the first line of its description as the name."""
+    catalog = catalog or get_catalog()
+    lines = []
+    for skill in catalog.skills:
+        name = skill.skill.strip().splitlines()[0] if skill.skill else ""
+        level = "" if skill.difficulty_level is None else skill.difficulty_level
+        lines.append(f"{skill.code}|{level}|{name}")
+    return "\n".join(lines)
+
+def get_template_prompt() -> tuple[str, dict]:
+    """
+    Return the system prompt and response schema for get_template_from_query.
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=[prompt_text],
-        config=types.GenerateContentConfig(
-            response_mime_type="application/json",
-            response_schema={
-                "type": "object",
-                "properties": {
-                    "skills": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "skill_code": {"type": "string", "enum": skill_codes},
-                                "num_questions": {"type": "integer", "minimum": 0}
-                            }
+    Both are built once and rebuilt only when the skills catalog reloads.
+    """
+    global _template_prompt
+    catalog = get_catalog()
+    if _template_prompt is None or _template_prompt[0] is not catalog:
+        system_prompt = TEMPLATE_SYSTEM_PROMPT.format(table=compact_skill_table(catalog))
+        schema = {
+            "type": "object",
+            "properties": {
+                "skills": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "skill_code": {"type": "string", "enum": [skill.code for skill in catalog.skills]},
+                            "num_questions": {"type": "integer", "minimum": 0}
                         }
                     }
                 }
-            },
-            temperature=0.7,
-            system_instruction=system_prompt
+            }
+        }
+        _template_prompt = (catalog, system_prompt, schema)
+    return _template_prompt[1], _template_prompt[2]
+
+def get_context_cache(model: str, system_instruction: str) -> str | None:
+    """
+    Return the name of a context cache holding system_instruction, creating it if needed.
+
+    Returns None when caching is disabled or unavailable. A refusal (a 4xx
+    error such as a prompt below the model's minimum cacheable size) is
+    remembered for the rest of the process; after other errors (network,
+    5xx, rate limits) creation is retried CONTEXT_CACHE_RETRY seconds later.
+    """
+    if not CONTEXT_CACHE_ENABLED:
+        return None
+    key = (model, hashlib.sha256(system_instruction.encode("utf-8")).hexdigest())
+    entry = _context_caches.get(key, ())
+    if entry is None:
+        return None
+    if entry:
+        name, until = entry
+        if name is None and until > time.time():
+            return None
+        # Renew a minute before expiry so a request never races the TTL
+        if name is not None and until > time.time() + 60:
+            return name
+    try:
+        cache = get_client().caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=system_instruction,
+                ttl=f"{CONTEXT_CACHE_TTL}s",
+                display_name="worksheet-template-prompt",
+            ),
         )
-    )
+    except errors.ClientError as e:
+        if e.code in (408, 429):
+            print(f"Context caching failed for {model}, retrying later: {e}")
+            _context_caches[key] = (None, time.time() + CONTEXT_CACHE_RETRY)
+        else:
+            print(f"Context caching unavailable for {model}: {e}")
+            _context_caches[key] = None
+        return None
+    except Exception as e:
+        print(f"Context caching failed for {model}, retrying later: {e}")
+        _context_caches[key] = (None, time.time() + CONTEXT_CACHE_RETRY)
+        return None
+    _context_caches[key] = (cache.name, time.time() + CONTEXT_CACHE_TTL)
+    return cache.name
+
+def _log_template_query(latency: float, usage=None, source: str = "api"):
+    """Add one query to template_stats and print its latency and token counts."""
+    template_stats["queries"] += 1
+    template_stats["latency"] += latency
+    if usage is None:
+        print(f"Template query ({source}): {latency * 1000:.0f} ms")
+        return
+    prompt_tokens = usage.prompt_token_count or 0
+    cached_tokens = usage.cached_content_token_count or 0
+    output_tokens = usage.candidates_token_count or 0
+    template_stats["prompt_tokens"] += prompt_tokens
+    template_stats["cached_tokens"] += cached_tokens
+    template_stats["output_tokens"] += output_tokens
+    print(f"Template query ({source}): {latency * 1000:.0f} ms, prompt tokens {prompt_tokens} "
+          f"({cached_tokens} cached), output tokens {output_tokens}")
+
+# generate worksheets from natural language query
+def get_template_from_query(query: str, use_cache: bool = True, use_matcher: bool = True) -> list[dict]:
+    """
+    Convert a teacher's request into a worksheet template.
+
+    Queries the offline matcher resolves confidently (see template_matcher)
+    never reach the API. The rest go to Gemini: the system prompt carries a
+    compact skill table (see get_template_prompt) and goes through context
+    caching where the API allows it. Latency and token counts of every query
+    are printed and added to template_stats.
+
+    Args:
+        query: The teacher's request, e.g. "basic addition practice".
+        use_cache: Set to False to bypass the response cache.
+        use_matcher: Set to False to always ask Gemini.
 
-    print(response.text)
-    result = json.loads(response.text)
+    Returns:
+        {"skills": [{"skill_code": ..., "num_questions": ...}, ...]}, as parsed
+        from the response or built by the matcher.
+    """
+    start = time.perf_counter()
+    if use_matcher:
+        match = get_matcher().match(query)
+        if match is not None:
+            template_stats["offline_matches"] += 1
+            _log_template_query(time.perf_counter() - start, source=f"offline match, confidence {match.confidence:.2f}")
+            return {"skills": [{"skill_code": code, "num_questions": n} for code, n in match.template.items()]}
+
+    system_prompt, schema = get_template_prompt()
+    prompt_text = f"Convert the following teacher request into a mapping of skill codes to integer question counts: {query}"
+    temperature = 0.7
+
+    key = _cache_key(TEMPLATE_MODEL, prompt_text, schema, temperature, system_prompt)
+    response_text = response_cache.get(key) if use_cache else None
+    if response_text is not None:
+        template_stats["response_cache_hits"] += 1
+        _log_template_query(time.perf_counter() - start, source="response cache")
+    else:
+        cache_name = get_context_cache(TEMPLATE_MODEL, system_prompt)
+        response = None
+        source = "api"
+        if cache_name is not None:
+            try:
+                response = _generate_content(TEMPLATE_MODEL, prompt_text, schema, temperature,
+                                             system_prompt, cached_content=cache_name)
+                template_stats["context_cache_calls"] += 1
+                source = "api, context cache"
+            except Exception as e:
+                # e.g. the cache was deleted server-side; recreate it next time
+                print(f"Context cache {cache_name} failed, sending the full prompt: {e}")
+                _context_caches.pop((TEMPLATE_MODEL, hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()), None)
+        if response is None:
+            response = _generate_content(TEMPLATE_MODEL, prompt_text, schema, temperature, system_prompt)
+        template_stats["api_calls"] += 1
+        response_text = response.text
+        if use_cache:
+            _store_if_json(key, response_text, TEMPLATE_MODEL)
+        _log_template_query(time.perf_counter() - start, response.usage_metadata, source=source)
+
+    print(response_text)
+    result = json.loads(response_text)
 
     return result
 
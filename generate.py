@@ -1,598 +1,326 @@
 import random
-from typing import Tuple, Union
+from typing import NamedTuple, Tuple, Union
 from dataclasses import dataclass
 
+import numpy as np
+
+from digit_dp import DigitDPSpace, SkillSpec
+from sampler import OperandSpace
+from seeding import RNGLike
+
 # Type for answers: either an int (for most), or (quotient, remainder) tuple for divisions with remainder
 Answer = Union[int, Tuple[int, int]]
 
+# -----------------------
+# Digit rules
+# -----------------------
+
+# Columns inspected by the digit rules (enough for every operand in _space_map)
+_MAX_DIGITS = 4
+
+# Column carry/borrow rules are declared as digit_dp.SkillSpec and compiled
+# into DigitDPSpace; the predicates here cover the remaining skills.
+
+def _product_carries(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Number of single-digit products (digit of a × digit of b) that are >= 10."""
+    count = np.zeros_like(a)
+    for i in range(_MAX_DIGITS):
+        for j in range(_MAX_DIGITS):
+            count += (a // 10 ** i % 10) * (b // 10 ** j % 10) >= 10
+    return count
+
+# -----------------------
+# Operand spaces
+# -----------------------
+
+# Every valid (a, b) pair for each skill code. Spaces are enumerated lazily on
+# first use, so the generators below draw uniformly in O(1) instead of looping
+# on random draws until a carry/borrow condition holds. Carry/borrow skills are
+# declared as SkillSpecs (see digit_dp), which also scale to 4- and 5-digit
+# operands without enumerating them.
+_space_map = {
+    "1A": OperandSpace("+", range(1, 9), range(0, 10), lambda a, b: a + b < 10),
+    "1S": OperandSpace("-", range(1, 10), range(0, 10), lambda a, b: b <= a),
+    "T5": OperandSpace("×", range(1, 11), range(1, 6)),
+    "2A1": OperandSpace("+", range(10, 100), range(0, 10), lambda a, b: (a % 10 <= 8) & (a % 10 + b < 10)),
+    "2A2": DigitDPSpace(SkillSpec("+", (2, 2), pattern="?0")),
+    "2S1": DigitDPSpace(SkillSpec("-", (2, 1), max_count=0, strict=False, second_leading_zero=True)),
+    "1AC": OperandSpace("+", range(1, 10), range(1, 10), lambda a, b: a + b >= 10),
+    "2A1C": DigitDPSpace(SkillSpec("+", (2, 1), pattern="?1", second_leading_zero=True)),
+    "2A2C": DigitDPSpace(SkillSpec("+", (2, 2), pattern="1?")),
+    "2S1B": DigitDPSpace(SkillSpec("-", (2, 1), pattern="01", second_leading_zero=True)),
+    "2S2": DigitDPSpace(SkillSpec("-", (2, 2), max_count=0, strict=False)),
+    "T10": OperandSpace("×", range(6, 11), range(2, 11)),
+    "3A": DigitDPSpace(SkillSpec("+", (3, 3), max_count=0)),
+    "3AC": DigitDPSpace(SkillSpec("+", (3, 3), min_count=1, max_count=1)),
+    "3S": DigitDPSpace(SkillSpec("-", (3, 3), max_count=0, strict=False)),
+    "2S2B": DigitDPSpace(SkillSpec("-", (2, 2), pattern="01")),
+    "3AC2": DigitDPSpace(SkillSpec("+", (3, 3), min_count=2, max_count=2)),
+    "3SB": DigitDPSpace(SkillSpec("-", (3, 3), min_count=1, max_count=1, second_leading_zero=True)),
+    "3SB2": DigitDPSpace(SkillSpec("-", (3, 3), min_count=2, max_count=2, second_leading_zero=True)),
+    "2M1": DigitDPSpace(SkillSpec("×", (2, 1), max_count=0)),
+    "3M1": DigitDPSpace(SkillSpec("×", (3, 1), max_count=0)),
+    "2M1C": DigitDPSpace(SkillSpec("×", (2, 1), min_count=1)),
+    "3M1C": DigitDPSpace(SkillSpec("×", (3, 1), min_count=1, max_count=1)),
+    "3M1C2": DigitDPSpace(SkillSpec("×", (3, 1), min_count=2, max_count=2)),
+    "2M2": OperandSpace("×", range(10, 100), range(10, 100), lambda a, b: _product_carries(a, b) == 0),
+    "2M2C": OperandSpace("×", range(10, 100), range(10, 100), lambda a, b: _product_carries(a, b) >= 1),
+    "3M2C": OperandSpace("×", range(100, 1000), range(10, 100), lambda a, b: _product_carries(a, b) >= 1),
+    "2D1": OperandSpace("÷", range(10, 100), range(2, 10),
+                        lambda a, b: (a % b == 0) & (a // b > 10) & ((a // b) % 10 != 0)),
+    "3D1": OperandSpace("÷", range(100, 1000), range(2, 10), lambda a, b: a % b == 0),
+    "2D1R": OperandSpace("÷", range(10, 100), range(2, 10), lambda a, b: a % b != 0),
+    "3D1R": OperandSpace("÷", range(100, 1000), range(2, 10), lambda a, b: a % b != 0),
+    "3D1Z": OperandSpace("÷", range(100, 1000), range(2, 10), lambda a, b: (a % b == 0) & ((a // b) // 10 % 10 == 0)),
+    "4D1R": OperandSpace("÷", range(1000, 10000), range(2, 10), lambda a, b: a % b != 0),
+}
+
+# Division skills whose answer is a (quotient, remainder) tuple
+_REMAINDER_CODES = {"2D1R", "3D1R", "4D1R"}
+
+class QuestionArrays(NamedTuple):
+    """Column arrays describing n generated questions for one skill code."""
+    code: str
+    op: str
+    first: np.ndarray
+    second: np.ndarray
+    answer: np.ndarray  # quotient for divisions
+    remainder: np.ndarray  # all zeros unless the skill is a division with remainder
+
+class QuestionRecord(NamedTuple):
+    """One generated question in structured form, so consumers never re-parse the text."""
+    code: str
+    first: int
+    op: str
+    second: int
+    answer: int  # quotient for divisions
+    remainder: int = 0
+
+    @property
+    def text(self) -> str:
+        """Display text, e.g. "52 × 7"."""
+        return f"{self.first} {self.op} {self.second}"
+
+    @property
+    def correct_ans(self) -> Union[int, str]:
+        """Answer as shown in the options: an int, or "QRr" for divisions with remainder."""
+        if self.code in _REMAINDER_CODES:
+            return f"{self.answer}R{self.remainder}"
+        return self.answer
+
+def _question_arrays(code: str, a: np.ndarray, b: np.ndarray) -> QuestionArrays:
+    """Compute answers for operand columns of the given skill code."""
+    op = _space_map[code].op
+    remainder = np.zeros_like(a)
+    if op == "+":
+        answer = a + b
+    elif op == "-":
+        answer = a - b
+    elif op == "×":
+        answer = a * b
+    else:
+        answer = a // b
+        if code in _REMAINDER_CODES:
+            remainder = a % b
+    return QuestionArrays(code, op, a, b, answer, remainder)
+
+def gen_questions_array(code: str, n: int, rng: RNGLike = None) -> QuestionArrays:
+    """
+    Generate n questions for the given skill code as NumPy column arrays.
+
+    Operands are drawn uniformly from the skill's operand space in one
+    vectorized call; no question strings are built. Pass an int seed or a
+    numpy Generator as rng for reproducible output.
+    """
+    code = code.strip()
+    if code not in _space_map:
+        raise ValueError(f"Unknown code: {code}")
+
+    a, b = _space_map[code].sample(n, rng)
+    return _question_arrays(code, a, b)
+
+def all_questions_array(code: str) -> QuestionArrays:
+    """Return every valid question for the given skill code as NumPy column arrays."""
+    code = code.strip()
+    if code not in _space_map:
+        raise ValueError(f"Unknown code: {code}")
+
+    a, b = _space_map[code].columns()
+    return _question_arrays(code, a, b)
+
+def format_questions(arrays: QuestionArrays) -> list:
+    """Format question arrays as a list of (question_str, answer) tuples."""
+    with_remainder = arrays.code in _REMAINDER_CODES
+    out = []
+    for a, b, ans, rem in zip(arrays.first.tolist(), arrays.second.tolist(),
+                              arrays.answer.tolist(), arrays.remainder.tolist()):
+        out.append((f"{a} {arrays.op} {b}", (ans, rem) if with_remainder else ans))
+    return out
+
+def to_records(arrays: QuestionArrays) -> list:
+    """Convert question arrays to a list of QuestionRecord."""
+    code, op = arrays.code, arrays.op
+    return [
+        QuestionRecord(code, a, op, b, ans, rem)
+        for a, b, ans, rem in zip(arrays.first.tolist(), arrays.second.tolist(),
+                                  arrays.answer.tolist(), arrays.remainder.tolist())
+    ]
+
+def _draw(code: str, rng: RNGLike = None) -> Tuple[str, Answer]:
+    """
+    Draw one question uniformly from the operand space of the given skill code.
+
+    Every gen_* function below takes the same optional rng (an int seed or a
+    numpy Generator); without one they draw from the shared stream.
+    """
+    return format_questions(gen_questions_array(code, 1, rng))[0]
+
 # -----------------------
 # Addition / Subtraction
 # -----------------------
 
-def gen_1A() -> Tuple[str, Answer]:
+def gen_1A(rng: RNGLike = None) -> Tuple[str, Answer]:
     """1-digit addition - no carry"""
-    a = random.randint(1, 8)
-    b = random.randint(0, 9 - a)  # ensure a+b < 10
-    q = f"{a} + {b}"
-    return q, a + b
+    return _draw("1A", rng)
 
-def gen_1S() -> Tuple[str, Answer]:
+def gen_1S(rng: RNGLike = None) -> Tuple[str, Answer]:
     """1-digit subtraction - no borrow (minuend >= subtrahend)"""
-    a = random.randint(1, 9)
-    b = random.randint(0, a)
-    q = f"{a} - {b}"
-    return q, a - b
+    return _draw("1S", rng)
 
-def gen_T5() -> Tuple[str, Answer]:
+def gen_T5(rng: RNGLike = None) -> Tuple[str, Answer]:
     """Multiplication tables - up to 5 (i.e., pick 1..5)"""
-    a = random.randint(1, 10)
-    b = random.randint(1, 5)
-    q = f"{a} × {b}"
-    return q, a * b
+    return _draw("T5", rng)
 
-def gen_2A1() -> Tuple[str, Answer]:
+def gen_2A1(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2 + 1 digit addition - no carry (two-digit + one-digit, units sum < 10)"""
-    tens = random.randint(1, 9)
-    units = random.randint(0, 8)
-    one = random.randint(0, 9 - units)  # ensure units + one < 10
-    a = 10 * tens + units
-    q = f"{a} + {one}"
-    return q, a + one
-
-def gen_2A2() -> Tuple[str, Answer]:
+    return _draw("2A1", rng)
+
+def gen_2A2(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2 + 2 digit addition - no carry (units sum < 10)"""
-    t1 = random.randint(1, 9)
-    u1 = random.randint(0, 9)
-    t2 = random.randint(1, 9)
-    u2 = random.randint(0, 9 - u1)  # ensure unit-digit no carry
-    a = 10 * t1 + u1
-    b = 10 * t2 + u2
-    return f"{a} + {b}", a + b
-
-def gen_2S1() -> Tuple[str, Answer]:
+    return _draw("2A2", rng)
+
+def gen_2S1(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2 - 1 digit subtraction - no borrow (two-digit minuend minus one-digit subtrahend; units >= subtrahend)"""
-    tens = random.randint(1, 9)
-    units = random.randint(0, 9)
-    one = random.randint(0, units)  # ensure no borrow
-    a = 10 * tens + units
-    return f"{a} - {one}", a - one
+    return _draw("2S1", rng)
 
-def gen_1AC() -> Tuple[str, Answer]:
+def gen_1AC(rng: RNGLike = None) -> Tuple[str, Answer]:
     """1-digit addition - carry (sum >= 10)"""
-    a = random.randint(1, 9)
-    b = random.randint(1, 9)
-    # ensure carry
-    max_iterations = 1000
-    iterations = 0
-    while a + b < 10:
-        a = random.randint(1, 9)
-        b = random.randint(1, 9)
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: force a carry
-            a, b = 9, 9
-            break
-    return f"{a} + {b}", a + b
-
-def gen_2A1C() -> Tuple[str, Answer]:
+    return _draw("1AC", rng)
+
+def gen_2A1C(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2-digit addition - carry (2-digit + ? single carry occurs in units)"""
-    tens = random.randint(1, 9)
-    u1 = random.randint(0, 9)
-    one = random.randint(0, 9)
-    # ensure units produce carry
-    max_iterations = 1000
-    iterations = 0
-    while (u1 + one) < 10:
-        u1 = random.randint(0, 9)
-        one = random.randint(0, 9)
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: force a carry
-            u1, one = 9, 9
-            break
-    a = 10 * tens + u1
-    return f"{a} + {one}", a + one
-
-def gen_2A2C() -> Tuple[str, Answer]:
+    return _draw("2A1C", rng)
+
+def gen_2A2C(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2 + 2 digit addition - double carry (carry from units to tens AND tens to hundreds)"""
-    # select digits such that:
-    # units sum >= 10 -> carry1 = 1
-    # tens sum + carry1 >= 10 -> carry2 = 1
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        u1 = random.randint(0, 9)
-        u2 = random.randint(0, 9)
-        c1 = 1 if (u1 + u2) >= 10 else 0
-        t1 = random.randint(1, 9)
-        t2 = random.randint(1, 9)
-        if (t1 + t2 + c1) >= 10:
-            a = 10 * t1 + u1
-            b = 10 * t2 + u2
-            return f"{a} + {b}", a + b
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: force double carry
-            a, b = 99, 99
-            return f"{a} + {b}", a + b
-
-def gen_2S1B() -> Tuple[str, Answer]:
+    return _draw("2A2C", rng)
+
+def gen_2S1B(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2 - 1 digit subtraction - borrow (units < subtrahend -> borrow occurs)"""
-    tens = random.randint(1, 9)
-    units = random.randint(0, 8)
-    # choose subtrahend > units to force borrow
-    sub = random.randint(units + 1, 9)
-    a = 10 * tens + units
-    return f"{a} - {sub}", a - sub
-
-def gen_2S2() -> Tuple[str, Answer]:
+    return _draw("2S1B", rng)
+
+def gen_2S2(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2 - 2 digit subtraction - no borrow (digitwise minuend >= subtrahend)"""
-    t1 = random.randint(1, 9)
-    u1 = random.randint(0, 9)
-    t2 = random.randint(1, t1)  # ensure tens >=
-    u2 = random.randint(0, u1)  # ensure units >=
-    a = 10 * t1 + u1
-    b = 10 * t2 + u2
-    return f"{a} - {b}", a - b
-
-def gen_2S2B() -> Tuple[str, Answer]:
+    return _draw("2S2", rng)
+
+def gen_2S2B(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2 - 2 digit subtraction - single borrow (units place requires borrow, tens does not)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        t1 = random.randint(1, 9)
-        u1 = random.randint(0, 9)
-        t2 = random.randint(1, 9)
-        u2 = random.randint(0, 9)
-        a = 10 * t1 + u1
-        b = 10 * t2 + u2
-        if a <= b:
-            iterations += 1
-            if iterations > max_iterations:
-                # Fallback: construct a valid single borrow case
-                a, b = 52, 28
-                return f"{a} - {b}", a - b
-            continue
-        # Single borrow: units requires borrow but tens doesn't
-        # Units borrow if u1 < u2
-        # After borrowing for units, tens has (t1 - 1), which must be >= t2
-        if u1 < u2 and (t1 - 1) >= t2:
-            return f"{a} - {b}", a - b
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a valid single borrow case
-            a, b = 52, 28
-            return f"{a} - {b}", a - b
-
-def gen_T10() -> Tuple[str, Answer]:
+    return _draw("2S2B", rng)
+
+def gen_T10(rng: RNGLike = None) -> Tuple[str, Answer]:
     """Multiplication tables - 5 to 10 (i.e., choose multiplier 5..10)"""
-    a = random.randint(6, 10)
-    b = random.randint(2, 10)
-    return f"{a} × {b}", a * b
+    return _draw("T10", rng)
 
-def gen_3A() -> Tuple[str, Answer]:
+def gen_3A(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3-digit addition - no carry (no digit pair sums >= 10)"""
-    d1 = random.randint(1, 9)
-    d2 = random.randint(0, 9)
-    d3 = random.randint(0, 9)
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        e1 = random.randint(1, 9)
-        e2 = random.randint(0, 9)
-        e3 = random.randint(0, 9)
-        if d3 + e3 < 10 and d2 + e2 < 10 and d1 + e1 < 10:
-            a = 100 * d1 + 10 * d2 + d3
-            b = 100 * e1 + 10 * e2 + e3
-            return f"{a} + {b}", a + b
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a valid no-carry case
-            a, b = 111, 222
-            return f"{a} + {b}", a + b
-
-def gen_3AC() -> Tuple[str, Answer]:
+    return _draw("3A", rng)
+
+def gen_3AC(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3-digit addition - single carry (exactly one column causes carry)"""
-    # build digits such that exactly one of the three columns has sum >= 10
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        A = [random.randint(1, 9), random.randint(0, 9), random.randint(0, 9)]
-        B = [random.randint(1, 9), random.randint(0, 9), random.randint(0, 9)]
-        carries = 0
-        # unit
-        if A[2] + B[2] >= 10:
-            carries += 1
-            c1 = 1
-        else:
-            c1 = 0
-        # tens
-        if A[1] + B[1] + c1 >= 10:
-            carries += 1
-            c2 = 1
-        else:
-            c2 = 0
-        # hundreds
-        if A[0] + B[0] + c2 >= 10:
-            carries += 1
-        if carries == 1:
-            a = 100 * A[0] + 10 * A[1] + A[2]
-            b = 100 * B[0] + 10 * B[1] + B[2]
-            return f"{a} + {b}", a + b
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a case with exactly 1 carry
-            a, b = 105, 108  # Only units carry: 5+8=13
-            return f"{a} + {b}", a + b
-
-def gen_3S() -> Tuple[str, Answer]:
+    return _draw("3AC", rng)
+
+def gen_3S(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3-digit subtraction - no borrow (digitwise minuend >= subtrahend)"""
-    A0 = random.randint(1, 9)
-    A1 = random.randint(0, 9)
-    A2 = random.randint(0, 9)
-    B0 = random.randint(1, A0)
-    B1 = random.randint(0, A1)
-    B2 = random.randint(0, A2)
-    a = 100 * A0 + 10 * A1 + A2
-    b = 100 * B0 + 10 * B1 + B2
-    return f"{a} - {b}", a - b
-
-def gen_3AC2() -> Tuple[str, Answer]:
+    return _draw("3S", rng)
+
+def gen_3AC2(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3-digit addition - double carry (exactly two columns cause a carry)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        A = [random.randint(1, 9), random.randint(0, 9), random.randint(0, 9)]
-        B = [random.randint(1, 9), random.randint(0, 9), random.randint(0, 9)]
-        carries = 0
-        c1 = 1 if A[2] + B[2] >= 10 else 0
-        if c1: carries += 1
-        c2 = 1 if (A[1] + B[1] + c1) >= 10 else 0
-        if c2: carries += 1
-        c3 = 1 if (A[0] + B[0] + c2) >= 10 else 0
-        if c3: carries += 1
-        # double carry -> exactly 2 columns produced carry
-        if carries == 2:
-            a = 100 * A[0] + 10 * A[1] + A[2]
-            b = 100 * B[0] + 10 * B[1] + B[2]
-            return f"{a} + {b}", a + b
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a case with exactly 2 carries
-            a, b = 195, 108  # Units carry (5+8=13), tens carry (9+0+1=10)
-            return f"{a} + {b}", a + b
-
-def gen_3SB() -> Tuple[str, Answer]:
+    return _draw("3AC2", rng)
+
+def gen_3SB(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3-digit subtraction - single borrow (exactly one borrow occurs)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        A = [random.randint(1, 9), random.randint(0, 9), random.randint(0, 9)]
-        B = [random.randint(0, 9), random.randint(0, 9), random.randint(0, 9)]
-        # require A >= B overall
-        a = 100 * A[0] + 10 * A[1] + A[2]
-        b = 100 * B[0] + 10 * B[1] + B[2]
-        if a <= b:
-            iterations += 1
-            if iterations > max_iterations:
-                # Fallback: construct a valid single borrow case
-                a, b = 325, 218  # Only units borrow: 5<8
-                return f"{a} - {b}", a - b
-            continue
-        # compute borrows by simulating column subtraction
-        borrows = 0
-        A2, A1, A0 = A[2], A[1], A[0]  # units, tens, hundreds (we'll treat reversed)
-        # units
-        if A2 < B[2]:
-            borrows += 1
-            # simulate borrow: tens reduced by 1
-            t1 = A1 - 1
-        else:
-            t1 = A1
-        # tens
-        if t1 < B[1]:
-            borrows += 1
-            h = A0 - 1
-        else:
-            h = A0
-        # hundreds
-        if h < B[0]:
-            borrows += 1
-        if borrows == 1:
-            return f"{a} - {b}", a - b
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a valid single borrow case
-            a, b = 325, 218  # Only units borrow: 5<8
-            return f"{a} - {b}", a - b
-
-def gen_3SB2() -> Tuple[str, Answer]:
+    return _draw("3SB", rng)
+
+def gen_3SB2(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3-digit subtraction - double borrow (exactly two borrows occur)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        A = [random.randint(1, 9), random.randint(0, 9), random.randint(0, 9)]
-        B = [random.randint(0, 9), random.randint(0, 9), random.randint(0, 9)]
-        a = 100 * A[0] + 10 * A[1] + A[2]
-        b = 100 * B[0] + 10 * B[1] + B[2]
-        if a <= b:
-            iterations += 1
-            if iterations > max_iterations:
-                # Fallback: construct a valid double borrow case
-                a, b = 302,  198  # Both units and tens borrow
-                return f"{a} - {b}", a - b
-            continue
-        borrows = 0
-        A2, A1, A0 = A[2], A[1], A[0]
-        if A2 < B[2]:
-            borrows += 1
-            t1 = A1 - 1
-        else:
-            t1 = A1
-        if t1 < B[1]:
-            borrows += 1
-            h = A0 - 1
-        else:
-            h = A0
-        if h < B[0]:
-            borrows += 1
-        if borrows == 2:
-            return f"{a} - {b}", a - b
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a valid double borrow case
-            a, b = 302, 198  # Both units and tens borrow
-            return f"{a} - {b}", a - b
+    return _draw("3SB2", rng)
 
 # -----------------------
 # Multiplication
 # -----------------------
 
-def gen_2M1() -> Tuple[str, Answer]:
+def gen_2M1(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2x1 multiplication - no carry (each digit * multiplier < 10)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        multiplier = random.randint(2, 9)
-        tens = random.randint(1, 9)
-        units = random.randint(0, 9)
-        if multiplier * units < 10 and multiplier * tens < 10:
-            a = 10 * tens + units
-            return f"{a} × {multiplier}", a * multiplier
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a valid no-carry case
-            a, multiplier = 11, 2
-            return f"{a} × {multiplier}", a * multiplier
-
-def gen_3M1() -> Tuple[str, Answer]:
+    return _draw("2M1", rng)
+
+def gen_3M1(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3x1 multiplication - no carry (each digit * multiplier < 10)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        multiplier = random.randint(2, 9)
-        h = random.randint(1, 9)
-        t = random.randint(0, 9)
-        u = random.randint(0, 9)
-        if multiplier * u < 10 and multiplier * t < 10 and multiplier * h < 10:
-            a = 100 * h + 10 * t + u
-            return f"{a} × {multiplier}", a * multiplier
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a valid no-carry case
-            a, multiplier = 111, 2
-            return f"{a} × {multiplier}", a * multiplier
-
-def gen_2M1C() -> Tuple[str, Answer]:
+    return _draw("3M1", rng)
+
+def gen_2M1C(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2x1 multiplication - carry (at least one digit*multiplier >= 10)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        multiplier = random.randint(2, 9)
-        tens = random.randint(1, 9)
-        units = random.randint(0, 9)
-        if multiplier * units >= 10 or multiplier * tens >= 10:
-            a = 10 * tens + units
-            return f"{a} × {multiplier}", a * multiplier
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: force a carry
-            a, multiplier = 15, 2
-            return f"{a} × {multiplier}", a * multiplier
-
-def gen_3M1C() -> Tuple[str, Answer]:
+    return _draw("2M1C", rng)
+
+def gen_3M1C(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3x1 multiplication - single carry (exactly one digit*multiplier produces carry)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        multiplier = random.randint(2, 9)
-        h = random.randint(1, 9)
-        t = random.randint(0, 9)
-        u = random.randint(0, 9)
-        prod_flags = [multiplier * u >= 10, multiplier * t >= 10, multiplier * h >= 10]
-        if sum(prod_flags) == 1:
-            a = 100 * h + 10 * t + u
-            return f"{a} × {multiplier}", a * multiplier
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: exactly one carry
-            a, multiplier = 105, 2
-            return f"{a} × {multiplier}", a * multiplier
-
-def gen_3M1C2() -> Tuple[str, Answer]:
+    return _draw("3M1C", rng)
+
+def gen_3M1C2(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3x1 multiplication - double carry (exactly two digit*multiplier produces carry)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        multiplier = random.randint(2, 9)
-        h = random.randint(1, 9)
-        t = random.randint(0, 9)
-        u = random.randint(0, 9)
-        prod_flags = [multiplier * u >= 10, multiplier * t >= 10, multiplier * h >= 10]
-        if sum(prod_flags) == 2:
-            a = 100 * h + 10 * t + u
-            return f"{a} × {multiplier}", a * multiplier
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: exactly two carries
-            a, multiplier = 566, 2
-            return f"{a} × {multiplier}", a * multiplier
-
-def gen_2M2() -> Tuple[str, Answer]:
+    return _draw("3M1C2", rng)
+
+def gen_2M2(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2x2 multiplication - no carry. (each single-digit product < 10)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        a1 = random.randint(1, 9)
-        a0 = random.randint(0, 9)
-        b1 = random.randint(1, 9)
-        b0 = random.randint(0, 9)
-        if (a0 * b0 < 10) and (a0 * b1 < 10) and (a1 * b0 < 10) and (a1 * b1 < 10):
-            a = 10 * a1 + a0
-            b = 10 * b1 + b0
-            return f"{a} × {b}", a * b
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: no carry case
-            a, b = 11, 22
-            return f"{a} × {b}", a * b
-
-def gen_2M2C() -> Tuple[str, Answer]:
+    return _draw("2M2", rng)
+
+def gen_2M2C(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2x2 multiplication - carry (at least one single-digit product >= 10)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        a1 = random.randint(1, 9)
-        a0 = random.randint(0, 9)
-        b1 = random.randint(1, 9)
-        b0 = random.randint(0, 9)
-        cond = (a0 * b0 >= 10) or (a0 * b1 >= 10) or (a1 * b0 >= 10) or (a1 * b1 >= 10)
-        if cond:
-            a = 10 * a1 + a0
-            b = 10 * b1 + b0
-            return f"{a} × {b}", a * b
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: force a carry
-            a, b = 15, 16
-            return f"{a} × {b}", a * b
-
-def gen_3M2C() -> Tuple[str, Answer]:
+    return _draw("2M2C", rng)
+
+def gen_3M2C(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3x2 multiplication - carry (three-digit times two-digit where at least one single-digit product >= 10)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        a2 = random.randint(1, 9)
-        a1 = random.randint(0, 9)
-        a0 = random.randint(0, 9)
-        b1 = random.randint(1, 9)
-        b0 = random.randint(0, 9)
-        cond = any(x >= 10 for x in [a0*b0, a1*b0, a2*b0, a0*b1, a1*b1, a2*b1])
-        if cond:
-            a = 100 * a2 + 10 * a1 + a0
-            b = 10 * b1 + b0
-            return f"{a} × {b}", a * b
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: force a carry
-            a, b = 115, 16
-            return f"{a} × {b}", a * b
+    return _draw("3M2C", rng)
 
 # -----------------------
 # Division
 # -----------------------
 
-def gen_2D1() -> Tuple[str, Answer]:
+def gen_2D1(rng: RNGLike = None) -> Tuple[str, Answer]:
     """
     2-digit ÷ 1-digit division WITHOUT remainder.
     e.g., 48 ÷ 6 = 8
     """
-    divisor = random.randint(2, 9)
-    quotient = random.randint(1, 9)     # ensures dividend remains 2-digit
-    tens = random.randint(1, 9)         # create 2-digit quotient indirectly
-    dividend = (10 * tens + quotient) * divisor
-    if dividend < 10 or dividend > 99:
-        return gen_2D1()                # retry if not 2-digit
-    return f"{dividend} ÷ {divisor}", dividend // divisor
-
-def gen_3D1() -> Tuple[str, Answer]:
+    return _draw("2D1", rng)
+
+def gen_3D1(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3/1 division without remainder (three-digit dividend divided by one-digit divisor evenly)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        dividend = random.randint(100, 999)
-        divisor = random.randint(2, 9)
-        if dividend % divisor == 0:
-            return f"{dividend} ÷ {divisor}", dividend // divisor
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a valid division
-            dividend, divisor = 120, 2
-            return f"{dividend} ÷ {divisor}", dividend // divisor
-
-def gen_2D1R() -> Tuple[str, Answer]:
+    return _draw("3D1", rng)
+
+def gen_2D1R(rng: RNGLike = None) -> Tuple[str, Answer]:
     """2/1 division with remainder (two-digit dividend divided by one-digit divisor with remainder)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        dividend = random.randint(10, 99)
-        divisor = random.randint(2, 9)
-        if dividend % divisor != 0:
-            return f"{dividend} ÷ {divisor}", (dividend // divisor, dividend % divisor)
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a valid division with remainder
-            dividend, divisor = 23, 5
-            return f"{dividend} ÷ {divisor}", (dividend // divisor, dividend % divisor)
-
-def gen_3D1R() -> Tuple[str, Answer]:
+    return _draw("2D1R", rng)
+
+def gen_3D1R(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3/1 division with remainder (three-digit dividend divided by one-digit divisor with remainder)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        dividend = random.randint(100, 999)
-        divisor = random.randint(2, 9)
-        if dividend % divisor != 0:
-            return f"{dividend} ÷ {divisor}", (dividend // divisor, dividend % divisor)
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a valid division with remainder
-            dividend, divisor = 123, 5
-            return f"{dividend} ÷ {divisor}", (dividend // divisor, dividend % divisor)
-
-def gen_3D1Z() -> Tuple[str, Answer]:
+    return _draw("3D1R", rng)
+
+def gen_3D1Z(rng: RNGLike = None) -> Tuple[str, Answer]:
     """3/1 division with 0 in quotient (we produce a division where quotient's middle digit is 0, no remainder)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        divisor = random.randint(2, 9)
-        # construct quotient as a0b with 3-digit quotient
-        a = random.randint(1, 4)  # keep product in 3-digit
-        b = random.randint(0, 9)
-        quo = 100 * a + 0 * 10 + b  # a0b
-        dividend = divisor * quo
-        if 100 <= dividend <= 999:
-            return f"{dividend} ÷ {divisor}", quo
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a valid case
-            dividend, divisor, quo = 202, 2, 101
-            return f"{dividend} ÷ {divisor}", quo
-
-def gen_4D1R() -> Tuple[str, Answer]:
+    return _draw("3D1Z", rng)
+
+def gen_4D1R(rng: RNGLike = None) -> Tuple[str, Answer]:
     """4/1 division with remainder (four-digit dividend divided by one-digit divisor with remainder)"""
-    max_iterations = 1000
-    iterations = 0
-    while True:
-        dividend = random.randint(1000, 9999)
-        divisor = random.randint(2, 9)
-        if dividend % divisor != 0:
-            return f"{dividend} ÷ {divisor}", (dividend // divisor, dividend % divisor)
-        iterations += 1
-        if iterations > max_iterations:
-            # Fallback: construct a valid division with remainder
-            dividend, divisor = 1234, 5
-            return f"{dividend} ÷ {divisor}", (dividend // divisor, dividend % divisor)
+    return _draw("4D1R", rng)
 
 # -----------------------
 # Dispatcher and helpers
@@ -634,24 +362,36 @@ _gen_map = {
     "4D1R": gen_4D1R,
 }
 
-def gen_questions(code: str, n: int):
+def gen_questions(code: str, n: int, rng: RNGLike = None):
     """
     Generate n questions for the given skill code.
     Returns a list of (question_str, answer) tuples.
+    Pass an int seed or a numpy Generator as rng for reproducible output.
     """
     code = code.strip()
-    if code not in _gen_map:
+    if code not in _space_map:
         raise ValueError(f"Unknown code: {code}")
-    
-    generator = _gen_map[code]
-    out = []
-    for _ in range(n):
-        out.append(generator())
-    return out
+
+    return format_questions(gen_questions_array(code, n, rng))
+
+def gen_records(code: str, n: int, rng: RNGLike = None) -> list:
+    """
+    Generate n questions for the given skill code.
+    Returns a list of QuestionRecord.
+    """
+    return to_records(gen_questions_array(code, n, rng))
+
+def records_at(code: str, indices) -> list:
+    """
+    Return the questions at the given positions of a skill's operand space
+    (0 <= index < len(_space_map[code])) as a list of QuestionRecord.
+    """
+    a, b = _space_map[code].take(np.asarray(indices, dtype=np.int64))
+    return to_records(_question_arrays(code, a, b))
 
 # Backwards-compatible single-question call
-def gen_question(code: str):
-    return gen_questions(code, 1)[0]
+def gen_question(code: str, rng: RNGLike = None):
+    return gen_questions(code, 1, rng)[0]
 
 # -----------------------
 # Quick demo when run as script
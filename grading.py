@@ -0,0 +1,410 @@
+"""
+Bulk grading of student responses against worksheet answer keys.
+
+An AnswerKey packs the questions of many worksheets into flat NumPy arrays
+(correct option, skill, difficulty and the misconception behind every
+distractor). Responses are a (rows, questions) array of option indices, so
+grading millions of rows is a handful of vectorized comparisons and
+bincounts. Counts accumulate in a Grades object across chunks and are then
+aggregated per question, per skill code, per difficulty level and per
+misconception (which distractor each wrong answer picked).
+
+Answer keys load from any worksheet output: create_worksheet_json lists,
+batch.py JSONL (.gz) files or directories of saved worksheets, and the
+legacy [{"answerKey": [...]}, [questions]] files. Responses are CSV rows of
+worksheet id and answer letters (blank or "-" for unanswered):
+
+    worksheet,answers
+    s001_mr_level_G_1,ABDC-CBAD...
+
+Usage:
+    python grading.py worksheets.jsonl.gz responses.csv --out report.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+import distractors
+from generate import _REMAINDER_CODES
+from jsonl_writer import read_jsonl
+from locales import to_arabic
+from skill_catalog import get_catalog
+
+LETTERS = "ABCD"
+
+# Response code for an unanswered (or unreadable) question
+BLANK = 4
+
+# Option letter byte -> response code; everything else is BLANK
+_LETTER_CODES = np.full(256, BLANK, dtype=np.uint8)
+for _i, _letter in enumerate(LETTERS):
+    _LETTER_CODES[ord(_letter)] = _i
+    _LETTER_CODES[ord(_letter.lower())] = _i
+
+# Misconception label of the correct option and of fallback-filled distractors
+CORRECT = "correct"
+FALLBACK = "fallback"
+
+
+def worksheet_questions(worksheet) -> list:
+    """The question dicts of one worksheet in any supported layout."""
+    if isinstance(worksheet, dict):
+        return worksheet["questions"]
+    if worksheet and isinstance(worksheet[0], dict) and "answerKey" in worksheet[0]:
+        # Legacy [{"answerKey": [...]}, [questions]]
+        return worksheet[1]
+    if worksheet and isinstance(worksheet[0], dict) and "questions" in worksheet[0]:
+        # create_worksheet_json output: [{"title": ..., "questions": [...]}]
+        return worksheet[0]["questions"]
+    return worksheet
+
+
+def _option_sources(question: dict) -> list:
+    """Misconception label for each of a question's four options."""
+    skill_code = question["skill_code"]
+    options = [to_arabic(str(opt)) for opt in question["options"]]
+    correct = LETTERS.index(question["correct_option"])
+    if skill_code not in distractors._distractors_map:
+        return [CORRECT if i == correct else FALLBACK for i in range(len(options))]
+    correct_ans = options[correct] if skill_code in _REMAINDER_CODES else int(options[correct])
+    sources = distractors.distractor_sources(skill_code, to_arabic(question["question_text"]), correct_ans)
+    return [CORRECT if i == correct else sources.get(opt, FALLBACK) for i, opt in enumerate(options)]
+
+
+class AnswerKey:
+    """
+    Answer keys of many worksheets as flat arrays, one entry per question.
+
+    Args:
+        worksheets: dict of worksheet id -> worksheet (any layout accepted by
+                    load_answer_key), in the order they are to be indexed.
+    """
+
+    def __init__(self, worksheets: dict):
+        self.ids = list(worksheets)
+        self.id_index = {worksheet_id: i for i, worksheet_id in enumerate(self.ids)}
+
+        catalog = get_catalog()
+        lengths = []
+        codes, correct, sources, texts, options = [], [], [], [], []
+        for worksheet in worksheets.values():
+            questions = worksheet_questions(worksheet)
+            lengths.append(len(questions))
+            for q in questions:
+                codes.append(q["skill_code"])
+                correct.append(LETTERS.index(q["correct_option"]))
+                sources.append(_option_sources(q))
+                texts.append(q["question_text"])
+                options.append([str(opt) for opt in q["options"]])
+
+        self.lengths = np.array(lengths, dtype=np.int32)
+        # Position of each worksheet's first question in the flat arrays
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths))).astype(np.int64)
+        self.max_length = int(self.lengths.max()) if len(lengths) else 0
+
+        self.skill_codes = list(dict.fromkeys(codes))
+        skill_index = {code: i for i, code in enumerate(self.skill_codes)}
+        self.skill = np.array([skill_index[code] for code in codes], dtype=np.int32)
+        difficulty = {code: catalog.by_code[code].difficulty_level if code in catalog.by_code else None
+                      for code in self.skill_codes}
+        self.difficulty = np.array([difficulty[code] or 0 for code in codes], dtype=np.int32)
+
+        self.correct = np.array(correct, dtype=np.uint8)
+        self.sources = np.array(sources, dtype=object).reshape(-1, 4)
+        self.question_text = texts
+        self.options = options
+
+    def __len__(self) -> int:
+        """Number of questions across all worksheets."""
+        return len(self.correct)
+
+    def worksheet_indices(self, worksheet_ids) -> np.ndarray:
+        """
+        Map worksheet ids to their positions, converting each distinct id once.
+
+        Raises:
+            KeyError: If an id is not in the key.
+        """
+        unique, inverse = np.unique(np.asarray(worksheet_ids), return_inverse=True)
+        positions = np.array([self.id_index[worksheet_id] for worksheet_id in unique.tolist()], dtype=np.int64)
+        return positions[inverse]
+
+
+def load_answer_key(path: str) -> AnswerKey:
+    """
+    Load an AnswerKey from worksheet output.
+
+    Args:
+        path: A JSONL/.jsonl.gz file written by batch.py (ids are its "id"
+              field), a JSON file holding one worksheet or a list of
+              worksheet objects (ids are their positions, "0", "1", ...), or
+              a directory of saved worksheets (ids are the file stems).
+
+    Returns:
+        AnswerKey
+    """
+    worksheets = {}
+    if os.path.isdir(path):
+        for file in sorted(Path(path).glob("*.json")):
+            with open(file, encoding="utf-8") as f:
+                worksheets[file.stem] = json.load(f)
+    elif path.endswith((".jsonl", ".jsonl.gz")):
+        for record in read_jsonl(path):
+            worksheets[record["id"]] = record["worksheet"]
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list) and data and isinstance(data[0], dict) and "questions" in data[0]:
+            # A list of worksheet objects
+            worksheets = {str(i): worksheet for i, worksheet in enumerate(data)}
+        else:
+            worksheets = {"0": data}
+    return AnswerKey(worksheets)
+
+
+def encode_responses(answers) -> np.ndarray:
+    """
+    Convert answer strings ("ABDC-...") to a (rows, max_length) uint8 array.
+
+    Letters A-D (either case) become 0-3; anything else, and missing
+    trailing answers, become BLANK.
+    """
+    answers = list(answers)
+    width = max((len(a) for a in answers), default=0)
+    data = "".join(a.ljust(width, "-") for a in answers).encode("latin-1", errors="replace")
+    codes = _LETTER_CODES[np.frombuffer(data, dtype=np.uint8)]
+    return codes.reshape(len(answers), width)
+
+
+def read_responses(path: str, chunk_rows: int = 100_000):
+    """
+    Stream a responses CSV (worksheet,answers) in chunks.
+
+    Yields:
+        (worksheet ids list, encoded responses array) per chunk_rows rows
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        ids, answers = [], []
+        if header and header[0] != "worksheet":
+            # No header row
+            ids.append(header[0])
+            answers.append(header[1] if len(header) > 1 else "")
+        for row in reader:
+            if not row:
+                continue
+            ids.append(row[0])
+            answers.append(row[1] if len(row) > 1 else "")
+            if len(ids) >= chunk_rows:
+                yield ids, encode_responses(answers)
+                ids, answers = [], []
+        if ids:
+            yield ids, encode_responses(answers)
+
+
+class Grades:
+    """
+    Response counts per question, accumulated over any number of chunks.
+
+    Args:
+        key: The AnswerKey responses are graded against.
+    """
+
+    def __init__(self, key: AnswerKey):
+        self.key = key
+        # picks[q, c]: responses to question q that chose option c (BLANK: none)
+        self.picks = np.zeros((len(key), BLANK + 1), dtype=np.int64)
+        self.rows = 0
+
+    def add(self, worksheet_ids, responses: np.ndarray) -> np.ndarray:
+        """
+        Grade a chunk of responses.
+
+        Args:
+            worksheet_ids: Worksheet id per row (or an int array of worksheet
+                           positions in the key).
+            responses: (rows, n) array of option indices 0-3 or BLANK, e.g.
+                       from encode_responses. Columns past a worksheet's
+                       length are ignored; missing columns count as BLANK,
+                       so every question of a row's worksheet is counted
+                       however the rows are chunked.
+
+        Returns:
+            int array with the number of correct answers per row.
+        """
+        key = self.key
+        responses = np.asarray(responses, dtype=np.uint8)
+        if responses.ndim != 2:
+            raise ValueError("responses must be a 2-D array")
+        worksheet_ids = np.asarray(worksheet_ids)
+        if worksheet_ids.dtype.kind in "iu":
+            positions = worksheet_ids.astype(np.int64)
+        else:
+            positions = key.worksheet_indices(worksheet_ids)
+        if len(positions) != len(responses):
+            raise ValueError("worksheet_ids and responses must have the same number of rows")
+
+        width = key.max_length
+        if responses.shape[1] < width:
+            responses = np.pad(responses, ((0, 0), (0, width - responses.shape[1])), constant_values=BLANK)
+        responses = np.minimum(responses[:, :width], BLANK)
+        columns = np.arange(width)
+        valid = columns[None, :] < key.lengths[positions][:, None]
+        question = key.offsets[positions][:, None] + columns[None, :]
+
+        q = question[valid]
+        r = responses[valid]
+        self.picks += np.bincount(q * (BLANK + 1) + r, minlength=self.picks.size).reshape(self.picks.shape)
+        self.rows += len(responses)
+
+        correct = np.zeros(responses.shape, dtype=bool)
+        correct[valid] = r == key.correct[q]
+        return correct.sum(axis=1)
+
+    # -- aggregates -------------------------------------------------------------
+
+    @property
+    def attempted(self) -> np.ndarray:
+        """Answered (non-blank) responses per question."""
+        return self.picks[:, :BLANK].sum(axis=1)
+
+    @property
+    def correct(self) -> np.ndarray:
+        """Correct responses per question."""
+        return self.picks[np.arange(len(self.key)), self.key.correct]
+
+    def _grouped(self, groups: np.ndarray, labels: list) -> dict:
+        attempted = np.bincount(groups, weights=self.attempted, minlength=len(labels))
+        correct = np.bincount(groups, weights=self.correct, minlength=len(labels))
+        blank = np.bincount(groups, weights=self.picks[:, BLANK], minlength=len(labels))
+        return {
+            label: {
+                "attempted": int(attempted[i]),
+                "correct": int(correct[i]),
+                "blank": int(blank[i]),
+                "accuracy": float(correct[i] / attempted[i]) if attempted[i] else None,
+            }
+            for i, label in enumerate(labels)
+            if attempted[i] or blank[i]
+        }
+
+    def by_skill(self) -> dict:
+        """skill_code -> {attempted, correct, blank, accuracy}."""
+        return self._grouped(self.key.skill, self.key.skill_codes)
+
+    def by_difficulty(self) -> dict:
+        """difficulty level -> {attempted, correct, blank, accuracy} (0: unknown level)."""
+        levels = list(range(int(self.key.difficulty.max()) + 1)) if len(self.key) else []
+        return self._grouped(self.key.difficulty, levels)
+
+    def by_question(self) -> list:
+        """One dict per question with its accuracy and how often each option was picked."""
+        key = self.key
+        attempted, correct = self.attempted, self.correct
+        out = []
+        for w, worksheet_id in enumerate(key.ids):
+            for i in range(key.offsets[w], key.offsets[w + 1]):
+                if not attempted[i] and not self.picks[i, BLANK]:
+                    continue
+                out.append({
+                    "worksheet": worksheet_id,
+                    "index": int(i - key.offsets[w] + 1),
+                    "skill_code": key.skill_codes[key.skill[i]],
+                    "question_text": key.question_text[i],
+                    "attempted": int(attempted[i]),
+                    "correct": int(correct[i]),
+                    "accuracy": float(correct[i] / attempted[i]) if attempted[i] else None,
+                    "picks": {
+                        LETTERS[c]: {
+                            "option": key.options[i][c],
+                            "source": key.sources[i, c],
+                            "count": int(self.picks[i, c]),
+                        }
+                        for c in range(BLANK)
+                    },
+                    "blank": int(self.picks[i, BLANK]),
+                })
+        return out
+
+    def by_misconception(self) -> dict:
+        """
+        Which distractors wrong answers picked.
+
+        Returns:
+            skill_code -> {source: count} over wrong answers, where source is
+            the distractor function that produced the chosen option (see
+            distractors.distractor_sources) or "fallback".
+        """
+        key = self.key
+        wrong = self.picks[:, :BLANK].copy()
+        wrong[np.arange(len(key)), key.correct] = 0
+        question, option = np.nonzero(wrong)
+        out = {}
+        for q, c in zip(question.tolist(), option.tolist()):
+            by_source = out.setdefault(key.skill_codes[key.skill[q]], {})
+            source = key.sources[q, c]
+            by_source[source] = by_source.get(source, 0) + int(wrong[q, c])
+        return out
+
+    def report(self, questions: bool = False) -> dict:
+        """JSON-serializable summary; per-question detail only when questions=True."""
+        attempted, correct = int(self.attempted.sum()), int(self.correct.sum())
+        report = {
+            "rows": self.rows,
+            "attempted": attempted,
+            "correct": correct,
+            "accuracy": correct / attempted if attempted else None,
+            "by_skill": self.by_skill(),
+            "by_difficulty": {str(level): v for level, v in self.by_difficulty().items()},
+            "by_misconception": self.by_misconception(),
+        }
+        if questions:
+            report["by_question"] = self.by_question()
+        return report
+
+
+def grade(key: AnswerKey, worksheet_ids, responses: np.ndarray) -> Grades:
+    """Grade one batch of responses; see Grades.add."""
+    grades = Grades(key)
+    grades.add(worksheet_ids, responses)
+    return grades
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Grade student responses against worksheet answer keys.")
+    parser.add_argument("key", help="Worksheets: batch JSONL (.gz), a worksheet JSON file or a directory")
+    parser.add_argument("responses", help="CSV of worksheet,answers rows")
+    parser.add_argument("--out", default=None, help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--questions", action="store_true", help="Include per-question detail")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Responses graded per chunk")
+    args = parser.parse_args(argv)
+
+    key = load_answer_key(args.key)
+    grades = Grades(key)
+    try:
+        for ids, responses in read_responses(args.responses, args.chunk_rows):
+            grades.add(ids, responses)
+    except KeyError as e:
+        print(f"Unknown worksheet id in responses: {e}")
+        return 1
+
+    report = grades.report(questions=args.questions)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Graded {grades.rows} rows ({report['accuracy'] or 0:.1%} correct); report saved to {args.out}")
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Opt-in timing and counters for worksheet builds.
+
+Disabled by default; enable with enable() or WORKSHEET_METRICS=1. While
+disabled, timer() and count() return immediately.
+
+Stages (timed per call, as latency histograms):
+- worksheet: a whole create_worksheet_json call
+- distribution: choosing the skill distribution for a level
+- generate: drawing the questions for one skill (generate.gen_records)
+- distractors: distractors.build_distractors for one question
+- reservoir: dequeuing one skill's questions from a reservoir.QuestionReservoir
+- bank: sampling one skill's questions from a question_bank.QuestionBank
+- choose_distractors: Question.choose_distractors for one question
+- render: rendering a worksheet's JSON in its language(s)
+
+Counters (per skill code):
+- generate.draws: questions drawn
+- distractors.table_hits: distractor sets answered from a precomputed table
+- distractors.errors: distractor exceptions that were printed and swallowed
+- distractors.fallback: questions that needed the numeric fallback offsets
+- distractors.fallback_fill: distractors added by the non-negative fallback fill
+- reservoir.hits / reservoir.starved: items dequeued from a reservoir, and
+  dequeues that found it short
+
+Example:
+    import instrumentation
+    instrumentation.enable()
+    create_worksheet_json("Test", "G", "mr")
+    print(instrumentation.snapshot()["stages"]["distractors"]["p99"])
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds: 1µs, 2µs, 4µs, ... ~1s, then overflow
+BUCKET_BOUNDS = [1e-6 * 2 ** i for i in range(21)]
+
+_enabled = os.getenv("WORKSHEET_METRICS", "") == "1"
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+
+class Histogram:
+    """Latency histogram with fixed log-scale buckets, so histograms from different processes can be merged."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds: float):
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (0-100), capped at the maximum seen."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                bound = BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min or 0.0,
+            "max": self.max or 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": list(self.buckets),
+        }
+
+    def merge(self, data: dict):
+        """Add the counts of a histogram serialized by to_dict."""
+        if not data["count"]:
+            return
+        for i, n in enumerate(data["buckets"]):
+            self.buckets[i] += n
+        self.count += data["count"]
+        self.total += data["total"]
+        self.min = data["min"] if self.min is None else min(self.min, data["min"])
+        self.max = data["max"] if self.max is None else max(self.max, data["max"])
+
+
+def enable():
+    """Start recording."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stop recording (recorded data is kept until reset)."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Discard everything recorded so far."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def record(stage: str, seconds: float):
+    """Add one latency sample to a stage's histogram."""
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = Histogram()
+        histogram.add(seconds)
+
+
+@contextmanager
+def _timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def _untimed():
+    yield
+
+
+def timer(stage: str):
+    """Context manager timing its block into the stage histogram (a no-op while disabled)."""
+    return _timed(stage) if _enabled else _untimed()
+
+
+def count(name: str, skill_code: str = None, n: int = 1):
+    """Increment a counter, optionally broken down by skill code."""
+    if not _enabled:
+        return
+    with _lock:
+        by_skill = _counters.setdefault(name, {})
+        key = skill_code or "all"
+        by_skill[key] = by_skill.get(key, 0) + n
+
+
+def snapshot() -> dict:
+    """
+    Return everything recorded so far as JSON-serializable data.
+
+    Returns:
+        dict with "stages" (stage -> histogram summary with count, total,
+        mean, min, max, p50/p90/p99 in seconds and raw bucket counts) and
+        "counters" (name -> {skill_code: count}).
+    """
+    with _lock:
+        return {
+            "bucket_bounds": BUCKET_BOUNDS,
+            "stages": {stage: h.to_dict() for stage, h in _histograms.items()},
+            "counters": {name: dict(by_skill) for name, by_skill in _counters.items()},
+        }
+
+
+def merge(data: dict):
+    """Add a snapshot (e.g. from a worker process) into this process's data."""
+    with _lock:
+        for stage, hist in data.get("stages", {}).items():
+            histogram = _histograms.get(stage)
+            if histogram is None:
+                histogram = _histograms[stage] = Histogram()
+            histogram.merge(hist)
+        for name, by_skill in data.get("counters", {}).items():
+            mine = _counters.setdefault(name, {})
+            for key, n in by_skill.items():
+                mine[key] = mine.get(key, 0) + n
+
+
+def dump(path: str):
+    """Write snapshot() to a JSON file."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2)
@@ -0,0 +1,149 @@
+"""
+Streaming JSONL sink for large worksheet runs.
+
+Records are appended one per line as soon as they are built, so memory use
+does not grow with the size of the run. Paths ending in ".gz" are written
+gzip-compressed. Writes are flushed and fsynced in batches, and reopening an
+existing file resumes after its last complete record: a partially written
+trailing line (e.g. from a crash) is dropped, and the keys of the complete
+records are available in `completed` so the caller can skip them.
+"""
+
+import gzip
+import json
+import os
+import zlib
+from typing import Iterator
+
+
+def _iter_complete_lines(path: str) -> Iterator[tuple]:
+    """
+    Yield (end_offset, line) for every complete, parseable line of a JSONL file.
+
+    For plain files end_offset is the byte offset just past the line; for
+    gzip files it is None. Iteration stops at the first truncated or corrupt
+    line.
+    """
+    if path.endswith(".gz"):
+        try:
+            with gzip.open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        return
+                    yield None, line
+        except (EOFError, OSError, zlib.error):
+            return
+    else:
+        offset = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                offset += len(line)
+                yield offset, line
+
+
+def read_jsonl(path: str) -> Iterator[dict]:
+    """Yield the complete records of a JSONL (or .jsonl.gz) file."""
+    for _, line in _iter_complete_lines(path):
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            return
+
+
+class JsonlWriter:
+    """
+    Append-only JSONL writer with batched fsync and resume.
+
+    Args:
+        path: Output file; ".gz" suffix enables gzip compression.
+        key_field: Record field identifying a record, collected into `completed` on resume.
+        fsync_every: Flush and fsync after this many records (0 disables periodic fsync).
+        resume: Keep the complete records of an existing file and append after them.
+                If False, an existing file is overwritten.
+    """
+
+    def __init__(self, path: str, key_field: str = "id", fsync_every: int = 100, resume: bool = True):
+        self.path = path
+        self.key_field = key_field
+        self.fsync_every = fsync_every
+        self.compressed = path.endswith(".gz")
+        self.completed = set()
+        self.written = 0
+        self._pending = 0
+
+        if resume and os.path.exists(path):
+            self._recover()
+            mode = "ab"
+        else:
+            mode = "wb"
+
+        self._raw = open(path, mode)
+        self._out = gzip.GzipFile(fileobj=self._raw, mode=mode) if self.compressed else self._raw
+
+    def _recover(self):
+        """Collect keys of complete records and cut off any partial tail."""
+        # A gzip member cannot be truncated in place, so the good records are
+        # streamed into a fresh file instead
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        rewrite = gzip.open(tmp_path, "wb") if self.compressed else None
+        good_end = 0
+        try:
+            for end, line in _iter_complete_lines(self.path):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                self.completed.add(record.get(self.key_field))
+                if rewrite is not None:
+                    rewrite.write(line)
+                else:
+                    good_end = end
+        finally:
+            if rewrite is not None:
+                rewrite.close()
+
+        if self.compressed:
+            os.replace(tmp_path, self.path)
+        elif good_end != os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good_end)
+
+    def write_line(self, line: str, key=None):
+        """Append an already serialized record (without trailing newline)."""
+        self._out.write(line.encode("utf-8") + b"\n")
+        self.completed.add(key)
+        self.written += 1
+        self._pending += 1
+        if self.fsync_every and self._pending >= self.fsync_every:
+            self.flush()
+
+    def write(self, record: dict):
+        """Serialize and append one record."""
+        self.write_line(json.dumps(record, ensure_ascii=False), key=record.get(self.key_field))
+
+    def flush(self, fsync: bool = True):
+        """Flush buffered records to disk; with fsync, make them durable."""
+        if self.compressed:
+            self._out.flush(zlib.Z_SYNC_FLUSH)
+        self._raw.flush()
+        if fsync:
+            os.fsync(self._raw.fileno())
+        self._pending = 0
+
+    def close(self):
+        if self._raw.closed:
+            return
+        if self.compressed:
+            # Writes the gzip trailer; the raw file stays open
+            self._out.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,137 @@
+"""
+Persistent, content-addressed cache for LLM responses.
+
+Responses are stored in SQLite, keyed by a hash of everything that determines
+the request: model, prompt, response schema, system instruction and
+temperature. Entries expire after `ttl` seconds, and the least recently used
+entries are evicted once the cache holds more than `max_entries`.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+
+class ResponseCache:
+    """
+    SQLite-backed LLM response cache.
+
+    Args:
+        path: SQLite database file.
+        ttl: Seconds an entry stays valid (None for no expiry).
+        max_entries: Maximum number of entries kept (LRU eviction).
+        enabled: If False, every lookup misses and nothing is stored.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = 30 * 24 * 3600,
+                 max_entries: int = 50000, enabled: bool = True):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL, last_used REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(model: str, prompt, schema=None, temperature: float = None,
+                 system_instruction: str = None) -> str:
+        """Hash the request parameters into a cache key."""
+        payload = json.dumps(
+            [model, prompt, schema, temperature, system_instruction],
+            sort_keys=True, ensure_ascii=False, default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None on a miss."""
+        if not self.enabled:
+            self.misses += 1
+            return None
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and row[1] + self.ttl < now:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str, model: str = None):
+        """Store a response, evicting least recently used entries beyond max_entries."""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+            conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete all expired entries. Returns the number deleted."""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        """Delete every entry."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters for this process, and the current entry count."""
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+        }
@@ -0,0 +1,134 @@
+"""
+Load test for the worksheet service (service.py).
+
+Opens `concurrency` keep-alive connections and sends `requests` requests
+across them, then reports throughput and client-side latency percentiles.
+Uses only the standard library.
+
+Usage:
+    python service.py --port 8765 &
+    python loadtest.py --port 8765 --requests 5000 --concurrency 32
+    python loadtest.py --path "/worksheet?level=G&language=en,mr" --out loadtest.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_PATHS = [f"/worksheet?level={level}&language={language}"
+                 for level in "ABCDEFG" for language in ("en", "mr")]
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, path: str) -> int:
+    """Send one GET on an open connection and read the response. Returns the status code."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host: str, port: int, paths: list, counter: list, total: int,
+                  latencies: list, statuses: dict):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter[0] < total:
+            i = counter[0]
+            counter[0] += 1
+            path = paths[i % len(paths)]
+            if "seed=" not in path:
+                path += ("&" if "?" in path else "?") + f"seed={i}"
+            start = time.perf_counter()
+            status = await _request(reader, writer, host, path)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host: str = "127.0.0.1", port: int = 8765, total: int = 1000,
+                   concurrency: int = 16, paths: list = None, warmup: int = 50) -> dict:
+    """
+    Run the load test.
+
+    Args:
+        host, port: Service address.
+        total: Requests to send (after warm-up).
+        concurrency: Concurrent keep-alive connections.
+        paths: Request paths, cycled through (default: every level in en and mr).
+        warmup: Requests sent first and not measured.
+
+    Returns:
+        dict with request counts, status counts, throughput and latency percentiles in ms.
+    """
+    paths = paths or DEFAULT_PATHS
+    if warmup:
+        await asyncio.gather(*(_client(host, port, paths, [0], warmup // concurrency + 1, [], {})
+                               for _ in range(concurrency)))
+
+    latencies = []
+    statuses = {}
+    counter = [0]
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, paths, counter, total, latencies, statuses)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "elapsed": elapsed,
+        "requests_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "mean": statistics.fmean(ms) if len(ms) else 0.0,
+            "p50": float(np.percentile(ms, 50)) if len(ms) else 0.0,
+            "p90": float(np.percentile(ms, 90)) if len(ms) else 0.0,
+            "p99": float(np.percentile(ms, 99)) if len(ms) else 0.0,
+            "max": float(ms.max()) if len(ms) else 0.0,
+        },
+        "paths": paths,
+    }
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the worksheet service.")
+    parser.add_argument("--host", default="127.0.0.1", help="Service host")
+    parser.add_argument("--port", type=int, default=8765, help="Service port")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests to send")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent connections")
+    parser.add_argument("--path", action="append", default=None,
+                        help="Request path (repeatable; default: every level in en and mr)")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured warm-up requests")
+    parser.add_argument("--out", default=None, help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_load(args.host, args.port, args.requests, args.concurrency,
+                                  args.path, args.warmup))
+    latency = report["latency_ms"]
+    print(f"{report['requests']} requests, {report['concurrency']} connections: "
+          f"{report['requests_per_sec']:.1f} req/s, statuses {report['statuses']}")
+    print(f"latency ms: mean {latency['mean']:.2f}  p50 {latency['p50']:.2f}  "
+          f"p90 {latency['p90']:.2f}  p99 {latency['p99']:.2f}  max {latency['max']:.2f}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.out}")
+    return 0 if set(report["statuses"]) <= {"200"} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Render-time localization of worksheets.
+
+Questions are generated once with Arabic (ASCII) digits. A Locale maps those
+digits to a script's digits with a cached str.translate table, and is only
+applied when a worksheet is serialized: to the question text and the four
+chosen options. Translation is character by character, so operands that
+share digits (e.g. "12 + 2") cannot corrupt each other.
+
+Example:
+    get_locale("mr").render("12 + 2")  # "१२ + २"
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+# Digits 0-9 per language code
+DIGITS = {
+    "en": "0123456789",
+    "mr": "०१२३४५६७८९",  # Devanagari
+    "hi": "०१२३४५६७८९",
+    "ne": "०१२३४५६७८९",
+    "sa": "०१२३४५६७८९",
+    "bn": "০১২৩৪৫৬৭৮৯",  # Bengali
+    "as": "০১২৩৪৫৬৭৮৯",
+    "gu": "૦૧૨૩૪૫૬૭૮૯",  # Gujarati
+    "pa": "੦੧੨੩੪੫੬੭੮੯",  # Gurmukhi
+    "or": "୦୧୨୩୪୫୬୭୮୯",  # Odia
+    "ta": "௦௧௨௩௪௫௬௭௮௯",  # Tamil
+    "te": "౦౧౨౩౪౫౬౭౮౯",  # Telugu
+    "kn": "೦೧೨೩೪೫೬೭೮೯",  # Kannada
+    "ml": "൦൧൨൩൪൫൬൭൮൯",  # Malayalam
+}
+
+# Translates the digits of every supported script back to ASCII
+_TO_ARABIC = str.maketrans({
+    digit: str(value)
+    for digits in DIGITS.values()
+    for value, digit in enumerate(digits)
+})
+
+
+@dataclass(frozen=True)
+class Locale:
+    """Digit rendering for one language."""
+    code: str
+    digits: str
+    table: dict = field(repr=False)
+
+    def render(self, value) -> str:
+        """Render a number, "12R3" answer or question text in this locale's digits."""
+        return str(value).translate(self.table)
+
+
+@lru_cache(maxsize=None)
+def get_locale(language: str) -> Locale:
+    """
+    Return the (cached) Locale for a language code.
+
+    Raises:
+        ValueError: If the language is not supported.
+    """
+    if language not in DIGITS:
+        valid = ", ".join(DIGITS)
+        raise ValueError(f"Unsupported language: {language}. Must be one of: {valid}")
+    digits = DIGITS[language]
+    return Locale(code=language, digits=digits, table=str.maketrans("0123456789", digits))
+
+
+def to_arabic(text: str) -> str:
+    """Replace the digits of any supported script with ASCII digits."""
+    return text.translate(_TO_ARABIC)
@@ -1,6 +1,13 @@
 from dataclasses import dataclass
 import random
 
+import numpy as np
+
+import generate
+from generate import QuestionRecord
+from locales import get_locale, to_arabic
+from seeding import RNGLike, get_rng
+
 
 def _is_non_negative_option(value):
     """Return True only for non-negative answer/option values."""
@@ -34,12 +41,16 @@ class Question:
     answer: int # 1-based index of the correct answer in options, to be converted later
     possible_distractors: list
     correct_option: str = None # will be filled in choose_distractors
+    record: QuestionRecord = None # structured operands/answer the question was generated from
 
-    def choose_distractors(self) -> list:
+    def choose_distractors(self, rng: RNGLike = None) -> list:
         """
         Choose 3 random distractors from all possible distractors
         and assign them random positions along with the correct answer.
         
+        Args:
+            rng: Optional int seed or numpy Generator for reproducible choices.
+
         Returns:
             list: A list of 4 options with the correct answer at a random position.
         """
@@ -55,14 +66,17 @@ class Question:
         if len(filtered_distractors) < 3:
             raise ValueError("Need at least 3 non-negative possible distractors")
 
+        rng = get_rng(rng)
+
         # Choose 3 random distractors
-        chosen_distractors = random.sample(filtered_distractors, 3)
+        chosen = rng.choice(len(filtered_distractors), size=3, replace=False)
+        chosen_distractors = [filtered_distractors[i] for i in chosen]
         
         # Create a list with the correct answer and chosen distractors
         all_options = [correct_answer] + chosen_distractors
         
         # Shuffle the options
-        random.shuffle(all_options)
+        rng.shuffle(all_options)
         
         # Find the new position (1-4) of the correct answer
         new_answer_position = all_options.index(correct_answer) + 1
@@ -73,6 +87,148 @@ class Question:
         
         return all_options
 
+    def freeze(self) -> "FrozenQuestion":
+        """Return an immutable, slotted copy of this question (after choose_distractors)."""
+        return FrozenQuestion(
+            index=self.index,
+            question_text=self.question_text,
+            skill_code=self.skill_code,
+            options=tuple(self.options),
+            answer=self.answer,
+            correct_option=self.correct_option,
+            record=self.record,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenQuestion:
+    """Immutable, slotted question for large in-memory question banks."""
+    index: int
+    question_text: str
+    skill_code: str
+    options: tuple
+    answer: int # 1-based index of the correct answer in options
+    correct_option: str
+    record: QuestionRecord = None
+
+
+# Skill codes in a fixed order, so a worksheet can store them as small integers
+_SKILL_CODES = list(generate._space_map)
+_SKILL_CODE_INDEX = {code: i for i, code in enumerate(_SKILL_CODES)}
+_LETTERS = "ABCD"
+
+
+def parse_number(value) -> tuple:
+    """Parse an option or operand (int, "12", "12R3", or Devanagari/Indic digits) into (value, remainder)."""
+    if isinstance(value, int):
+        return value, 0
+    q, sep, r = to_arabic(str(value)).strip().partition("R")
+    return int(q), (int(r) if sep else 0)
+
+
+class Worksheet:
+    """
+    Array-backed container for worksheets and question banks.
+
+    Operands, answers and chosen options are stored column-wise in typed
+    NumPy arrays. Question objects are only built when an item is accessed,
+    so memory per question stays small and bulk export can iterate columns.
+
+    Args:
+        columns: Dict of equally long arrays, as returned by columns().
+        language: Language code used when rendering text and options.
+    """
+
+    __slots__ = ("language", "code", "first", "second", "answer", "remainder",
+                 "options", "option_remainders", "correct")
+
+    def __init__(self, columns: dict, language: str = "en"):
+        self.language = language
+        self.code = np.asarray(columns["code"], dtype=np.uint8)
+        self.first = np.asarray(columns["first"], dtype=np.int32)
+        self.second = np.asarray(columns["second"], dtype=np.int32)
+        self.answer = np.asarray(columns["answer"], dtype=np.int32)
+        self.remainder = np.asarray(columns["remainder"], dtype=np.int16)
+        self.options = np.asarray(columns["options"], dtype=np.int32).reshape(-1, 4)
+        self.option_remainders = np.asarray(columns["option_remainders"], dtype=np.int16).reshape(-1, 4)
+        self.correct = np.asarray(columns["correct"], dtype=np.uint8)
+
+    @classmethod
+    def from_questions(cls, questions: list, language: str = "en") -> "Worksheet":
+        """Pack Question objects (with distractors already chosen) into arrays."""
+        columns = {key: [] for key in ("code", "first", "second", "answer", "remainder",
+                                       "options", "option_remainders", "correct")}
+        for q in questions:
+            record = q.record
+            if record is None:
+                terms = q.question_text.split()
+                first, second = parse_number(terms[0])[0], parse_number(terms[-1])[0]
+                answer, remainder = parse_number(q.options[q.answer - 1])
+            else:
+                first, second = record.first, record.second
+                answer, remainder = record.answer, record.remainder
+            parsed = [parse_number(opt) for opt in q.options]
+            columns["code"].append(_SKILL_CODE_INDEX[q.skill_code])
+            columns["first"].append(first)
+            columns["second"].append(second)
+            columns["answer"].append(answer)
+            columns["remainder"].append(remainder)
+            columns["options"].append([v for v, _ in parsed])
+            columns["option_remainders"].append([r for _, r in parsed])
+            columns["correct"].append(q.answer - 1)
+        return cls(columns, language=language)
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    def columns(self) -> dict:
+        """Return the underlying column arrays by name."""
+        return {key: getattr(self, key) for key in self.__slots__ if key != "language"}
+
+    def _render(self, value: int, remainder: int, code: str) -> str:
+        text = f"{value}R{remainder}" if code in generate._REMAINDER_CODES else str(value)
+        return get_locale(self.language).render(text)
+
+    def __getitem__(self, i):
+        """
+        Materialize the i-th question (negative indices count from the end).
+
+        A slice returns a Worksheet over views of the same arrays, whose
+        questions are numbered from 1 again.
+        """
+        if isinstance(i, slice):
+            return Worksheet({key: column[i] for key, column in self.columns().items()}, language=self.language)
+        if not isinstance(i, (int, np.integer)):
+            raise TypeError(f"Worksheet indices must be integers or slices, not {type(i).__name__}")
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("Worksheet index out of range")
+        i = int(i)
+        code = _SKILL_CODES[self.code[i]]
+        first, second = int(self.first[i]), int(self.second[i])
+        record = QuestionRecord(code, first, generate._space_map[code].op, second,
+                                int(self.answer[i]), int(self.remainder[i]))
+        options = tuple(
+            self._render(int(v), int(r), code)
+            for v, r in zip(self.options[i], self.option_remainders[i])
+        )
+        correct = int(self.correct[i])
+        return FrozenQuestion(
+            index=i + 1,
+            question_text=f"{self._render(first, 0, '')} {record.op} {self._render(second, 0, '')}",
+            skill_code=code,
+            options=options,
+            answer=correct + 1,
+            correct_option=_LETTERS[correct],
+            record=record,
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
 def _rand_digit(exclude_zero=False):
     if exclude_zero:
         return random.randint(1, 9)
@@ -0,0 +1,340 @@
+"""
+Memory-mapped binary question bank.
+
+A bank holds pre-built questions as fixed-width records: skill, difficulty,
+operands, answer, remainder and the question's distractor candidates (as
+built by distractors.build_distractors). Records are sorted by difficulty
+level and skill, and a small JSON index gives each skill's record range and
+each difficulty level's range.
+
+The records live in a .npy file opened with mmap_mode="r", so loading a
+bank parses nothing and every worker process shares the same read-only
+pages from the OS page cache. A bank is built once per version: a hash of
+skills.json and the code that samples operands and generates questions and
+distractors. Stale
+banks are simply ignored and a new one is built next to them.
+
+Skills with at most PER_SKILL questions store every question; larger skills
+store a seeded uniform sample of PER_SKILL questions.
+
+Example:
+    bank = open_bank()
+    bank.take("3M2C", 5, rng=1)       # [(QuestionRecord, [distractors]), ...]
+    bank.codes_at(3)                  # skill codes with difficulty_level 3
+    create_worksheet_json("Level G", "G", "en", rng=1, bank=bank)
+
+Usage:
+    python question_bank.py              # build the current bank if needed
+    python question_bank.py --rebuild --per-skill 8192
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+import digit_dp
+import distractors
+import generate
+import sampler
+from generate import QuestionRecord, _REMAINDER_CODES
+from reservoir import ReservoirItem
+from seeding import RNGLike, get_rng
+from skill_catalog import SKILLS_FILE, get_catalog
+
+BANK_DIR = Path(__file__).parent / "question_bank"
+
+# Questions stored per skill (skills with fewer store all of them)
+PER_SKILL = 4096
+
+# Seed of the sample drawn for large skills
+BANK_SEED = 0
+
+FORMAT_VERSION = 1
+
+
+def record_dtype(max_distractors: int) -> np.dtype:
+    """Fixed-width record layout for a bank whose questions have at most max_distractors candidates."""
+    return np.dtype([
+        ("code", np.uint8),  # index into the bank's skill code list
+        ("difficulty", np.uint8),
+        ("first", np.int32),
+        ("second", np.int32),
+        ("answer", np.int32),
+        ("remainder", np.int16),
+        ("num_distractors", np.uint8),
+        ("distractors", np.int32, (max_distractors,)),
+        ("distractor_remainders", np.int16, (max_distractors,)),
+    ])
+
+
+# Files whose contents decide what a bank holds
+VERSION_FILES = (SKILLS_FILE, generate.__file__, distractors.__file__, digit_dp.__file__, sampler.__file__)
+
+# bank_version results by parameters and the files' (mtime, size), so the
+# files are only hashed again after one of them changes
+_versions = {}
+
+
+def bank_version(per_skill: int = PER_SKILL, seed: int = BANK_SEED) -> str:
+    """Fingerprint of skills.json, the generating code and the bank parameters."""
+    stats = tuple((st.st_mtime_ns, st.st_size) for st in (os.stat(path) for path in VERSION_FILES))
+    key = (per_skill, seed, stats)
+    version = _versions.get(key)
+    if version is None:
+        digest = hashlib.sha1(f"{FORMAT_VERSION}:{per_skill}:{seed}".encode())
+        for path in VERSION_FILES:
+            digest.update(Path(path).read_bytes())
+        version = _versions[key] = digest.hexdigest()[:16]
+    return version
+
+
+def _parse_option(value) -> tuple:
+    """(value, remainder) of a distractor: an int, or a "QRr" string."""
+    if isinstance(value, str) and "R" in value:
+        q, _, r = value.partition("R")
+        return int(q), int(r)
+    return int(value), 0
+
+
+class QuestionBank:
+    """
+    Read-only view of a bank file.
+
+    Args:
+        records: Structured record array (usually a read-only memmap).
+        index: The bank's index dict (see build_bank).
+    """
+
+    def __init__(self, records: np.ndarray, index: dict):
+        self.records = records
+        self.index = index
+        self.version = index["version"]
+        self.skill_codes = index["codes"]
+        self.ranges = {code: tuple(r) for code, r in index["skills"].items()}
+        self.difficulty_ranges = {int(level): tuple(r) for level, r in index["difficulties"].items()}
+        self._ops = [generate._space_map[code].op for code in self.skill_codes]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, skill_code: str) -> bool:
+        return skill_code in self.ranges
+
+    def count(self, skill_code: str) -> int:
+        """Questions stored for a skill."""
+        start, stop = self.ranges[skill_code]
+        return stop - start
+
+    def codes_at(self, difficulty_level: int) -> list:
+        """Skill codes stored at a difficulty level, in bank order."""
+        return [code for code in self.skill_codes
+                if self.index["difficulty_of"][code] == difficulty_level]
+
+    def sample_indices(self, skill_code: str, n: int, rng: RNGLike = None) -> np.ndarray:
+        """Draw n record indices uniformly (with replacement) from a skill's range."""
+        start, stop = self.ranges[skill_code]
+        return get_rng(rng).integers(start, stop, size=n)
+
+    def sample_difficulty(self, difficulty_level: int, n: int, rng: RNGLike = None) -> np.ndarray:
+        """Draw n record indices uniformly from every question at a difficulty level."""
+        start, stop = self.difficulty_ranges[difficulty_level]
+        return get_rng(rng).integers(start, stop, size=n)
+
+    def items(self, indices) -> list:
+        """Materialize records as ReservoirItem(QuestionRecord, distractors) pairs."""
+        rows = self.records[np.asarray(indices)]
+        out = []
+        for code, first, second, answer, remainder, k, values, remainders in zip(
+                rows["code"].tolist(), rows["first"].tolist(), rows["second"].tolist(),
+                rows["answer"].tolist(), rows["remainder"].tolist(), rows["num_distractors"].tolist(),
+                rows["distractors"].tolist(), rows["distractor_remainders"].tolist()):
+            skill_code = self.skill_codes[code]
+            if skill_code in _REMAINDER_CODES:
+                candidates = [f"{v}R{r}" for v, r in zip(values[:k], remainders[:k])]
+            else:
+                candidates = values[:k]
+            record = QuestionRecord(skill_code, first, self._ops[code], second, answer, remainder)
+            out.append(ReservoirItem(record, candidates))
+        return out
+
+    def take(self, skill_code: str, n: int, rng: RNGLike = None) -> list:
+        """
+        Sample n questions of a skill with their distractor candidates.
+
+        Skills missing from the bank are built live.
+
+        Returns:
+            List of ReservoirItem, as QuestionReservoir.take.
+        """
+        if skill_code not in self.ranges:
+            return [
+                ReservoirItem(record, distractors.build_distractors(skill_code, record, record.correct_ans, needed=3))
+                for record in generate.gen_records(skill_code, n, rng=rng)
+            ]
+        return self.items(self.sample_indices(skill_code, n, rng=rng))
+
+
+def _bank_paths(directory: Path, version: str) -> tuple:
+    return directory / f"{version}.npy", directory / f"{version}.json"
+
+
+def build_bank(directory=None, per_skill: int = PER_SKILL, seed: int = BANK_SEED, verbose: bool = True) -> Path:
+    """
+    Build the bank for the current version and write it atomically.
+
+    Args:
+        directory: Where to write it (default: BANK_DIR).
+        per_skill: Questions per skill; larger skills are sampled.
+        seed: Seed of those samples.
+
+    Returns:
+        Path of the records file.
+    """
+    directory = Path(directory or BANK_DIR)
+    version = bank_version(per_skill, seed)
+    catalog = get_catalog()
+
+    # Bank order: by difficulty level, then catalog order; unknown levels last
+    codes = list(generate._space_map)
+    order = {code: i for i, code in enumerate(catalog.by_code)}
+    difficulty_of = {}
+    for code in codes:
+        skill = catalog.by_code.get(code)
+        difficulty_of[code] = skill.difficulty_level if skill and skill.difficulty_level is not None else 0
+    codes.sort(key=lambda code: (difficulty_of[code] or 255, order.get(code, len(order))))
+
+    per_code = []
+    errors = io.StringIO()
+    for i, code in enumerate(codes):
+        if len(generate._space_map[code]) <= per_skill:
+            arrays = generate.all_questions_array(code)
+        else:
+            rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(i,)))
+            arrays = generate.gen_questions_array(code, per_skill, rng=rng)
+        records = generate.to_records(arrays)
+        # build_distractors prints every swallowed distractor error; keep the build quiet
+        with contextlib.redirect_stdout(errors):
+            candidates = [distractors.build_distractors(code, r, r.correct_ans, needed=3) for r in records]
+        per_code.append((code, arrays, candidates))
+
+    width = max(len(c) for _, _, candidates in per_code for c in candidates)
+    dtype = record_dtype(width)
+    total = sum(len(arrays.first) for _, arrays, _ in per_code)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    records_path, index_path = _bank_paths(directory, version)
+    tmp_records = records_path.with_suffix(f".{os.getpid()}.tmp.npy")
+    out = np.lib.format.open_memmap(tmp_records, mode="w+", dtype=dtype, shape=(total,))
+
+    skills, difficulties = {}, {}
+    start = 0
+    for i, (code, arrays, candidates) in enumerate(per_code):
+        n = len(arrays.first)
+        block = out[start:start + n]
+        block["code"] = i
+        block["difficulty"] = difficulty_of[code]
+        block["first"] = arrays.first
+        block["second"] = arrays.second
+        block["answer"] = arrays.answer
+        block["remainder"] = arrays.remainder
+        values = np.zeros((n, width), dtype=np.int32)
+        remainders = np.zeros((n, width), dtype=np.int16)
+        counts = np.zeros(n, dtype=np.uint8)
+        for j, options in enumerate(candidates):
+            counts[j] = len(options)
+            for k, option in enumerate(options):
+                values[j, k], remainders[j, k] = _parse_option(option)
+        block["num_distractors"] = counts
+        block["distractors"] = values
+        block["distractor_remainders"] = remainders
+
+        skills[code] = [start, start + n]
+        level = difficulty_of[code]
+        first = difficulties.get(level, [start, start])[0]
+        difficulties[level] = [first, start + n]
+        start += n
+    out.flush()
+    del out
+
+    index = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "per_skill": per_skill,
+        "seed": seed,
+        "records": total,
+        "max_distractors": width,
+        "codes": [code for code, _, _ in per_code],
+        "difficulty_of": difficulty_of,
+        "skills": skills,
+        "difficulties": {str(level): r for level, r in difficulties.items()},
+    }
+    tmp_index = index_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_index, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    # Records first: a bank counts as present once its index exists
+    os.replace(tmp_records, records_path)
+    os.replace(tmp_index, index_path)
+
+    if verbose:
+        suppressed = errors.getvalue().count("\n")
+        print(f"Built question bank {records_path} ({total} questions, {len(per_code)} skills"
+              + (f", {suppressed} distractor errors suppressed)" if suppressed else ")"))
+    return records_path
+
+
+# Open banks by (directory, version), shared by every caller in the process
+_banks = {}
+
+
+def open_bank(directory=None, per_skill: int = PER_SKILL, seed: int = BANK_SEED, build: bool = True) -> QuestionBank:
+    """
+    Memory-map the bank for the current version, building it first if needed.
+
+    Args:
+        directory: Bank directory (default: BANK_DIR).
+        build: Build a missing bank; if False, raise FileNotFoundError instead.
+
+    Returns:
+        QuestionBank (cached per process).
+    """
+    directory = Path(directory or BANK_DIR)
+    version = bank_version(per_skill, seed)
+    key = (str(directory), version)
+    bank = _banks.get(key)
+    if bank is not None:
+        return bank
+
+    records_path, index_path = _bank_paths(directory, version)
+    if not index_path.exists():
+        if not build:
+            raise FileNotFoundError(f"No question bank for version {version} in {directory}")
+        build_bank(directory, per_skill, seed)
+    with open(index_path, encoding="utf-8") as f:
+        index = json.load(f)
+    bank = _banks[key] = QuestionBank(np.load(records_path, mmap_mode="r"), index)
+    return bank
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Build the memory-mapped question bank.")
+    parser.add_argument("--dir", default=None, help=f"Bank directory (default: {BANK_DIR})")
+    parser.add_argument("--per-skill", type=int, default=PER_SKILL, help="Questions stored per skill")
+    parser.add_argument("--seed", type=int, default=BANK_SEED, help="Seed for sampling large skills")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild even if the current bank exists")
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        build_bank(args.dir, args.per_skill, args.seed)
+    bank = open_bank(args.dir, args.per_skill, args.seed)
+    print(f"Question bank {bank.version}: {len(bank)} questions, "
+          f"{len(bank.skill_codes)} skills, {bank.records.dtype.itemsize} bytes per record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Pre-generated question reservoirs.
+
+A QuestionReservoir keeps a ring buffer per skill of fully built items
+(question record plus its distractor candidates). A background producer
+thread tops every buffer up to its high-water mark whenever it falls below
+the low-water mark, so create_worksheet only has to dequeue. If a buffer
+runs dry, the missing items are built inline and counted as a starvation
+event.
+
+Items are drawn from the producer's own stream, so worksheets built from a
+reservoir are not reproducible from their seed (the worksheet rng still
+chooses and orders the options).
+
+Example:
+    reservoir = QuestionReservoir(capacity=256)
+    reservoir.start()
+    create_worksheet_json("Level C", "C", "en", reservoir=reservoir)
+    reservoir.stats()["3AC2"]["fill"]
+    reservoir.stop()
+"""
+
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+import distractors
+import generate
+import instrumentation
+from generate import QuestionRecord
+from seeding import RNGLike, get_rng
+
+
+class ReservoirItem(NamedTuple):
+    """A question ready for choose_distractors."""
+    record: QuestionRecord
+    distractors: list
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO ring buffer (not thread-safe on its own)."""
+
+    __slots__ = ("capacity", "_items", "_head", "_size")
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.capacity = capacity
+        self._items = [None] * capacity
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def put(self, item) -> bool:
+        """Append an item; returns False (dropping it) if the buffer is full."""
+        if self._size == self.capacity:
+            return False
+        self._items[(self._head + self._size) % self.capacity] = item
+        self._size += 1
+        return True
+
+    def take(self, n: int) -> list:
+        """Remove and return up to n items, oldest first."""
+        n = min(n, self._size)
+        out = []
+        for _ in range(n):
+            out.append(self._items[self._head])
+            self._items[self._head] = None
+            self._head = (self._head + 1) % self.capacity
+        self._size -= n
+        return out
+
+
+def build_items(skill_code: str, n: int, rng: RNGLike = None) -> list:
+    """Build n reservoir items for a skill: draw questions and their distractor candidates."""
+    return [
+        ReservoirItem(record, distractors.build_distractors(skill_code, record, record.correct_ans, needed=3))
+        for record in generate.gen_records(skill_code, n, rng=rng)
+    ]
+
+
+class _SkillStats:
+    __slots__ = ("produced", "consumed", "starved", "starved_items", "produce_time")
+
+    def __init__(self):
+        self.produced = 0
+        self.consumed = 0
+        self.starved = 0  # take() calls that found too few items
+        self.starved_items = 0  # items built inline because of it
+        self.produce_time = 0.0  # seconds the producer spent building
+
+
+class QuestionReservoir:
+    """
+    Per-skill ring buffers refilled by a background producer thread.
+
+    Args:
+        skill_codes: Skills to keep reservoirs for (default: every skill).
+                     Other skills are always built inline.
+        capacity: Ring buffer size per skill.
+        low_water: Refill a buffer once it holds fewer items than this
+                   (default: half the capacity).
+        high_water: Fill level a refill stops at (default: the capacity).
+        batch_size: Items built per refill step, so one skill does not
+                    hold up the others.
+        seed: Seed for the producer's questions.
+    """
+
+    def __init__(self, skill_codes: list = None, capacity: int = 256, low_water: int = None,
+                 high_water: int = None, batch_size: int = 32, seed: RNGLike = None):
+        self.skill_codes = list(skill_codes or generate._space_map)
+        for code in self.skill_codes:
+            if code not in generate._space_map:
+                raise ValueError(f"Unknown code: {code}")
+        self.capacity = capacity
+        self.high_water = capacity if high_water is None else min(high_water, capacity)
+        self.low_water = self.high_water // 2 if low_water is None else low_water
+        self.batch_size = batch_size
+        # The producer thread gets its own stream rather than the shared one
+        self._rng = get_rng(seed) if seed is not None else np.random.default_rng()
+        self._buffers = {code: RingBuffer(capacity) for code in self.skill_codes}
+        self._stats = {code: _SkillStats() for code in self.skill_codes}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    # -- producer ---------------------------------------------------------------
+
+    def _needs_refill(self) -> list:
+        return [code for code in self.skill_codes if len(self._buffers[code]) < self.low_water]
+
+    def fill(self, skill_codes: list = None):
+        """Fill buffers up to the high-water mark in the calling thread (e.g. to pre-warm before start)."""
+        for code in skill_codes or self.skill_codes:
+            while not self._stop.is_set():
+                with self._lock:
+                    missing = self.high_water - len(self._buffers[code])
+                if missing <= 0:
+                    break
+                start = time.perf_counter()
+                items = build_items(code, min(missing, self.batch_size), rng=self._rng)
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    stats = self._stats[code]
+                    for item in items:
+                        if not self._buffers[code].put(item):
+                            break
+                        stats.produced += 1
+                    stats.produce_time += elapsed
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                pending = self._needs_refill()
+                if not pending:
+                    self._wake.wait(timeout=1.0)
+                    continue
+            self.fill(pending)
+
+    def start(self) -> "QuestionReservoir":
+        """Start the background producer thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._started = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="question-reservoir", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the producer thread."""
+        self._stop.set()
+        with self._lock:
+            self._wake.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # -- consumer -------------------------------------------------------------
+
+    def take(self, skill_code: str, n: int, rng: RNGLike = None) -> list:
+        """
+        Dequeue n items for a skill, building any shortfall inline.
+
+        Args:
+            rng: Used only for items built inline.
+
+        Returns:
+            List of ReservoirItem.
+        """
+        buffer = self._buffers.get(skill_code)
+        if buffer is None:
+            return build_items(skill_code, n, rng=rng)
+
+        with self._lock:
+            items = buffer.take(n)
+            stats = self._stats[skill_code]
+            stats.consumed += len(items)
+            if len(items) < n:
+                stats.starved += 1
+                stats.starved_items += n - len(items)
+            if len(buffer) < self.low_water:
+                self._wake.notify()
+
+        instrumentation.count("reservoir.hits", skill_code, len(items))
+        if len(items) < n:
+            instrumentation.count("reservoir.starved", skill_code)
+            items.extend(build_items(skill_code, n - len(items), rng=rng))
+        return items
+
+    def stats(self) -> dict:
+        """
+        Per-skill fill level, throughput and starvation counters.
+
+        Returns:
+            dict of skill_code -> {"size", "fill" (0-1), "produced", "consumed",
+            "starved" (take calls that came up short), "starved_items",
+            "refill_rate" (items/sec while producing), "produced_per_sec"
+            (items/sec since start)}.
+        """
+        uptime = time.monotonic() - self._started if self._started else 0.0
+        with self._lock:
+            return {
+                code: {
+                    "size": len(self._buffers[code]),
+                    "fill": len(self._buffers[code]) / self.capacity,
+                    "produced": s.produced,
+                    "consumed": s.consumed,
+                    "starved": s.starved,
+                    "starved_items": s.starved_items,
+                    "refill_rate": s.produced / s.produce_time if s.produce_time else 0.0,
+                    "produced_per_sec": s.produced / uptime if uptime else 0.0,
+                }
+                for code, s in self._stats.items()
+            }
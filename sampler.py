@@ -0,0 +1,88 @@
+"""
+Enumeration-based operand sampling.
+
+Instead of drawing random operands and rejecting them until a carry/borrow
+condition holds, each skill's full set of valid operand pairs is enumerated
+once (lazily, on first use) and cached. Drawing a question is then a single
+uniform index pick, so the cost per question is constant and independent of
+how rare the condition is.
+
+Enumeration and drawing are vectorized with NumPy: the acceptance predicate
+receives whole operand arrays and returns a boolean mask.
+"""
+
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from seeding import RNGLike, get_rng
+
+
+class OperandSpace:
+    """
+    The set of valid (a, b) operand pairs for one skill.
+
+    Args:
+        op: Operator symbol used in the question text ("+", "-", "×", "÷").
+        first: Range of values for the first operand.
+        second: Range of values for the second operand.
+        accept: Optional vectorized predicate (a, b) -> bool mask selecting the
+                valid pairs. It is called once with every candidate pair.
+    """
+
+    def __init__(self, op: str, first: range, second: range,
+                 accept: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None):
+        self.op = op
+        self.first = first
+        self.second = second
+        self.accept = accept
+        self._a = None
+        self._b = None
+
+    def _enumerate(self):
+        """Enumerate and cache every valid pair as two parallel columns."""
+        a_col, b_col = np.meshgrid(
+            np.arange(self.first.start, self.first.stop, dtype=np.int64),
+            np.arange(self.second.start, self.second.stop, dtype=np.int64),
+            indexing="ij",
+        )
+        a_col = a_col.ravel()
+        b_col = b_col.ravel()
+        if self.accept is not None:
+            mask = self.accept(a_col, b_col)
+            a_col = a_col[mask]
+            b_col = b_col[mask]
+        if not a_col.size:
+            raise ValueError("Operand space is empty")
+        a_col.flags.writeable = False
+        b_col.flags.writeable = False
+        self._a = a_col
+        self._b = b_col
+
+    def __len__(self) -> int:
+        if self._a is None:
+            self._enumerate()
+        return len(self._a)
+
+    def pair(self, i: int) -> Tuple[int, int]:
+        """Return the i-th valid operand pair."""
+        if self._a is None:
+            self._enumerate()
+        return int(self._a[i]), int(self._b[i])
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return all valid pairs as two parallel (read-only) arrays."""
+        if self._a is None:
+            self._enumerate()
+        return self._a, self._b
+
+    def take(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the operand pairs at the given indices."""
+        if self._a is None:
+            self._enumerate()
+        return self._a[indices], self._b[indices]
+
+    def sample(self, n: int, rng: RNGLike = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Draw n operand pairs uniformly at random (with replacement)."""
+        idx = get_rng(rng).integers(0, len(self), size=n)
+        return self._a[idx], self._b[idx]
@@ -0,0 +1,65 @@
+"""
+Random number streams for reproducible worksheet generation.
+
+Every generation entry point takes an optional ``rng`` argument, which may be:
+- None: use the shared, unseeded module-level stream
+- an int seed: start a fresh stream from that seed
+- a numpy Generator: draw from it directly
+
+Batches derive one independent stream per worksheet from a single root seed
+with worksheet_rng, so a worksheet can be rebuilt from (root_seed, index)
+alone, in any process and in any order.
+"""
+
+from typing import Optional, Union
+
+import numpy as np
+
+RNGLike = Optional[Union[int, np.random.Generator]]
+
+# Shared stream used when no rng is given
+_shared_rng = np.random.default_rng()
+
+
+def get_rng(rng: RNGLike = None) -> np.random.Generator:
+    """
+    Resolve an rng argument into a numpy Generator.
+
+    Args:
+        rng: None, an int seed, or a numpy Generator.
+
+    Returns:
+        np.random.Generator: The generator to draw from.
+    """
+    if rng is None:
+        return _shared_rng
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(rng)
+
+
+def worksheet_rng(root_seed: int, worksheet_index: int) -> np.random.Generator:
+    """
+    Create the independent stream for one worksheet of a seeded batch.
+
+    Args:
+        root_seed: Seed for the whole batch.
+        worksheet_index: Position of the worksheet in the batch (0-based).
+
+    Returns:
+        np.random.Generator: Stream that depends only on (root_seed, worksheet_index).
+    """
+    seed_seq = np.random.SeedSequence(root_seed, spawn_key=(worksheet_index,))
+    return np.random.default_rng(seed_seq)
+
+
+def batch_plan_rng(root_seed: int) -> np.random.Generator:
+    """
+    Create the stream for batch-wide planning (e.g. distribution_solver).
+
+    Returns:
+        np.random.Generator: Stream that depends only on root_seed and is
+        independent of every worksheet_rng stream.
+    """
+    seed_seq = np.random.SeedSequence(root_seed, spawn_key=(0, 0))
+    return np.random.default_rng(seed_seq)
@@ -0,0 +1,331 @@
+"""
+Long-lived local worksheet HTTP service.
+
+An asyncio server (HTTP/1.1 with keep-alive, standard library only) that
+hands worksheet builds to a pool of worker processes. Every worker is warmed
+up when it starts: the skills catalog is loaded and every skill's operand
+space is built, so requests never pay for file I/O or first-use setup.
+
+Endpoints (all responses are JSON):
+    GET  /health
+    GET  /worksheet?level=G&language=mr[&seed=1][&title=...][&unique=1]
+         language may be a comma-separated list, e.g. en,mr; the response is
+         then {language: worksheet}
+    GET  /distribution?difficulty=3[&seed=1]   (create_difficulty_distribution)
+    GET  /distribution?level=G[&seed=1]        (create_worksheet_level_distribution)
+    POST /worksheet/custom  {"distribution": {"1A": 10, "T5": 10}, "language": "en",
+                             "seed": 1, "title": "...", "level": "custom"}
+    GET  /stats   request counts and latency percentiles
+
+With --reservoir N every worker keeps a reservoir.QuestionReservoir of N
+pre-built questions per skill, used for requests that give no seed (seeded
+and unique requests are still built from their seed).
+
+Usage:
+    python service.py --port 8765 --workers 4
+    python loadtest.py --port 8765 --requests 5000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import generate
+import instrumentation
+from create_worksheet import (
+    WORKSHEET_LEVEL_DISTRIBUTIONS,
+    create_difficulty_distribution,
+    create_worksheet,
+    create_worksheet_json,
+    create_worksheet_json_multi,
+    create_worksheet_level_distribution,
+    render_worksheet_json,
+)
+from reservoir import QuestionReservoir
+from skill_catalog import get_catalog
+
+MAX_BODY_BYTES = 1 << 20
+
+# This process's question reservoir, started by warm_up when requested
+_reservoir = None
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def warm_up(reservoir_capacity: int = 0):
+    """
+    Load the skills catalog and build every operand space and level distribution once.
+
+    Args:
+        reservoir_capacity: If set, also fill and start a question reservoir
+                            of this many items per skill.
+    """
+    global _reservoir
+    get_catalog()
+    for space in generate._space_map.values():
+        len(space)
+        space.sample(1)
+    for level in WORKSHEET_LEVEL_DISTRIBUTIONS:
+        create_worksheet_json("warm-up", level, "en", rng=0)
+    if reservoir_capacity and _reservoir is None:
+        _reservoir = QuestionReservoir(capacity=reservoir_capacity)
+        _reservoir.fill()
+        _reservoir.start()
+
+
+def _reservoir_for(seed, unique: bool):
+    """The reservoir to build from, for requests that do not ask for a reproducible or unique worksheet."""
+    return _reservoir if seed is None and not unique else None
+
+
+# -- work functions (run in the worker processes) -----------------------------
+
+def _seed(value):
+    return None if value is None else int(value)
+
+
+def _encoded(fn, *args) -> bytes:
+    """Call fn and return its result as JSON bytes, so only bytes cross the process boundary."""
+    return json.dumps(fn(*args), ensure_ascii=False).encode("utf-8")
+
+
+def build_worksheet(title: str, level: str, languages: list, seed=None, unique: bool = False):
+    """Build one worksheet, or a {language: worksheet} dict for several languages."""
+    reservoir = _reservoir_for(seed, unique)
+    if len(languages) == 1:
+        return create_worksheet_json(title, level, languages[0], rng=_seed(seed), unique=unique,
+                                     reservoir=reservoir)
+    return create_worksheet_json_multi(title, level, languages, rng=_seed(seed), unique=unique,
+                                       reservoir=reservoir)
+
+
+def build_custom_worksheet(distribution: dict, title: str, level: str, language: str,
+                           seed=None, unique: bool = False) -> list:
+    """Build a worksheet from an explicit skill distribution."""
+    for code in distribution:
+        if code not in generate._space_map:
+            raise ValueError(f"Unknown skill code: {code}")
+    worksheet = create_worksheet(skill_distribution=distribution, language="en", rng=_seed(seed), unique=unique,
+                                 reservoir=_reservoir_for(seed, unique))
+    return render_worksheet_json(title, worksheet, level, [language])[language]
+
+
+def build_distribution(difficulty=None, level: str = None, seed=None) -> dict:
+    """Skill distribution for a difficulty level (1-7) or a worksheet level (A-G)."""
+    if level is not None:
+        return create_worksheet_level_distribution(level.upper(), rng=_seed(seed))
+    if difficulty is None:
+        raise ValueError("Pass difficulty or level")
+    return create_difficulty_distribution(int(difficulty), rng=_seed(seed))
+
+
+# -- HTTP ---------------------------------------------------------------------
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class WorksheetService:
+    """
+    The asyncio server and its worker pool.
+
+    Args:
+        workers: Worker processes for building worksheets; 0 builds them on
+                 the event loop thread (lowest latency for light loads, but
+                 requests are then served one at a time).
+        reservoir: Per-skill question reservoir capacity in each worker (0: none).
+    """
+
+    def __init__(self, workers: int = None, reservoir: int = 0):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.reservoir = reservoir
+        self._pool = None
+        self._server = None
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.latency = instrumentation.Histogram()
+
+    async def _run(self, fn, *args):
+        if self._pool is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    async def _run_encoded(self, fn, *args) -> bytes:
+        """Run a work function in the pool and return its JSON-encoded result."""
+        return await self._run(_encoded, fn, *args)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765):
+        if self.workers:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up,
+                                             initargs=(self.reservoir,))
+            # Start and warm every worker before accepting requests
+            await asyncio.gather(*(self._run(os.getpid) for _ in range(self.workers * 2)))
+        else:
+            warm_up(self.reservoir)
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                start = time.perf_counter()
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    status, payload = 413, {"error": "Request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self._dispatch(method, target, body)
+                    keep_alive = (headers.get("connection", "").lower() != "close"
+                                  and version == "HTTP/1.1")
+
+                if isinstance(payload, bytes):
+                    data = payload
+                else:
+                    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+
+                self.requests += 1
+                self.errors += status >= 400
+                self.latency.add(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> tuple:
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/health":
+                return 200, {"status": "ok", "workers": self.workers}
+            if url.path == "/stats":
+                return 200, self.stats()
+            if url.path == "/worksheet":
+                if method != "GET":
+                    raise HTTPError(405, "Use GET")
+                level = params.get("level", "A").upper()
+                languages = params.get("language", "en").split(",")
+                title = params.get("title", f"Worksheet Level {level}")
+                return 200, await self._run_encoded(build_worksheet, title, level, languages,
+                                            params.get("seed"), params.get("unique") == "1")
+            if url.path == "/distribution":
+                if method != "GET":
+                    raise HTTPError(405, "Use GET")
+                return 200, await self._run_encoded(build_distribution, params.get("difficulty"),
+                                            params.get("level"), params.get("seed"))
+            if url.path == "/worksheet/custom":
+                if method != "POST":
+                    raise HTTPError(405, "Use POST")
+                try:
+                    request = json.loads(body or b"{}")
+                except json.JSONDecodeError as e:
+                    raise HTTPError(400, f"Invalid JSON body: {e}")
+                distribution = request.get("distribution")
+                if not isinstance(distribution, dict):
+                    raise HTTPError(400, "Body needs a distribution object of skill_code -> count")
+                return 200, await self._run_encoded(
+                    build_custom_worksheet,
+                    {code: int(n) for code, n in distribution.items()},
+                    request.get("title", "Custom Worksheet"),
+                    request.get("level", "custom"),
+                    request.get("language", "en"),
+                    request.get("seed"),
+                    bool(request.get("unique")),
+                )
+            raise HTTPError(404, f"Unknown path: {url.path}")
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except (ValueError, TypeError, KeyError) as e:
+            return 400, {"error": f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            print(f"Error handling {method} {target}: {type(e).__name__}: {e}")
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    def stats(self) -> dict:
+        """Requests served, errors and server-side latency percentiles (seconds)."""
+        latency = self.latency.to_dict()
+        del latency["buckets"]
+        stats = {
+            "uptime": time.time() - self.started,
+            "workers": self.workers,
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency": latency,
+        }
+        if _reservoir is not None:
+            # Only the in-process reservoir (--workers 0) is visible here
+            stats["reservoir"] = _reservoir.stats()
+        return stats
+
+
+async def _serve(host: str, port: int, workers: int, reservoir: int = 0):
+    service = WorksheetService(workers=workers, reservoir=reservoir)
+    server = await service.start(host, port)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"Serving worksheets on {addresses} with {service.workers} worker(s)")
+    try:
+        await service.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Serve worksheets over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count; 0 builds on the event loop)")
+    parser.add_argument("--reservoir", type=int, default=0,
+                        help="Pre-built questions kept per skill in each worker (default: 0, off)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args.host, args.port, args.workers, args.reservoir))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+In-memory skill catalog shared by every module.
+
+skills.json is parsed once into a SkillCatalog with precomputed indexes: by
+code, by integer difficulty level (in file order), and the dependency graph
+with its transitive closures. get_catalog() returns the shared instance and
+reloads it when the file's mtime changes (checked at most every
+CHECK_INTERVAL seconds), so building worksheets does no file I/O once the
+catalog is loaded.
+
+Example:
+    catalog = get_catalog()
+    catalog.codes_at(3)         # ("2S2B", "3AC2", "3SB", "3SB2", "2M1", "3M1")
+    catalog.prerequisites("3SB2")  # every skill 3SB2 builds on, transitively
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+SKILLS_FILE = Path(__file__).parent / "skills.json"
+
+# Minimum seconds between mtime checks of the skills file
+CHECK_INTERVAL = 2.0
+
+
+@dataclass(frozen=True)
+class Skill:
+    """One row of skills.json."""
+    code: str
+    difficulty_level: int  # None if the sheet has a non-numeric level
+    skill: str
+    example: str
+    misconceptions: str
+    dependencies: tuple  # direct prerequisite skill codes
+
+
+def _parse_dependencies(value) -> tuple:
+    """Split a dependencies cell such as "2A1, 1AC" into codes."""
+    if not value:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return tuple(str(code).strip() for code in value if str(code).strip())
+    return tuple(code for code in re.split(r"[,\s]+", str(value)) if code)
+
+
+def _parse_level(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SkillCatalog:
+    """
+    Indexed, read-only view of the skills data.
+
+    Args:
+        rows: Skill dicts as stored in skills.json.
+        mtime: Modification time of the file the rows came from.
+    """
+
+    def __init__(self, rows: list, mtime: float = None):
+        self.rows = rows
+        self.mtime = mtime
+        self.skills = tuple(
+            Skill(
+                code=row["code"],
+                difficulty_level=_parse_level(row.get("difficulty_level")),
+                skill=row.get("skill", ""),
+                example=row.get("example", ""),
+                misconceptions=row.get("misconceptions", ""),
+                dependencies=_parse_dependencies(row.get("dependencies")),
+            )
+            for row in rows
+        )
+        self.by_code = {s.code: s for s in self.skills}
+        self.raw_by_code = {row["code"]: row for row in rows}
+
+        by_difficulty = {}
+        for s in self.skills:
+            if s.difficulty_level is not None:
+                by_difficulty.setdefault(s.difficulty_level, []).append(s.code)
+        self.by_difficulty = {level: tuple(codes) for level, codes in sorted(by_difficulty.items())}
+
+        self._prerequisites = self._closure({s.code: s.dependencies for s in self.skills})
+        reverse = {s.code: [] for s in self.skills}
+        for s in self.skills:
+            for dep in s.dependencies:
+                if dep in reverse:
+                    reverse[dep].append(s.code)
+        self._dependents = self._closure(reverse)
+
+    @staticmethod
+    def _closure(graph: dict) -> dict:
+        """Transitive closure of a code -> direct neighbours graph (unknown codes are kept as leaves)."""
+        closure = {}
+        visiting = set()
+
+        def visit(code):
+            if code in closure:
+                return closure[code]
+            if code in visiting:
+                raise ValueError(f"Dependency cycle through skill {code}")
+            visiting.add(code)
+            reached = set()
+            for nxt in graph.get(code, ()):
+                reached.add(nxt)
+                if nxt in graph:
+                    reached |= visit(nxt)
+            visiting.discard(code)
+            closure[code] = frozenset(reached)
+            return closure[code]
+
+        for code in graph:
+            visit(code)
+        return closure
+
+    @classmethod
+    def from_file(cls, path=SKILLS_FILE) -> "SkillCatalog":
+        """Load a catalog from a skills JSON file."""
+        mtime = os.stat(path).st_mtime
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # Old worksheet-style files ([{"answerKey": [...]}, ...]) hold no skills
+        if isinstance(data, list) and data and isinstance(data[0], dict) and "answerKey" in data[0]:
+            data = []
+        return cls(data, mtime=mtime)
+
+    def __len__(self) -> int:
+        return len(self.skills)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.by_code
+
+    def get(self, code: str) -> Skill:
+        """
+        Return the skill with this code.
+
+        Raises:
+            ValueError: If the code is not in the catalog.
+        """
+        if code not in self.by_code:
+            raise ValueError(f"Skill code '{code}' not found in skills.json")
+        return self.by_code[code]
+
+    def codes_at(self, difficulty_level: int) -> tuple:
+        """Skill codes at a difficulty level, in file order (empty if none)."""
+        return self.by_difficulty.get(int(difficulty_level), ())
+
+    def dependencies(self, code: str) -> tuple:
+        """Direct prerequisites of a skill."""
+        return self.get(code).dependencies
+
+    def prerequisites(self, code: str) -> frozenset:
+        """Every skill the given skill depends on, directly or transitively."""
+        self.get(code)
+        return self._prerequisites[code]
+
+    def dependents(self, code: str) -> frozenset:
+        """Every skill that depends on the given skill, directly or transitively."""
+        self.get(code)
+        return self._dependents[code]
+
+
+# Shared catalog and the time its file was last checked
+_catalog = None
+_checked = 0.0
+_lock = threading.Lock()
+
+
+def get_catalog(path=None) -> SkillCatalog:
+    """
+    Return the shared catalog, reloading it if the skills file changed.
+
+    Args:
+        path: Load a separate catalog from this file instead (not cached).
+    """
+    global _catalog, _checked
+    if path is not None:
+        return SkillCatalog.from_file(path)
+
+    now = time.monotonic()
+    if _catalog is not None and now - _checked < CHECK_INTERVAL:
+        return _catalog
+
+    with _lock:
+        try:
+            changed = _catalog is None or os.stat(SKILLS_FILE).st_mtime != _catalog.mtime
+        except FileNotFoundError:
+            # Keep serving the loaded catalog while the file is being replaced
+            if _catalog is None:
+                raise
+            changed = False
+        if changed:
+            _catalog = SkillCatalog.from_file(SKILLS_FILE)
+        _checked = now
+    return _catalog
+
+
+def invalidate():
+    """Force the next get_catalog() call to check the skills file."""
+    global _checked
+    _checked = 0.0
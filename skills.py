@@ -1,29 +1,73 @@
-import requests
-import os
+"""
+Sync skills.json with the skills sheet web app.
+
+Syncing is conditional and rate-limited:
+- requests share one pooled Session
+- the ETag / Last-Modified of the last response are sent back, so an
+  unchanged sheet costs a 304 instead of a full download (servers that send
+  neither are compared by content hash, and the file is only rewritten when
+  the data changed)
+- the server is asked at most once per MIN_REFRESH_INTERVAL seconds
+- skills.json is replaced atomically, so readers never see a partial file
+
+Callers never wait for the network by default: get_skills() returns the
+local copy at once and refreshes it in a background thread (pass wait=True
+to block on the sync), and start_background_refresh() keeps it fresh
+periodically.
+"""
+
+import hashlib
 import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
 from dotenv import load_dotenv
 
+import skill_catalog
+
 load_dotenv()
 
 WEB_APP_URL = os.getenv("WEB_APP_URL")
-SKILLS_FILE = "skills.json"
+SKILLS_FILE = str(skill_catalog.SKILLS_FILE)
+
+# ETag, Last-Modified, content hash and time of the last check, next to skills.json
+SYNC_STATE_FILE = SKILLS_FILE + ".sync"
+
+# Minimum seconds between requests to the web app (unless forced)
+MIN_REFRESH_INTERVAL = float(os.getenv("SKILLS_REFRESH_INTERVAL", "300"))
+
+REQUEST_TIMEOUT = 15
+
+# Shared HTTP session, created on first use
+_session = None
+
+# Serializes syncs within this process
+_sync_lock = threading.Lock()
+
+# Background sync started by get_skills, if any, and the lock guarding it
+_refresh_thread = None
+_refresh_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Return the shared requests Session, creating it on first use."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
+@dataclass
+class SyncResult:
+    """Outcome of one sync attempt."""
+    status: str  # "fresh" (skipped, checked recently), "not_modified", "unchanged", "updated" or "error"
+    data: Optional[list] = None
+    error: str = None
 
-def _fetch_from_api(url):
-    """Fetch data from the web app API"""
-    try:
-        # requests.get automatically handles the 302 redirect from Google
-        response = requests.get(url)
-        
-        # Raise an exception for 4XX or 5XX errors
-        response.raise_for_status()
-        
-        # Parse the JSON response
-        data = response.json()
-        return data
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data from API: {e}")
-        return None
 
 def _transform_data(data):
     """
@@ -39,7 +83,7 @@ def _transform_data(data):
         "Misconceptions": "misconceptions",
         "Dependencies": "dependencies",
     }
-    
+
     transformed = []
     for item in data:
         new_item = {}
@@ -47,58 +91,204 @@ def _transform_data(data):
             if old_key in item:
                 new_item[new_key] = item[old_key]
         transformed.append(new_item)
-    
+
     return transformed
 
-def _load_local_data():
+
+def _content_hash(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _atomic_write_json(path: str, data, indent: int = None):
+    """Write JSON to a temporary file and move it into place."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _load_local_data(path: str = None):
     """Load skills from local cached file"""
     try:
-        with open(SKILLS_FILE, 'r') as f:
+        with open(path or SKILLS_FILE, 'r') as f:
             return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
         return None
 
-def _save_data(data):
+
+def _load_state(path: str) -> dict:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_data(data, path: str = None):
     """Save data to local file"""
-    with open(SKILLS_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
-    print(f"Updated {SKILLS_FILE} with {len(data)} items")
+    path = path or SKILLS_FILE
+    _atomic_write_json(path, data, indent=2)
+    if path == SKILLS_FILE:
+        skill_catalog.invalidate()
+    print(f"Updated {path} with {len(data)} items")
+
 
-def get_skills():
+def sync_skills(url: str = None, path: str = None, force: bool = False,
+                min_interval: float = None) -> SyncResult:
     """
-    Get skills data from API, checking for changes.
-    
-    Always attempts to fetch from the API first.
-    - If API succeeds: compares with local cache and updates only if data changed
-    - If API fails: returns cached data if available
-    
+    Bring the local skills file up to date with the web app.
+
+    Args:
+        url: Web app URL (defaults to WEB_APP_URL).
+        path: Local skills file (defaults to SKILLS_FILE); its sync state is
+              kept in "<path>.sync".
+        force: Ask the server even if it was checked recently.
+        min_interval: Seconds between checks (defaults to MIN_REFRESH_INTERVAL).
+
+    Returns:
+        SyncResult with the status and the current skills data (None only
+        if the sync failed and there is no local copy).
+    """
+    url = url or WEB_APP_URL
+    path = path or SKILLS_FILE
+    state_path = f"{path}.sync"
+    min_interval = MIN_REFRESH_INTERVAL if min_interval is None else min_interval
+
+    with _sync_lock:
+        state = _load_state(state_path)
+        local_data = _load_local_data(path)
+
+        if not force and local_data is not None and time.time() - state.get("checked", 0) < min_interval:
+            return SyncResult("fresh", local_data)
+
+        headers = {}
+        if local_data is not None:
+            if state.get("etag"):
+                headers["If-None-Match"] = state["etag"]
+            if state.get("last_modified"):
+                headers["If-Modified-Since"] = state["last_modified"]
+
+        try:
+            # requests follows the 302 redirect from Google automatically
+            response = _get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 304 and local_data is not None:
+                state["checked"] = time.time()
+                _atomic_write_json(state_path, state)
+                return SyncResult("not_modified", local_data)
+            # Raise an exception for 4XX or 5XX errors
+            response.raise_for_status()
+            remote_data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching data from API: {e}")
+            return SyncResult("error", local_data, error=str(e))
+
+        transformed_data = _transform_data(remote_data)
+        digest = _content_hash(transformed_data)
+
+        if local_data is not None and digest == _content_hash(local_data):
+            status = "unchanged"
+        else:
+            _save_data(transformed_data, path)
+            status = "updated"
+
+        state = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "hash": digest,
+            "checked": time.time(),
+        }
+        _atomic_write_json(state_path, state)
+        return SyncResult(status, transformed_data)
+
+
+def refresh_in_background(**kwargs) -> threading.Thread:
+    """Run sync_skills(**kwargs) once in a daemon thread and return the thread."""
+    thread = threading.Thread(target=sync_skills, kwargs=kwargs, name="skills-sync", daemon=True)
+    thread.start()
+    return thread
+
+
+def _refresh_due(force: bool = False) -> bool:
+    """Whether get_skills should start a background sync: none is running and the interval has passed."""
+    if _refresh_thread is not None and _refresh_thread.is_alive():
+        return False
+    if force:
+        return True
+    state = _load_state(f"{SKILLS_FILE}.sync")
+    return time.time() - state.get("checked", 0) >= MIN_REFRESH_INTERVAL
+
+
+def start_background_refresh(interval: float = None, **kwargs) -> threading.Event:
+    """
+    Keep the skills file fresh from a daemon thread.
+
+    Args:
+        interval: Seconds between syncs (defaults to MIN_REFRESH_INTERVAL).
+        **kwargs: Passed to sync_skills.
+
     Returns:
-        list: Skills data with transformed headers, or None if API fails and no cache exists
+        Event; set it to stop the refresh thread.
     """
-    # Fetch from API
-    remote_data = _fetch_from_api(WEB_APP_URL)
-    
-    if remote_data is None:
-        # API call failed - return cached data if available
+    interval = MIN_REFRESH_INTERVAL if interval is None else interval
+    stop = threading.Event()
+
+    def run():
+        while not stop.is_set():
+            try:
+                sync_skills(**kwargs)
+            except Exception as e:
+                print(f"Error refreshing skills: {e}")
+            stop.wait(interval)
+
+    threading.Thread(target=run, name="skills-refresh", daemon=True).start()
+    return stop
+
+
+def get_skills(wait: bool = False, force: bool = False):
+    """
+    Get skills data, syncing with the API when the local copy may be stale.
+
+    By default the local copy is returned at once and, if the server was
+    not checked within MIN_REFRESH_INTERVAL and no sync is already running,
+    a sync starts in a background thread; only a missing local copy makes
+    the call wait for it.
+    With wait=True the sync runs first:
+
+    - If the server was checked within MIN_REFRESH_INTERVAL: returns the local copy
+    - Otherwise asks the server with a conditional request and updates the
+      local copy only if the data changed
+    - If the API fails: returns cached data if available
+
+    Args:
+        wait: Block on the sync and return its result.
+        force: Ask the server even if it was checked recently.
+
+    Returns:
+        list: Skills data with transformed headers, or None if there is no
+        local copy and the API fails
+    """
+    global _refresh_thread
+    if not wait:
+        local_data = _load_local_data()
+        if local_data is not None:
+            with _refresh_lock:
+                if _refresh_due(force):
+                    _refresh_thread = refresh_in_background(force=force)
+            return local_data
+
+    result = sync_skills(force=force)
+    if result.status == "error" and result.data is not None:
         print("Falling back to cached data")
-        return _load_local_data()
-    
-    # Transform the data
-    transformed_data = _transform_data(remote_data)
-    
-    # Check if data changed
-    local_data = _load_local_data()
-    
-    if local_data != transformed_data:
-        _save_data(transformed_data)
-    else:
+    elif result.status == "unchanged":
         print("Data unchanged, skipping save")
-    
-    return transformed_data
+    return result.data
+
 
 if __name__ == "__main__":
-    data = get_skills()
-    
+    data = get_skills(wait=True, force=True)
+
     if data:
         print(f"Successfully retrieved {len(data)} rows.")
-        print(data[0])
\ No newline at end of file
+        print(data[0])
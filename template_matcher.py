@@ -0,0 +1,322 @@
+"""
+Offline matcher from teacher queries to worksheet templates.
+
+Every skill in the catalog becomes a TF-IDF vector over the words of its
+name, the operation in its example (2+2 -> addition) and its code. A query
+is normalized the same way (teacher vocabulary such as "tables", "times",
+"take away" or "regrouping" is mapped onto the skill names' words), scored
+against every skill by cosine similarity, and the best-scoring skills get
+the 20 questions in proportion to their scores. A broad query that many
+skills match equally well ("addition") gets the easiest of them.
+
+Two things in a query are hard filters rather than scores: the polarity of
+carry, borrow and remainder ("with carry" only matches carry skills, "no
+borrow" only no-borrow skills) and an explicit digit count ("3 digit" only
+matches skills whose largest operand has 3 digits; "2+1 digit" only 2+1
+digit skills). A query that excludes an operation ("no subtraction") is
+never answered offline.
+
+match() only answers when it is confident: some skill passes the filters,
+every number in the query is known, the best score is high enough and most
+words of the query are known. Other queries are left to Gemini (see
+gemini.get_template_from_query).
+
+Example:
+    matcher = get_matcher()
+    matcher.match("basic addition practice")
+    # TemplateMatch(template={"1A": 7, ...}, confidence=0.62, scores={...})
+"""
+
+import re
+from typing import NamedTuple
+
+import numpy as np
+
+from skill_catalog import get_catalog
+
+# Teacher vocabulary -> words used in the skill names
+SYNONYMS = {
+    "add": "addition", "adding": "addition", "addition": "addition", "plus": "addition", "sum": "addition",
+    "subtract": "subtraction", "subtracting": "subtraction", "subtraction": "subtraction",
+    "minus": "subtraction", "difference": "subtraction", "take": "subtraction",
+    "multiply": "multiplication", "multiplying": "multiplication", "times": "multiplication",
+    "product": "multiplication", "multiplication": "multiplication",
+    "table": "table multiplication", "timetable": "table multiplication",
+    "divide": "division", "dividing": "division", "division": "division", "share": "division",
+    "sharing": "division", "quotient": "division",
+    "carrying": "carry", "carried": "carry", "carry": "carry",
+    "borrowing": "borrow", "borrowed": "borrow", "borrow": "borrow",
+    "regroup": "carry borrow", "regrouping": "carry borrow",
+    "without": "no", "no": "no",
+    "one": "1", "single": "1", "two": "2", "double": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+    "remainder": "remainder",
+}
+
+# Words whose polarity ("carry" vs "no carry") must match exactly
+FEATURES = ("carry", "borrow", "remainder")
+
+# Tokens that end the scope of a "no"/"without"
+_NEGATION_BREAKS = {"addition", "subtraction", "multiplication", "division", "table"}
+
+# Digit counts: "3 digit", "3-digits", "single digit" and operand pairs "2+1 digit", "2x1 multiplication"
+_DIGIT_WORDS = {"one": 1, "single": 1, "two": 2, "double": 2, "three": 3, "four": 4, "five": 5,
+                "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+_COUNT = r"(\d+|" + "|".join(_DIGIT_WORDS) + r")"
+_DIGIT_PAIR = re.compile(_COUNT + r"\s*(?:[-+x×*/÷]|by)\s*" + _COUNT
+                         + r"(?=\s*-?\s*(?:digits?|addition|subtraction|multiplication|division)\b)")
+_DIGIT_SINGLE = re.compile(r"\b" + _COUNT + r"\s*-?\s*digits?\b")
+
+# Operators in skill examples -> operation word
+OPERATORS = {"+": "addition", "-": "subtraction", "x": "multiplication", "×": "multiplication",
+             "*": "multiplication", "/": "division", "÷": "division"}
+
+# Words that carry no skill information
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "for", "to", "up", "in", "on", "with", "some", "my", "me", "i",
+    "please", "give", "make", "create", "worksheet", "worksheets", "question", "questions", "problem",
+    "problems", "practice", "practise", "basic", "simple", "easy", "student", "students", "class",
+    "grade", "level", "focus", "mostly", "only", "want", "need", "fact", "facts", "number", "numbers",
+    "from", "away", "between", "upto", "till", "until", "also", "kid", "kids", "child", "children",
+}
+
+# match() answers offline only if the best cosine score is at least this...
+MIN_SCORE = 0.4
+# ...and at least this share of the query's content words is known
+MIN_COVERAGE = 0.6
+
+# Skills scoring within RELATIVE_SCORE of the best share the questions, at most MAX_SKILLS of them
+RELATIVE_SCORE = 0.85
+MAX_SKILLS = 6
+
+TOTAL_QUESTIONS = 20
+
+
+def _stem(word: str) -> str:
+    """Crude plural stripping ("tables" -> "table", "carries" -> "carry")."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list:
+    """Lowercase words and numbers of a text, stemmed and mapped through SYNONYMS (stopwords dropped)."""
+    tokens = []
+    for word in re.findall(r"[a-z]+|\d+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        word = SYNONYMS.get(word) or SYNONYMS.get(_stem(word)) or _stem(word)
+        tokens.extend(word.split())
+    return tokens
+
+
+def polarity(tokens: list) -> dict:
+    """
+    Carry/borrow/remainder polarity of a token list (see tokenize).
+
+    A feature word after "no" (until the next operation word or number) is
+    negative, otherwise positive: "no carry" -> {"carry": False},
+    "regrouping" -> {"carry": True, "borrow": True}.
+    """
+    out = {}
+    negated = False
+    for token in tokens:
+        if token == "no":
+            negated = True
+        elif token in FEATURES:
+            out[token] = not negated
+        elif token in _NEGATION_BREAKS or token.isdigit():
+            negated = False
+    return out
+
+
+def negated_operations(tokens: list) -> set:
+    """Operation words right after "no" in a token list ("no subtraction" -> {"subtraction"})."""
+    return {token for previous, token in zip(tokens, tokens[1:])
+            if previous == "no" and token in _NEGATION_BREAKS}
+
+
+def _count(value: str) -> int:
+    return int(value) if value.isdigit() else _DIGIT_WORDS[value]
+
+
+def digit_counts(text: str):
+    """
+    Operand digit counts named in a text, largest first.
+
+    "3-digit addition" -> (3,), "2+1 digit" -> (2, 1), "2x1 multiplication"
+    -> (2, 1), "single digit" -> (1,); None if the text names no digit count.
+    """
+    text = text.lower()
+    pair = _DIGIT_PAIR.search(text)
+    if pair:
+        return tuple(sorted((_count(pair.group(1)), _count(pair.group(2))), reverse=True))
+    single = _DIGIT_SINGLE.search(text)
+    if single:
+        return (_count(single.group(1)),)
+    return None
+
+
+def _digits_match(query: tuple, skill) -> bool:
+    """Whether a skill's digit counts satisfy the query's ("N digit": largest operand has N digits)."""
+    if skill is None:
+        return False
+    if len(query) == 1:
+        return skill[0] == query[0]
+    # "1-digit addition" is 1+1 digit
+    return skill == query or (len(skill) == 1 and query == (skill[0], skill[0]))
+
+
+def _skill_name(skill) -> str:
+    return skill.skill.strip().splitlines()[0] if skill.skill else ""
+
+
+def skill_tokens(skill) -> list:
+    """Tokens describing a catalog Skill: its name, its example's operation and its code."""
+    tokens = tokenize(_skill_name(skill))
+    operator = next((OPERATORS[ch] for ch in skill.example.lower() if ch in OPERATORS), None) if skill.example else None
+    if operator:
+        tokens.append(operator)
+    tokens.append(skill.code.lower())
+    return tokens
+
+
+class TemplateMatch(NamedTuple):
+    """A confident offline match."""
+    template: dict  # {skill_code: num_questions}, summing to TOTAL_QUESTIONS
+    confidence: float  # best cosine score
+    scores: dict  # {skill_code: score} of the skills used
+
+
+def _allocate(weights: np.ndarray, total: int) -> np.ndarray:
+    """Split total in proportion to weights with largest-remainder rounding."""
+    exact = weights / weights.sum() * total
+    counts = np.floor(exact).astype(np.int64)
+    order = np.argsort(-(exact - counts), kind="stable")
+    counts[order[:total - int(counts.sum())]] += 1
+    return counts
+
+
+class TemplateMatcher:
+    """
+    TF-IDF index over the skills of a catalog.
+
+    Args:
+        catalog: The SkillCatalog to index.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.codes = [skill.code for skill in catalog.skills]
+        self.difficulty = [skill.difficulty_level or 0 for skill in catalog.skills]
+        self.polarity = [polarity(tokenize(_skill_name(skill))) for skill in catalog.skills]
+        self.digits = [digit_counts(_skill_name(skill)) for skill in catalog.skills]
+        documents = [skill_tokens(skill) for skill in catalog.skills]
+
+        self.vocabulary = {}
+        for tokens in documents:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+        counts = np.zeros((len(documents), len(self.vocabulary)))
+        for i, tokens in enumerate(documents):
+            for token in tokens:
+                counts[i, self.vocabulary[token]] += 1
+
+        df = (counts > 0).sum(axis=0)
+        self.idf = np.log((1 + len(documents)) / (1 + df)) + 1
+        vectors = counts * self.idf
+        self.vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def scores(self, query: str) -> tuple:
+        """
+        Cosine similarity of a query to every skill.
+
+        Returns:
+            (scores array aligned with self.codes, share of query tokens in the vocabulary)
+        """
+        tokens = tokenize(query)
+        vector = np.zeros(len(self.vocabulary))
+        known = 0
+        for token in tokens:
+            j = self.vocabulary.get(token)
+            if j is not None:
+                vector[j] += 1
+                known += 1
+        coverage = known / len(tokens) if tokens else 0.0
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return np.zeros(len(self.codes)), coverage
+        return self.vectors @ (vector / norm), coverage
+
+    def candidates(self, query: str) -> np.ndarray:
+        """
+        Mask of the skills that pass the query's hard filters.
+
+        A skill passes if it has at least one of the query's carry/borrow/
+        remainder words, each with the query's polarity, and if the query
+        names a digit count, the skill has it.
+        """
+        mask = np.ones(len(self.codes), dtype=bool)
+        wanted = polarity(tokenize(query))
+        if wanted:
+            mask &= [any(feature in skill for feature in wanted)
+                     and all(skill.get(feature, value) == value for feature, value in wanted.items())
+                     for skill in self.polarity]
+        digits = digit_counts(query)
+        if digits:
+            mask &= [_digits_match(digits, skill) for skill in self.digits]
+        return mask
+
+    def match(self, query: str, total: int = TOTAL_QUESTIONS):
+        """
+        Resolve a query offline if the match is confident.
+
+        A skill code named in the query (e.g. "2A1C") always matches.
+
+        Returns:
+            TemplateMatch, or None if the query is ambiguous, excludes an
+            operation ("no subtraction") or asks for something no skill has
+            (a number, digit count or carry/borrow/remainder polarity).
+        """
+        named = [code for code in self.codes if re.search(rf"(?<![A-Za-z0-9]){re.escape(code)}(?![A-Za-z0-9])", query)]
+        if named:
+            counts = _allocate(np.ones(len(named)), total)
+            return TemplateMatch(dict(zip(named, counts.tolist())), 1.0, {code: 1.0 for code in named})
+
+        tokens = tokenize(query)
+        if any(token.isdigit() and token not in self.vocabulary for token in tokens):
+            return None
+        if negated_operations(tokens):
+            # Exclusions ("no subtraction, only addition") are left to Gemini
+            return None
+        mask = self.candidates(query)
+        if not mask.any():
+            return None
+        scores, coverage = self.scores(query)
+        scores = np.where(mask, scores, 0.0)
+        best = float(scores.max())
+        if best < MIN_SCORE or coverage < MIN_COVERAGE:
+            return None
+        selected = np.flatnonzero(mask & (scores >= best * RELATIVE_SCORE))
+        # A broad query ("addition") keeps the easiest MAX_SKILLS of its close matches
+        selected = sorted(selected, key=lambda i: (self.difficulty[i], -scores[i], i))[:MAX_SKILLS]
+        selected = np.array(sorted(selected))
+        counts = _allocate(scores[selected], total)
+        template = {self.codes[i]: int(n) for i, n in zip(selected, counts) if n}
+        return TemplateMatch(template, best, {self.codes[i]: round(float(scores[i]), 3) for i in selected})
+
+
+# Matcher for the current catalog, rebuilt when the catalog reloads
+_matcher = None
+
+
+def get_matcher() -> TemplateMatcher:
+    """Return the shared TemplateMatcher for the current skills catalog."""
+    global _matcher
+    catalog = get_catalog()
+    if _matcher is None or _matcher.catalog is not catalog:
+        _matcher = TemplateMatcher(catalog)
+    return _matcher
@@ -0,0 +1,15 @@
+"""Tests for batch manifests (run with pytest)."""
+
+from batch import expand_manifest, job_key
+
+
+def test_repeated_rows_continue_copy_numbers():
+    manifest = [
+        {"student_id": "s1", "level": "A", "language": "en", "count": 2},
+        {"student_id": "s1", "level": "A", "language": "en", "count": 2},
+        {"student_id": "s1", "level": "A", "language": "mr", "count": 1},
+    ]
+    keys = [job_key(job) for job in expand_manifest(manifest)]
+    assert keys == ["s1_en_level_A_1", "s1_en_level_A_2", "s1_en_level_A_3", "s1_en_level_A_4",
+                    "s1_mr_level_A_1"]
+    assert [job.index for job in expand_manifest(manifest)] == list(range(5))
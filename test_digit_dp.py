@@ -0,0 +1,101 @@
+"""Brute-force checks of the digit DP engine (run with pytest)."""
+
+import numpy as np
+import pytest
+
+from digit_dp import DigitDPSpace, SkillSpec
+
+
+def _operands(num_digits: int, leading_zero: bool = False) -> range:
+    low = 0 if leading_zero else (1 if num_digits == 1 else 10 ** (num_digits - 1))
+    return range(low, 10 ** num_digits)
+
+
+def _flags(spec: SkillSpec, a: np.ndarray, b: np.ndarray) -> list:
+    """Carry/borrow flag arrays of every column, units first, computed directly."""
+    if spec.op == "×":
+        return [a // 10 ** pos % 10 * b >= 10 for pos in range(spec.digits[0])]
+    flags = []
+    carry = np.zeros_like(a)
+    for pos in range(max(spec.digits)):
+        x, y = a // 10 ** pos % 10, b // 10 ** pos % 10
+        flag = x + y + carry >= 10 if spec.op == "+" else x - carry < y
+        flags.append(flag)
+        carry = flag.astype(a.dtype)
+    return flags
+
+
+def brute_force(spec: SkillSpec) -> set:
+    """Every (a, b) pair matching spec, by checking all operand pairs."""
+    seconds = spec.multipliers if spec.op == "×" else _operands(spec.digits[1], spec.second_leading_zero)
+    a, b = (grid.ravel() for grid in np.meshgrid(np.array(_operands(spec.digits[0])), np.array(seconds)))
+    ok = np.ones(len(a), dtype=bool)
+    if spec.op == "-":
+        ok &= (a > b) if spec.strict else (a >= b)
+    flags = _flags(spec, a, b)
+    if spec.pattern is not None:
+        for required, flag in zip(reversed(spec.pattern), flags):
+            if required != "?":
+                ok &= flag == (required == "1")
+    count = np.sum(flags, axis=0)
+    ok &= count >= spec.min_count
+    if spec.max_count is not None:
+        ok &= count <= spec.max_count
+    return set(zip(a[ok].tolist(), b[ok].tolist()))
+
+
+SPECS = [
+    SkillSpec("+", (2, 2), pattern="?0"),
+    SkillSpec("+", (2, 1), pattern="?1", second_leading_zero=True),
+    SkillSpec("+", (2, 2), pattern="1?"),
+    SkillSpec("+", (3, 3), max_count=0),
+    SkillSpec("+", (3, 3), min_count=1, max_count=1),
+    SkillSpec("+", (3, 3), min_count=2, max_count=2),
+    SkillSpec("+", (3, 2), pattern="01?"),
+    SkillSpec("-", (2, 1), max_count=0, strict=False, second_leading_zero=True),
+    SkillSpec("-", (2, 1), pattern="01", second_leading_zero=True),
+    SkillSpec("-", (2, 2), max_count=0, strict=False),
+    SkillSpec("-", (2, 2), pattern="01"),
+    SkillSpec("-", (3, 3), min_count=1, max_count=1, second_leading_zero=True),
+    SkillSpec("-", (3, 3), min_count=2, max_count=2, second_leading_zero=True),
+    SkillSpec("×", (2, 1), max_count=0),
+    SkillSpec("×", (2, 1), min_count=1),
+    SkillSpec("×", (3, 1), min_count=2, max_count=2),
+]
+
+
+@pytest.mark.parametrize("spec", SPECS, ids=str)
+def test_count_and_enumeration_match_brute_force(spec):
+    space = DigitDPSpace(spec)
+    expected = brute_force(spec)
+    assert len(space) == len(expected)
+    a, b = space.columns()
+    pairs = list(zip(a.tolist(), b.tolist()))
+    assert len(set(pairs)) == len(pairs)
+    assert set(pairs) == expected
+
+
+@pytest.mark.parametrize("spec", SPECS, ids=str)
+def test_rank_inverts_unrank(spec):
+    space = DigitDPSpace(spec)
+    indices = np.unique(np.random.default_rng(0).integers(0, len(space), size=500))
+    a, b = space.unrank(indices)
+    assert [space.rank(x, y) for x, y in zip(a.tolist(), b.tolist())] == indices.tolist()
+
+
+def test_rank_rejects_pairs_outside_the_space():
+    space = DigitDPSpace(SkillSpec("+", (2, 2), pattern="?0"))
+    with pytest.raises(ValueError):
+        space.rank(19, 11)  # carries out of the units column
+
+
+def test_sampling_is_uniform():
+    space = DigitDPSpace(SkillSpec("-", (2, 2), pattern="01"))
+    n = 200 * len(space)
+    a, b = space.sample(n, rng=1)
+    all_a, all_b = space.columns()
+    index = {pair: i for i, pair in enumerate(zip(all_a.tolist(), all_b.tolist()))}
+    counts = np.bincount([index[pair] for pair in zip(a.tolist(), b.tolist())], minlength=len(space))
+    # Each index is expected 200 times; 5 standard deviations either way
+    assert counts.min() > 200 - 5 * 200 ** 0.5
+    assert counts.max() < 200 + 5 * 200 ** 0.5
@@ -0,0 +1,123 @@
+"""Offline tests for gemini.py: the concurrent distractor client and context caching (run with pytest)."""
+
+import asyncio
+import json
+import random
+import time
+
+import pytest
+from google.genai import errors
+
+import gemini
+from gemini import AsyncDistractorClient, TokenBucket
+
+
+class FakeTransport:
+    """
+    Offline stand-in for GeminiTransport.
+
+    Answers each batch prompt after `latency` seconds with distractors
+    correct_ans + 1, + 2, + 3, and raises on a `failure_rate` fraction of calls.
+    """
+
+    def __init__(self, latency: float = 0.01, failure_rate: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.started = []
+        self._random = random.Random(seed)
+
+    async def __call__(self, prompt_text: str, schema: dict, system_instruction: str, temperature: float) -> str:
+        self.calls += 1
+        self.started.append(time.monotonic())
+        await asyncio.sleep(self.latency)
+        if self._random.random() < self.failure_rate:
+            raise ConnectionError("FakeTransport: simulated failure")
+        items = json.loads(prompt_text.split("Input Data: ", 1)[1])
+        results = []
+        for item in items:
+            ans = item["correct_ans"]
+            base = ans if isinstance(ans, int) else 0
+            results.append({"distractors": [base + 1, base + 2, base + 3]})
+        return json.dumps({"results": results})
+
+
+def _questions(n: int) -> list:
+    return [{"question": f"{i} + 1", "correct_ans": i + 1, "skill_code": "1A", "misconceptions": ""}
+            for i in range(n)]
+
+
+@pytest.mark.parametrize("rate", [0, -1])
+def test_token_bucket_rejects_non_positive_rate(rate):
+    with pytest.raises(ValueError):
+        TokenBucket(rate)
+
+
+def test_results_align_with_questions():
+    transport = FakeTransport()
+    client = AsyncDistractorClient(transport=transport, batch_size=4, concurrency=3, rate=1000)
+    results = asyncio.run(client.generate(_questions(10)))
+    assert [r["distractors"][0] for r in results] == [i + 2 for i in range(10)]
+    assert transport.calls == 3
+
+
+def test_failures_are_retried():
+    transport = FakeTransport(failure_rate=0.5, seed=1)
+    client = AsyncDistractorClient(transport=transport, batch_size=2, rate=1000, max_retries=10, backoff=0.001)
+    results = asyncio.run(client.generate(_questions(8)))
+    assert all(r is not None for r in results)
+    assert client.stats["retries"] > 0
+
+
+def test_requests_start_no_faster_than_rate():
+    transport = FakeTransport(latency=0.05)
+    client = AsyncDistractorClient(transport=transport, batch_size=1, concurrency=2, rate=20, burst=1)
+    asyncio.run(client.generate(_questions(6)))
+    gaps = [b - a for a, b in zip(transport.started, transport.started[1:])]
+    assert min(gaps) >= 1 / 20 * 0.8
+
+
+class _FakeCaches:
+    def __init__(self, outcomes: list):
+        self.outcomes = outcomes
+        self.calls = 0
+
+    def create(self, model, config):
+        outcome = self.outcomes[min(self.calls, len(self.outcomes) - 1)]
+        self.calls += 1
+        if isinstance(outcome, Exception):
+            raise outcome
+        return type("CachedContent", (), {"name": outcome})()
+
+
+@pytest.fixture
+def fake_caches(monkeypatch):
+    def install(outcomes):
+        caches = _FakeCaches(outcomes)
+        monkeypatch.setattr(gemini, "get_client", lambda: type("Client", (), {"caches": caches})())
+        monkeypatch.setattr(gemini, "_context_caches", {})
+        monkeypatch.setattr(gemini, "CONTEXT_CACHE_ENABLED", True)
+        return caches
+    return install
+
+
+def test_context_cache_retries_transient_errors(fake_caches, monkeypatch):
+    outage = errors.ServerError(503, {"error": {"message": "unavailable"}})
+    caches = fake_caches([outage, "cachedContents/1"])
+    assert gemini.get_context_cache("m", "prompt") is None
+    # Not retried before CONTEXT_CACHE_RETRY has passed
+    assert gemini.get_context_cache("m", "prompt") is None
+    assert caches.calls == 1
+
+    caches = fake_caches([outage, "cachedContents/1"])
+    monkeypatch.setattr(gemini, "CONTEXT_CACHE_RETRY", 0)
+    assert gemini.get_context_cache("m", "prompt") is None
+    assert gemini.get_context_cache("m", "prompt") == "cachedContents/1"
+    assert caches.calls == 2
+
+
+def test_context_cache_remembers_refusals(fake_caches):
+    caches = fake_caches([errors.ClientError(400, {"error": {"message": "too few tokens"}}), "cachedContents/1"])
+    assert gemini.get_context_cache("m", "prompt") is None
+    assert gemini.get_context_cache("m", "prompt") is None
+    assert caches.calls == 1
@@ -0,0 +1,21 @@
+"""Tests for question generation (run with pytest)."""
+
+import pytest
+
+import generate
+
+
+def test_gen_map_matches_space_map():
+    assert set(generate._gen_map) == set(generate._space_map)
+
+
+@pytest.mark.parametrize("code", sorted(generate._gen_map))
+def test_legacy_generators_are_reproducible(code):
+    gen = generate._gen_map[code]
+    assert gen(rng=7) == gen(rng=7)
+    assert gen(rng=7) == generate.gen_question(code, rng=7)
+
+
+def test_gen_questions_rejects_unknown_code():
+    with pytest.raises(ValueError):
+        generate.gen_questions("9Z", 1)
@@ -0,0 +1,42 @@
+"""Tests for bulk grading (run with pytest)."""
+
+import numpy as np
+import pytest
+
+from create_worksheet import create_worksheet_json
+from grading import BLANK, LETTERS, AnswerKey, Grades, encode_responses
+
+
+@pytest.fixture(scope="module")
+def key():
+    return AnswerKey({"w1": create_worksheet_json("Level A", "A", "en", rng=1),
+                      "w2": create_worksheet_json("Level C", "C", "en", rng=2)})
+
+
+def test_encode_responses():
+    codes = encode_responses(["AbD", "c-", ""])
+    assert codes.tolist() == [[0, 1, 3], [2, BLANK, BLANK], [BLANK, BLANK, BLANK]]
+
+
+def test_all_correct(key):
+    answers = "".join(LETTERS[c] for c in key.correct[:20])
+    grades = Grades(key)
+    assert grades.add(["w1"], encode_responses([answers])).tolist() == [20]
+    assert grades.by_skill() and all(v["accuracy"] == 1.0 for v in grades.by_skill().values())
+
+
+def test_chunking_does_not_change_counts(key):
+    ids = ["w1", "w2", "w1", "w2"]
+    answers = ["AB", "A" * 20, "", "DCBA" * 5]
+
+    whole = Grades(key)
+    whole.add(ids, encode_responses(answers))
+    split = Grades(key)
+    for i in range(len(ids)):
+        split.add(ids[i:i + 1], encode_responses(answers[i:i + 1]))
+
+    np.testing.assert_array_equal(whole.picks, split.picks)
+    assert whole.by_skill() == split.by_skill()
+    # Every question of every row is counted, answered or not
+    assert int(whole.picks.sum()) == 4 * 20
+    assert int(whole.picks[:, BLANK].sum()) == 18 + 0 + 20 + 0
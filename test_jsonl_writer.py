@@ -0,0 +1,73 @@
+"""Tests for JsonlWriter crash recovery (run with pytest)."""
+
+import gzip
+
+import pytest
+
+from jsonl_writer import JsonlWriter, read_jsonl
+
+
+def _records(start: int, stop: int) -> list:
+    return [{"id": f"w{i}", "value": i} for i in range(start, stop)]
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".jsonl.gz"])
+def test_round_trip(tmp_path, suffix):
+    path = str(tmp_path / f"out{suffix}")
+    with JsonlWriter(path, fsync_every=2) as writer:
+        for record in _records(0, 5):
+            writer.write(record)
+    assert list(read_jsonl(path)) == _records(0, 5)
+
+
+def test_resume_drops_partial_line(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    with JsonlWriter(path) as writer:
+        for record in _records(0, 3):
+            writer.write(record)
+    with open(path, "ab") as f:
+        f.write(b'{"id": "w3", "val')  # crash mid-record
+
+    with JsonlWriter(path) as writer:
+        assert writer.completed == {"w0", "w1", "w2"}
+        for record in _records(3, 5):
+            writer.write(record)
+    assert list(read_jsonl(path)) == _records(0, 5)
+
+
+def test_resume_stops_at_corrupt_line(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    with open(path, "w") as f:
+        f.write('{"id": "w0", "value": 0}\nnot json\n{"id": "w2", "value": 2}\n')
+
+    with JsonlWriter(path) as writer:
+        assert writer.completed == {"w0"}
+        writer.write({"id": "w1", "value": 1})
+    assert list(read_jsonl(path)) == _records(0, 2)
+
+
+def test_resume_gzip_without_trailer(tmp_path):
+    path = str(tmp_path / "out.jsonl.gz")
+    writer = JsonlWriter(path, fsync_every=1)
+    for record in _records(0, 3):
+        writer.write(record)
+    # Crash: the records are flushed but the gzip trailer is never written
+    writer._raw.close()
+    with pytest.raises(EOFError):
+        with gzip.open(path, "rb") as f:
+            f.read()
+
+    with JsonlWriter(path) as writer:
+        assert writer.completed == {"w0", "w1", "w2"}
+        writer.write(_records(3, 4)[0])
+    assert list(read_jsonl(path)) == _records(0, 4)
+
+
+def test_no_resume_overwrites(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    with JsonlWriter(path) as writer:
+        writer.write(_records(0, 1)[0])
+    with JsonlWriter(path, resume=False) as writer:
+        assert not writer.completed
+        writer.write(_records(1, 2)[0])
+    assert list(read_jsonl(path)) == _records(1, 2)
@@ -0,0 +1,34 @@
+"""Tests for the array-backed Worksheet (run with pytest)."""
+
+import pytest
+
+from create_worksheet import create_worksheet, create_worksheet_level_distribution
+from models import Worksheet
+
+
+@pytest.fixture(scope="module")
+def worksheet():
+    return Worksheet.from_questions(create_worksheet(create_worksheet_level_distribution("C", rng=1), rng=1))
+
+
+def test_negative_index(worksheet):
+    last = worksheet[-1]
+    assert last.index == len(worksheet)
+    assert last == worksheet[len(worksheet) - 1]
+
+
+@pytest.mark.parametrize("i", [20, -21])
+def test_index_out_of_range(worksheet, i):
+    with pytest.raises(IndexError):
+        worksheet[i]
+
+
+def test_slice(worksheet):
+    part = worksheet[5:8]
+    assert isinstance(part, Worksheet) and len(part) == 3
+    assert part[0].question_text == worksheet[5].question_text
+    assert [q.index for q in part] == [1, 2, 3]
+
+
+def test_iteration_stops(worksheet):
+    assert len(list(worksheet)) == len(worksheet)
@@ -0,0 +1,100 @@
+"""Tests for skills.json syncing against a local stand-in server (run with pytest)."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import skills
+
+ROWS = [{"No.": 1, "Code": "1A", "Difficulty Level": 1, "Skill": "1-digit addition - no carry", "Example": "2+2"}]
+ETAG = '"v1"'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        time.sleep(server.delay)
+        if server.status != 200:
+            self.send_response(server.status)
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(ROWS).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.requests, httpd.status, httpd.delay = [], 200, 0.0
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_200_then_304(server, tmp_path):
+    path = str(tmp_path / "skills.json")
+    first = skills.sync_skills(url=server.url, path=path, force=True)
+    assert first.status == "updated"
+    assert first.data == [{"code": "1A", "difficulty_level": 1, "skill": "1-digit addition - no carry",
+                           "example": "2+2"}]
+    assert json.load(open(path)) == first.data
+
+    second = skills.sync_skills(url=server.url, path=path, force=True)
+    assert second.status == "not_modified"
+    assert second.data == first.data
+    assert server.requests[-1].get("If-None-Match") == ETAG
+
+
+def test_recent_check_skips_request(server, tmp_path):
+    path = str(tmp_path / "skills.json")
+    skills.sync_skills(url=server.url, path=path, force=True)
+    assert skills.sync_skills(url=server.url, path=path, min_interval=60).status == "fresh"
+    assert len(server.requests) == 1
+
+
+def test_error_falls_back_to_local_copy(server, tmp_path, capsys):
+    path = str(tmp_path / "skills.json")
+    local = skills.sync_skills(url=server.url, path=path, force=True).data
+    server.status = 500
+    result = skills.sync_skills(url=server.url, path=path, force=True)
+    assert result.status == "error"
+    assert result.data == local
+
+
+def test_get_skills_starts_one_background_sync(server, tmp_path, monkeypatch):
+    path = str(tmp_path / "skills.json")
+    skills.sync_skills(url=server.url, path=path, force=True)
+    monkeypatch.setattr(skills, "SKILLS_FILE", path)
+    monkeypatch.setattr(skills, "WEB_APP_URL", server.url)
+    monkeypatch.setattr(skills, "MIN_REFRESH_INTERVAL", 0.0)
+    server.delay = 0.3
+
+    # A sync in flight is not started again
+    for _ in range(5):
+        assert skills.get_skills() is not None
+    skills._refresh_thread.join()
+    assert len(server.requests) == 2
+
+    # Within the interval no sync starts at all
+    monkeypatch.setattr(skills, "MIN_REFRESH_INTERVAL", 60.0)
+    skills.get_skills()
+    assert not skills._refresh_thread.is_alive()
+    assert len(server.requests) == 2
@@ -0,0 +1,54 @@
+"""Tests for the offline template matcher's hard filters (run with pytest)."""
+
+import pytest
+
+from template_matcher import digit_counts, get_matcher, polarity, tokenize
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return get_matcher()
+
+
+def test_polarity():
+    assert polarity(tokenize("3-digit addition - no carry")) == {"carry": False}
+    assert polarity(tokenize("division without remainder")) == {"remainder": False}
+    assert polarity(tokenize("subtraction with borrowing")) == {"borrow": True}
+    assert polarity(tokenize("addition no carry and subtraction with borrow")) == {"carry": False, "borrow": True}
+
+
+def test_digit_counts():
+    assert digit_counts("3-digit addition") == (3,)
+    assert digit_counts("2+1 digit addition") == (2, 1)
+    assert digit_counts("2x1 multiplication") == (2, 1)
+    assert digit_counts("single digit addition") == (1,)
+    assert digit_counts("tables up to 10") is None
+
+
+@pytest.mark.parametrize("query", [
+    "division with remainder",  # every division skill is "without remainder"
+    "4 digit addition",
+    "tables up to 12",
+    "no subtraction, only addition",
+    "addition without subtraction",
+])
+def test_falls_back_to_gemini(matcher, query):
+    assert matcher.match(query) is None
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("subtraction with borrowing", {"2S1B", "2S2B", "3SB", "3SB2"}),
+    ("3 digit subtraction no borrow", {"3S"}),
+    ("2 digit addition with carry", {"2A1C", "2A2C"}),
+    ("division without remainder", {"2D1", "3D1"}),
+    ("2+1 digit addition no carry", {"2A1"}),
+])
+def test_hard_filters(matcher, query, expected):
+    match = matcher.match(query)
+    assert match is not None
+    assert set(match.template) == expected
+    assert sum(match.template.values()) == 20
+
+
+def test_named_code(matcher):
+    assert matcher.match("only 2A1C please").template == {"2A1C": 20}
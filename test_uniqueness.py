@@ -0,0 +1,27 @@
+"""Tests for uniqueness mode (run with pytest)."""
+
+from collections import Counter
+
+from create_worksheet import create_worksheet, create_worksheet_level_distribution
+from uniqueness import UniquenessTracker
+
+
+def test_no_repeats_across_overlapping_skills():
+    # Seed 284 draws "10 × 3" from both T5 and 2M1 if uniqueness is per skill
+    for seed in (284, 1, 2, 3):
+        worksheet = create_worksheet(create_worksheet_level_distribution("C", rng=seed), rng=seed, unique=True)
+        texts = Counter(question.question_text for question in worksheet)
+        assert max(texts.values()) == 1
+
+
+def test_across_worksheets_until_epoch():
+    tracker = UniquenessTracker()
+    drawn = set()
+    for seed in range(5):
+        tracker.start_worksheet()
+        records = tracker.draw("2A1", 10, rng=seed)
+        texts = {record.text for record in records}
+        assert len(texts) == 10
+        assert not texts & drawn
+        drawn |= texts
+    assert tracker.stats()["2A1"]["epochs"] == 1
@@ -0,0 +1,259 @@
+"""
+Uniqueness mode: draw questions without replacement within a worksheet and,
+optionally, across every worksheet built with the same tracker.
+
+Questions are keyed by their position in the skill's operand space
+(generate._space_map), so "seen" is a per-skill bitset with one bit per
+possible question; spaces too large for a bitset use a Bloom filter.
+Each draw picks a random index and retries if it was already seen, so the
+cost per question stays O(1) as long as the seen-set is not nearly full.
+
+When a skill runs low (the seen-set reaches max_fill of its space, or a draw
+keeps hitting seen questions), the skill starts a new epoch: its batch-wide
+seen-set is cleared and questions may repeat across worksheets again, but
+never within a worksheet unless the worksheet asks for more questions than
+the skill has.
+
+For parallel batches each worker gets a partition (w, W) and only draws
+indices congruent to w mod W, so the workers' questions never collide
+without any shared state.
+
+Example:
+    tracker = UniquenessTracker()
+    for i in range(1000):
+        create_worksheet_json("Class 3", "C", "en", rng=i, unique=tracker)
+    tracker.stats()["3AC2"]
+"""
+
+import math
+from typing import Tuple
+
+import generate
+import instrumentation
+from seeding import RNGLike, get_rng
+
+# Spaces with more questions than this are tracked with a Bloom filter
+BITSET_MAX_BITS = 1 << 27
+
+# Questions tracked per Bloom filter epoch
+BLOOM_CAPACITY = 1_000_000
+
+
+class BitSet:
+    """Set of integers in [0, size), one bit each."""
+
+    __slots__ = ("size", "capacity", "count", "_bits")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.capacity = size
+        self.count = 0
+        self._bits = bytearray((size + 7) // 8)
+
+    def __contains__(self, i: int) -> bool:
+        return bool(self._bits[i >> 3] >> (i & 7) & 1)
+
+    def add(self, i: int):
+        if i not in self:
+            self._bits[i >> 3] |= 1 << (i & 7)
+            self.count += 1
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+
+def _mix64(x: int) -> int:
+    """splitmix64 finalizer."""
+    x = (x + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return x ^ (x >> 31)
+
+
+class BloomFilter:
+    """
+    Approximate set of integers with no false negatives.
+
+    Args:
+        capacity: Number of items it is sized for.
+        error_rate: False positive rate at capacity.
+    """
+
+    __slots__ = ("capacity", "count", "_m", "_k", "_bits")
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.count = 0
+        self._m = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._k = max(1, round(self._m / capacity * math.log(2)))
+        self._bits = bytearray((self._m + 7) // 8)
+
+    def _positions(self, i: int):
+        h1 = _mix64(i)
+        h2 = _mix64(h1) | 1
+        for j in range(self._k):
+            yield (h1 + j * h2) % self._m
+
+    def __contains__(self, i: int) -> bool:
+        return all(self._bits[p >> 3] >> (p & 7) & 1 for p in self._positions(i))
+
+    def add(self, i: int):
+        new = False
+        for p in self._positions(i):
+            if not self._bits[p >> 3] >> (p & 7) & 1:
+                self._bits[p >> 3] |= 1 << (p & 7)
+                new = True
+        self.count += new
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+
+class _SkillState:
+    """Seen-set and counters for one skill within a tracker's partition."""
+
+    __slots__ = ("offset", "stride", "size", "seen", "epochs", "repeats", "rejections")
+
+    def __init__(self, space_size: int, partition: Tuple[int, int], across: bool):
+        w, num = partition
+        if space_size <= w:
+            # Fewer questions than partitions: share the whole space
+            w, num = 0, 1
+        self.offset = w
+        self.stride = num
+        self.size = (space_size - w + num - 1) // num
+        self.seen = None
+        if across:
+            self.seen = BitSet(self.size) if self.size <= BITSET_MAX_BITS else BloomFilter(BLOOM_CAPACITY)
+        self.epochs = 1
+        self.repeats = 0
+        self.rejections = 0
+
+
+class UniquenessTracker:
+    """
+    Tracks the questions already handed out and draws fresh ones.
+
+    Args:
+        across_worksheets: Also avoid questions used by earlier worksheets
+                           drawn with this tracker (otherwise only within a
+                           worksheet).
+        max_fill: Fraction of a skill's questions that may be used before
+                  its seen-set is cleared and a new epoch starts.
+        max_attempts: Random draws per question before giving up and
+                      starting a new epoch for the skill.
+        partition: (w, W): only draw questions whose index is w mod W.
+    """
+
+    def __init__(self, across_worksheets: bool = True, max_fill: float = 0.9,
+                 max_attempts: int = 32, partition: Tuple[int, int] = (0, 1)):
+        if not 0 <= partition[0] < partition[1]:
+            raise ValueError(f"Invalid partition: {partition}")
+        self.across_worksheets = across_worksheets
+        self.max_fill = max_fill
+        self.max_attempts = max_attempts
+        self.partition = partition
+        self._skills = {}
+        # This worksheet's partition indices per skill, and (op, first, second) of all its questions
+        self._worksheet = {}
+        self._worksheet_questions = set()
+
+    def _state(self, code: str) -> _SkillState:
+        state = self._skills.get(code)
+        if state is None:
+            if code not in generate._space_map:
+                raise ValueError(f"Unknown code: {code}")
+            state = _SkillState(len(generate._space_map[code]), self.partition, self.across_worksheets)
+            self._skills[code] = state
+        return state
+
+    def _new_epoch(self, code: str, state: _SkillState, used: set):
+        state.seen.clear()
+        for j in used:
+            state.seen.add(j)
+        state.epochs += 1
+        instrumentation.count("unique.epochs", code)
+
+    def start_worksheet(self):
+        """Begin a new worksheet: within-worksheet uniqueness restarts."""
+        self._worksheet = {}
+        self._worksheet_questions = set()
+
+    def _fresh(self, code: str, state: _SkillState, used: set, j: int, check_seen: bool = True):
+        """The question at partition index j if it is unused in this worksheet (and, with check_seen, in the epoch)."""
+        if j in used or (check_seen and state.seen is not None and j in state.seen):
+            return None
+        record = generate.records_at(code, [state.offset + j * state.stride])[0]
+        if (record.op, record.first, record.second) in self._worksheet_questions:
+            # Already on the worksheet from another skill ("10 × 3" is both T5 and 2M1)
+            return None
+        return record
+
+    def draw(self, code: str, n: int, rng: RNGLike = None) -> list:
+        """
+        Draw n questions of a skill that have not been used yet.
+
+        Within a worksheet a question is never repeated, even if another
+        skill produced it; across worksheets each skill has its own epochs.
+
+        Returns:
+            List of generate.QuestionRecord.
+        """
+        rng = get_rng(rng)
+        state = self._state(code)
+        seen = state.seen
+        used = self._worksheet.setdefault(code, set())
+        records = []
+
+        for _ in range(n):
+            record = None
+            if len(used) >= state.size:
+                # The worksheet needs more questions than the skill has
+                j = int(rng.integers(state.size))
+                state.repeats += 1
+                instrumentation.count("unique.repeats", code)
+            else:
+                if seen is not None and seen.count >= self.max_fill * min(seen.capacity, state.size):
+                    self._new_epoch(code, state, used)
+                for _ in range(self.max_attempts):
+                    j = int(rng.integers(state.size))
+                    record = self._fresh(code, state, used, j)
+                    if record is not None:
+                        break
+                    state.rejections += 1
+                else:
+                    if seen is not None:
+                        self._new_epoch(code, state, used)
+                    # Only the worksheet's own questions are excluded now
+                    for _ in range(self.max_attempts):
+                        j = int(rng.integers(state.size))
+                        record = self._fresh(code, state, used, j, check_seen=False)
+                        if record is not None:
+                            break
+                    while record is None and j in used:
+                        # Every draw collided with other skills' questions; give up on those
+                        j = int(rng.integers(state.size))
+                used.add(j)
+                if seen is not None:
+                    seen.add(j)
+            if record is None:
+                record = generate.records_at(code, [state.offset + j * state.stride])[0]
+            self._worksheet_questions.add((record.op, record.first, record.second))
+            records.append(record)
+
+        return records
+
+    def stats(self) -> dict:
+        """Per-skill space size, questions seen in the current epoch, epochs, repeats and rejected draws."""
+        return {
+            code: {
+                "size": state.size,
+                "seen": state.seen.count if state.seen is not None else None,
+                "epochs": state.epochs,
+                "repeats": state.repeats,
+                "rejections": state.rejections,
+            }
+            for code, state in self._skills.items()
+        }
@@ -1,35 +1,15 @@
 import json
-from pathlib import Path
+from dataclasses import replace
 
+from locales import get_locale
 from models import Question
-
-# Cache for skills data
-_skills_cache = None
+from skill_catalog import get_catalog
 
 
 def _load_skills():
-    """Load skills data from skills.json file."""
-    global _skills_cache
-    if _skills_cache is not None:
-        return _skills_cache
-    
-    skills_file = Path(__file__).parent / "skills.json"
-    
+    """Return skills data from skills.json as a dict keyed by skill code."""
     try:
-        with open(skills_file, 'r') as f:
-            data = json.load(f)
-            # If data is a list, assume it's [{"answerKey": [...]}, [...skills...]]
-            if isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
-                # Check if first element has answerKey (old format)
-                if "answerKey" in data[0]:
-                    _skills_cache = {}
-                else:
-                    # It's a list of skill objects
-                    _skills_cache = {skill["code"]: skill for skill in data}
-            else:
-                # It's a dict or list of skills
-                _skills_cache = {skill["code"]: skill for skill in data}
-            return _skills_cache
+        return get_catalog().raw_by_code
     except (FileNotFoundError, json.JSONDecodeError):
         return {}
 
@@ -118,44 +98,43 @@ def letter_to_index(letter):
     
     return mapping[letter]
 
-def question_to_marathi(question: Question) -> Question:
+def localize_question(question: Question, language: str) -> Question:
     """
-    Convert a Question object to a Marathi string representation.
+    Return a copy of a question with its text and options in a language's digits.
+    
+    Only the text and the (already chosen) options are translated; call
+    after choose_distractors.
     
     Args:
         question: Question object to convert
+        language: Language code (see locales.DIGITS)
     
     Returns:
-        Question: question with question_text and options converted to Marathi
+        Question: question with question_text and options converted
     """
-    # Placeholder implementation - this would need actual translation logic
-    num1, num2 = [question.question_text.split(" ")[i] for i in [0, -1]]
-    marathi_num1 = arabic_to_devanagari(num1)
-    marathi_num2 = arabic_to_devanagari(num2)
+    locale = get_locale(language)
+    return replace(
+        question,
+        question_text=locale.render(question.question_text),
+        options=[locale.render(opt) for opt in question.options],
+    )
 
-    # Replace numbers in question text
-    marathi_question_text = question.question_text.replace(num1, marathi_num1).replace(num2, marathi_num2)
 
-    # Convert options to Marathi
-    marathi_options = [arabic_to_devanagari(str(opt)) for opt in question.options]
+def question_to_marathi(question: Question) -> Question:
+    """
+    Convert a Question object to a Marathi string representation.
     
-    # Convert possible_distractors to Marathi
-    marathi_possible_distractors = [arabic_to_devanagari(str(opt)) for opt in question.possible_distractors]
-
-    return Question(
-        index=question.index,
-        question_text=marathi_question_text,
-        skill_code=question.skill_code,
-        options=marathi_options,
-        answer=question.answer,
-        correct_option=question.correct_option,
-        possible_distractors=marathi_possible_distractors
-    )
+    Args:
+        question: Question object to convert
+    
+    Returns:
+        Question: question with question_text, options and possible distractors converted to Marathi
+    """
+    localized = localize_question(question, "mr")
+    localized.possible_distractors = [get_locale("mr").render(opt) for opt in question.possible_distractors]
+    return localized
 
 
 def arabic_to_devanagari(number_string: str) -> str:
   """Converts a string of Arabic numerals to Devanagari numerals."""
-  arabic_numerals = '0123456789'
-  devanagari_numerals = '०१२३४५६७८९'
-  translation_table = str.maketrans(arabic_numerals, devanagari_numerals)
-  return number_string.translate(translation_table)
\ No newline at end of file
+  return get_locale("mr").render(number_string)